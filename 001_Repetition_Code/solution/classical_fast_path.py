@@ -0,0 +1,226 @@
+import os
+import sys
+import math
+import time
+from collections import Counter
+import numpy as np
+from qiskit import transpile
+from qiskit_aer import AerSimulator
+from encoding import *
+from error_injection import *
+from error_detection import *
+from error_correction import *
+from decoding import *
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from lookup_decoder import MAX_SYNDROME_BITS, build_lookup_table, pack_syndromes
+
+# --- Classical Fast Path (NumPy) ---
+# Single bit flips (X) or phase flips (Z) on the repetition code never leave the stabilizer basis:
+# a phase flip in the |+++>/|---> encoding behaves exactly like a bit flip in the |000>/|111> encoding.
+# So every shot is a classical computation on an error pattern e (shots, n):
+#   syndrome   s_i = e_i ^ e_(i+1)          (S0 = Z0 Z1, S1 = Z1 Z2, ... / X0 X1, X1 X2, ... for Z errors)
+#   correction 'majority' (vote over the n data bits) or 'lookup' (syndrome -> minimum-weight correction table)
+#   result     decoded q0 = 1 ^ e_0 ^ c_0   (logical |1> input, as in main.py)
+# Millions of shots are evaluated in a few vectorized passes (chunks of shots_per_chunk shots).
+ERROR_MODELS = ['single', 'iid'] # 'single': one of [None, 0, ..., n-1] per shot (main.py) / 'iid': every qubit flips with p
+CORRECTION_METHODS = ['majority', 'lookup']
+MAX_LOOKUP_N = MAX_SYNDROME_BITS + 1 # Lookup table size 2^(n-1) x n
+
+def check_code_length(n):
+    if n < 3 or n % 2 == 0:
+        print(f"Wrong Code Length: {n} (odd n >= 3)")
+        sys.exit(1)
+
+def sample_error_patterns(n, num_shots, error_model, p, rng):
+    """
+    Returns:
+        np.ndarray: (num_shots, n) uint8 error patterns (1 = flipped qubit).
+    """
+    if error_model == 'single':
+        # Uniform over [None, 0, ..., n-1] (None -> no error)
+        flip_index = rng.integers(-1, n, size=num_shots)
+        return (flip_index[:, None] == np.arange(n)).astype(np.uint8)
+    elif error_model == 'iid':
+        return (rng.random((num_shots, n)) < p).astype(np.uint8)
+    else:
+        print(f"Wrong Error Model: {error_model} (choose from {ERROR_MODELS})")
+        sys.exit(1)
+
+def compute_syndromes(errors):
+    """
+    (shots, n) error patterns -> (shots, n-1) syndromes (s_i = e_i ^ e_(i+1)).
+    """
+    return errors[:, :-1] ^ errors[:, 1:]
+
+def repetition_parity_check_matrix(n):
+    """
+    (n-1, n) parity-check matrix of the length-n repetition code (row i = Z_i Z_(i+1), s_0 = bit 0 of the packed syndrome).
+    n=3: the matrix of parity_check_matrix_func
+    """
+    return (np.eye(n - 1, n, dtype=np.uint8) ^ np.eye(n - 1, n, k=1, dtype=np.uint8))
+
+def repetition_lookup_table(n):
+    """
+    Minimum-weight correction of every syndrome (common/lookup_decoder.py, dense table indexed by the packed syndrome).
+    n=3: syndrome 01 -> q0, 11 -> q1, 10 -> q2 (same as error_correction_func)
+
+    Returns:
+        np.ndarray: (2^(n-1), n) uint8 corrections.
+    """
+    check_code_length(n)
+    if n > MAX_LOOKUP_N:
+        print(f"Wrong Code Length: {n} (lookup table up to n={MAX_LOOKUP_N}, use 'majority')")
+        sys.exit(1)
+    corrections, _ = build_lookup_table(repetition_parity_check_matrix(n))
+    return corrections
+
+def decode_q0(errors, correction_method='majority', lookup_table=None):
+    """
+    Returns:
+        np.ndarray: (shots,) 1 where the decoded q0 is flipped (logical error).
+    """
+    n = errors.shape[1]
+    if correction_method == 'majority':
+        return (errors.sum(axis=1) > n // 2).astype(np.uint8)
+    elif correction_method == 'lookup':
+        corrections = lookup_table[pack_syndromes(compute_syndromes(errors))]
+        return errors[:, 0] ^ corrections[:, 0]
+    else:
+        print(f"Wrong Correction Method: {correction_method} (choose from {CORRECTION_METHODS})")
+        sys.exit(1)
+
+def run_fast_path(n, num_shots, error_model='single', p=0.0, correction_method='majority',
+                  seed=None, shots_per_chunk=1000000):
+    """
+    Monte-Carlo run of the repetition code without a simulator.
+
+    Args:
+        n (int): Code length (odd, >= 3).
+        p (float): Flip probability per qubit ('iid').
+
+    Returns:
+        dict: Error report ({'NE': n, 'CE': n, 'UE': n}).
+    """
+    check_code_length(n)
+    rng = np.random.default_rng(seed)
+    lookup_table = repetition_lookup_table(n) if correction_method == 'lookup' else None
+    error_report = {'NE': 0, 'CE': 0, 'UE': 0}
+    for start in range(0, num_shots, shots_per_chunk):
+        errors = sample_error_patterns(n, min(shots_per_chunk, num_shots - start), error_model, p, rng)
+        logical_errors = decode_q0(errors, correction_method, lookup_table).astype(bool)
+        injected = errors.any(axis=1)
+        error_report['UE'] += int(np.count_nonzero(logical_errors))
+        error_report['NE'] += int(np.count_nonzero(~logical_errors & ~injected))
+        error_report['CE'] += int(np.count_nonzero(~logical_errors & injected))
+    return error_report
+
+def analytic_logical_error_rate(n, p):
+    """
+    P(more than n/2 of n qubits flipped) (iid flips, majority / minimum-weight correction).
+    """
+    return sum(math.comb(n, k) * p ** k * (1 - p) ** (n - k) for k in range(n // 2 + 1, n + 1))
+
+# --- Aer Cross-check (n=3 circuits of this folder) ---
+def run_aer_path(error_patterns, error_type, simulator, seed=None):
+    """
+    Runs the solution circuit (encoding, error injection, detection, correction, decoding) of every
+    distinct error pattern once, with shots = number of shots that drew the pattern.
+
+    Args:
+        error_patterns (np.ndarray): (shots, 3) uint8 error patterns.
+
+    Returns:
+        dict: Error report ({'NE': n, 'CE': n, 'UE': n}).
+    """
+    error_report = {'NE': 0, 'CE': 0, 'UE': 0}
+    pattern_counts = Counter(map(tuple, error_patterns.tolist()))
+    for case_idx, (pattern, shots) in enumerate(sorted(pattern_counts.items())):
+        qc = encoding_func(error_type=error_type)
+        for flip_index in np.flatnonzero(pattern):
+            error_injection_func(qc, int(flip_index), error_type=error_type)
+        qc.barrier()
+        error_detection_func(qc, error_type=error_type)
+        qc.barrier()
+        error_correction_func(qc, error_type=error_type)
+        qc.barrier()
+        decoding_func(qc, error_type=error_type)
+        qc.barrier()
+        qc.measure(0, 2) # q0 -> c2
+
+        run_seed = None if seed is None else seed + case_idx
+        counts = simulator.run(transpile(qc, simulator), shots=shots, seed_simulator=run_seed).result().get_counts()
+        for measured_string, count in counts.items():
+            if measured_string[0] != '1': # c2 (q0)
+                error_report['UE'] += count
+            elif any(pattern):
+                error_report['CE'] += count
+            else:
+                error_report['NE'] += count
+    return error_report
+
+def chi_square_homogeneity(report_a, report_b):
+    """
+    Two-sample chi-square test (NE / CE / UE counts from the same distribution?).
+
+    Returns:
+        tuple: (chi-square statistic, degrees of freedom, p-value)
+    """
+    labels = [label for label in report_a if report_a[label] + report_b[label] > 0]
+    total_a = sum(report_a.values())
+    total_b = sum(report_b.values())
+    statistic = 0.0
+    for label in labels:
+        pooled = (report_a[label] + report_b[label]) / (total_a + total_b)
+        for report, total in ((report_a, total_a), (report_b, total_b)):
+            expected = pooled * total
+            statistic += (report[label] - expected) ** 2 / expected
+    dof = len(labels) - 1
+    # Survival function of chi-square for dof 1 / 2 (3 outcome labels at most)
+    if dof <= 0:
+        p_value = 1.0
+    elif dof == 1:
+        p_value = math.erfc(math.sqrt(statistic / 2))
+    else:
+        p_value = math.exp(-statistic / 2)
+    return statistic, dof, p_value
+
+def cross_check_with_aer(error_model, p, error_type, num_shots, seed, correction_method='lookup'):
+    """
+    Same number of shots through the NumPy fast path and the Aer circuits (n=3), independent samples.
+
+    Returns:
+        tuple: (fast path report, Aer report, p-value of the homogeneity test)
+    """
+    simulator = AerSimulator()
+    fast_report = run_fast_path(3, num_shots, error_model, p, correction_method, seed=seed)
+    aer_patterns = sample_error_patterns(3, num_shots, error_model, p, np.random.default_rng(seed + 1))
+    aer_report = run_aer_path(aer_patterns, error_type, simulator, seed=seed)
+    _, _, p_value = chi_square_homogeneity(fast_report, aer_report)
+    return fast_report, aer_report, p_value
+
+def main():
+    seed = 2024
+    # 1. Cross-check against Aer (n=3 solution circuits)
+    cross_check_shots = 20000
+    cross_check_cases = [('single', 0.0, 'X'), ('single', 0.0, 'Z'), ('iid', 0.2, 'X'), ('iid', 0.2, 'Z')]
+    print(f"--- Cross-check: NumPy fast path vs. Aer (n=3, {cross_check_shots} shots each) ---")
+    for error_model, p, error_type in cross_check_cases:
+        fast_report, aer_report, p_value = cross_check_with_aer(error_model, p, error_type, cross_check_shots, seed)
+        status = 'ok' if p_value > 0.001 else 'MISMATCH'
+        print(f"{error_model:>6} p={p:<5} {error_type} | fast path: {fast_report} | Aer: {aer_report} | p-value: {p_value:.3f} ({status})")
+
+    # 2. LER curves (iid flips)
+    num_shots = 1000000
+    code_lengths = [3, 5, 7, 9, 11, 21, 51]
+    physical_error_rates = [0.01, 0.05, 0.1, 0.2, 0.3, 0.4]
+    print(f"\n--- Logical Error Rate (iid flips, majority vote, {num_shots} shots per point) ---")
+    print(f"{'n':>4} | {'p':>5} | {'LER':>10} | {'analytic':>10} | {'time [ms]':>9}")
+    for n in code_lengths:
+        for p in physical_error_rates:
+            start = time.perf_counter()
+            report = run_fast_path(n, num_shots, 'iid', p, 'majority', seed=seed)
+            elapsed = time.perf_counter() - start
+            print(f"{n:>4} | {p:>5} | {report['UE'] / num_shots:>10.6f} | {analytic_logical_error_rate(n, p):>10.6f} | {elapsed * 1e3:>9.1f}")
+
+if __name__ == '__main__':
+    main()
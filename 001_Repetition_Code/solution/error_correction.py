@@ -2,6 +2,7 @@ from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from collections import Counter
 from qiskit.circuit import Gate
 import sys
+import numpy as np
 
 def error_correction_func (qc, error_type='X'):
     # QuantumCircuit(5,3)
@@ -20,4 +21,14 @@ def error_correction_func (qc, error_type='X'):
         print("Wrong Error Type")
         sys.exit(1)
 
-    return
\ No newline at end of file
+    return
+
+# Parity-check matrix of the syndromes measured by error_detection_func (row i = syndrome bit c_i):
+# c0 = Z0 Z1, c1 = Z1 Z2 (X errors) / X0 X1, X1 X2 (Z errors)
+# The deferred correction mode (main.py) generates the syndrome table of error_correction_func from it
+# (common/lookup_decoder.py): 01 -> q0, 11 -> q1, 10 -> q2
+def parity_check_matrix_func():
+    return np.array([
+        [1, 1, 0],
+        [0, 1, 1],
+    ], dtype=np.uint8)
@@ -1,74 +1,183 @@
+import os
+import sys
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
 from collections import Counter
 from qiskit.circuit import Gate
 from qiskit_aer import AerSimulator
 from tqdm import tqdm
 import random
+import numpy as np
 from encoding import *
 from error_injection import *
 from error_detection import *
 from error_correction import *
 from decoding import *
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from stage_profiler import StageProfiler, stage
+from deferred_correction import logical_flip_table, apply_deferred_correction
+from lookup_decoder import LookupTableDecoder
+
+# Readout flip of every syndrome value for correction_mode = 'deferred' (common/deferred_correction.py)
+# The syndrome table is generated from the parity-check matrix (common/lookup_decoder.py)
+def deferred_flip_table(error_type='X'):
+    decoder = LookupTableDecoder(parity_check_matrix_func())
+    correction_table = [[(qubit, error_type) for qubit in decoder.correction_qubits(syndrome)]
+                        for syndrome in range(2 ** decoder.num_checks)]
+    qc_decoding = QuantumCircuit(5)
+    decoding_func(qc_decoding, error_type=error_type)
+    return logical_flip_table(correction_table, qc_decoding)
+
+# Simulates by distributing the total 'iters' among the Error_Cases with one multinomial draw,
+# then runs each case's circuit once with shots = its count (same NE/CE/UE statistics as the per-iteration loop).
+def run_simulation_hybrid(simulator, error_type, iters, Error_Cases, initial_q0_value='1', correction_mode='dynamic'):
+    error_report = {'NE':0, 'CE':0, 'UE':0}
+    flip_table = deferred_flip_table(error_type) if correction_mode == 'deferred' else None
+
+    # 1. Multinomial draw: how many of the 'iters' iterations land on each error case (uniform choice)
+    # (e.g., {None: 254, 0: 249, 1: 251, 2: 246})
+    shot_counts = np.random.default_rng().multinomial(iters, [1 / len(Error_Cases)] * len(Error_Cases))
+    case_shot_counts = {error_index: int(count) for error_index, count in zip(Error_Cases, shot_counts)}
+    print(f"Random distribution (Total {sum(case_shot_counts.values())} shots): {case_shot_counts}")
+
+    for error_index, shots_for_this_case in tqdm(case_shot_counts.items()):
+        # Skip if this case was picked 0 times (e.g., if iters < len(Error_Cases))
+        if shots_for_this_case == 0:
+            continue
+
+        # 2. Build and transpile the circuit of this case once
+        with stage('circuit build'):
+            qc_main = encoding_func(error_type=error_type)
+        with stage('error injection'):
+            error_injection_func(qc_main, error_index, error_type=error_type)
+            qc_main.barrier()
+        with stage('circuit build'):
+            error_detection_func(qc_main, error_type=error_type)
+            qc_main.barrier()
+            if correction_mode == 'dynamic':
+                error_correction_func(qc_main, error_type=error_type)
+                qc_main.barrier()
+            decoding_func(qc_main, error_type=error_type)
+            qc_main.barrier()
+            qc_main.measure(0, 2) # q0 -> c2 (classical register)
+        with stage('transpile'):
+            trans_qc_main = transpile(qc_main, simulator)
+
+        # 3. Run Simulator (shots = number of iterations of this case)
+        with stage('simulate'):
+            result = simulator.run(trans_qc_main, shots=shots_for_this_case).result()
+        with stage('parse'):
+            counts = result.get_counts()
+            if correction_mode == 'deferred':
+                counts = apply_deferred_correction(counts, flip_table, 2)
+
+        # 4. Error Report (same logic as the per-iteration loop, weighted by count)
+        with stage('report'):
+            for measured_string, count in counts.items():
+                final_q0_value = measured_string[0] # decoded q0
+
+                if error_index is None: # No Error
+                    if final_q0_value == initial_q0_value:
+                        error_report['NE'] += count # NE
+                    else:
+                        error_report['UE'] += count # UE
+                else: # Error Injection
+                    if final_q0_value == initial_q0_value:
+                        error_report['CE'] += count # CE
+                    else:
+                        error_report['UE'] += count # UE
+
+    return error_report
 
 def main():
     Error_Cases = [None, 0, 1, 2] # No error / q0 error / q1 error / q2 error
     iters=1000
+    # 'hybrid': one multinomial draw of the iterations per error case, one circuit + transpile + multi-shot run per case
+    # 'per_iteration': one circuit + transpile + 1-shot run per iteration
+    simulation_mode = 'hybrid'
+    # 'dynamic': correction inside the circuit (if_test on the syndrome bits)
+    # 'deferred': static circuit (no if_test, Aer picks the stabilizer method), correction applied to the counts
+    #             by a syndrome -> readout flip table (common/deferred_correction.py)
+    correction_mode = 'dynamic'
+    if simulation_mode not in ['hybrid', 'per_iteration']:
+        print(f"Wrong Simulation Mode: {simulation_mode}")
+        sys.exit(1)
+    if correction_mode not in ['dynamic', 'deferred']:
+        print(f"Wrong Correction Mode: {correction_mode}")
+        sys.exit(1)
     error_report = {'NE':0, 'CE':0, 'UE':0} # No Error (NE) / Correctable Error (CE) / Uncorrectable Error (UE)
     simulator = AerSimulator()
+    # Profiling (common/stage_profiler.py): wall time / calls per stage are always recorded
+    profile_modes = [] # Opt-in: 'tracemalloc' (peak memory per stage), 'cprofile' (top functions)
+    profile_json_path = None # e.g., 'profile_001.json' (None -> print only)
+    profiler = StageProfiler('001 Repetition Code', profile_modes).start()
+
     ################ Repetition Code (X Error) ################
     print("--- Repetition Code (X Error) ---")
     error_type = 'X'
 
-    for iters_idx in tqdm(range(0, iters)):
-        # 1. Encoding
-        # initial value: q0 = |1>
-        # initial value: q0q1q2 -> |111>
-        initial_q0_value = '1'
-        qc_main=encoding_func(error_type=error_type)
-
-        # 2. Error Injection
-        error_injection_index = random.choice(Error_Cases)
-        error_injection_func(qc_main, error_injection_index, error_type=error_type)
-        qc_main.barrier()
-
-        # 3. Error Detection (store syndrome to c0, c1)
-        error_detection_func(qc_main, error_type=error_type)
-        qc_main.barrier()
-
-        # 4. Error Correction
-        error_correction_func(qc_main, error_type=error_type)
-        qc_main.barrier()
-
-        # 5. Decoding
-        decoding_func(qc_main, error_type=error_type)
-        qc_main.barrier()
-
-        # 6. Result report
-        qc_main.measure(0, 2) # q0 -> c2 (classical register)
-
-        # 7. Run Simulator
-        trans_qc_main = transpile(qc_main, simulator)
-        result = simulator.run(trans_qc_main, shots=1).result() # one shot (ideal case)
-        counts = result.get_counts()
-        measured_string = list(counts.keys())[0]
-
-        # 8. Error Report
-        # Qiskit has reverse bitstring: c2 (q0) c1 c0 (syndrome 2bit)
-        final_q0_value = measured_string[0] # c2 (q0)
-        syndrome_s1 = measured_string[1]    # c1
-        syndrome_s0 = measured_string[2]    # c0
-
-        if error_injection_index is None: # No Error
-            if final_q0_value == initial_q0_value:
-                error_report['NE'] += 1 # NE
-            else:
-                error_report['UE'] += 1 # UE
-        else: # Error Injection
-            if final_q0_value == initial_q0_value:
-                error_report['CE'] += 1 # CE
-            else:
-                error_report['UE'] += 1 # UE
-        
+    if simulation_mode == 'hybrid':
+        error_report = run_simulation_hybrid(simulator, error_type, iters, Error_Cases, correction_mode=correction_mode)
+    else:
+        flip_table = deferred_flip_table(error_type) if correction_mode == 'deferred' else None
+        for iters_idx in tqdm(range(0, iters)):
+            # 1. Encoding
+            # initial value: q0 = |1>
+            # initial value: q0q1q2 -> |111>
+            initial_q0_value = '1'
+            with stage('circuit build'):
+                qc_main=encoding_func(error_type=error_type)
+
+            # 2. Error Injection
+            with stage('error injection'):
+                error_injection_index = random.choice(Error_Cases)
+                error_injection_func(qc_main, error_injection_index, error_type=error_type)
+                qc_main.barrier()
+
+            with stage('circuit build'):
+                # 3. Error Detection (store syndrome to c0, c1)
+                error_detection_func(qc_main, error_type=error_type)
+                qc_main.barrier()
+
+                # 4. Error Correction
+                if correction_mode == 'dynamic':
+                    error_correction_func(qc_main, error_type=error_type)
+                    qc_main.barrier()
+
+                # 5. Decoding
+                decoding_func(qc_main, error_type=error_type)
+                qc_main.barrier()
+
+                # 6. Result report
+                qc_main.measure(0, 2) # q0 -> c2 (classical register)
+
+            # 7. Run Simulator
+            with stage('transpile'):
+                trans_qc_main = transpile(qc_main, simulator)
+            with stage('simulate'):
+                result = simulator.run(trans_qc_main, shots=1).result() # one shot (ideal case)
+            with stage('parse'):
+                counts = result.get_counts()
+                if correction_mode == 'deferred':
+                    counts = apply_deferred_correction(counts, flip_table, 2)
+                measured_string = list(counts.keys())[0]
+
+            # 8. Error Report
+            with stage('report'):
+                # Qiskit has reverse bitstring: c2 (q0) c1 c0 (syndrome 2bit)
+                final_q0_value = measured_string[0] # c2 (q0)
+                syndrome_s1 = measured_string[1]    # c1
+                syndrome_s0 = measured_string[2]    # c0
+
+                if error_injection_index is None: # No Error
+                    if final_q0_value == initial_q0_value:
+                        error_report['NE'] += 1 # NE
+                    else:
+                        error_report['UE'] += 1 # UE
+                else: # Error Injection
+                    if final_q0_value == initial_q0_value:
+                        error_report['CE'] += 1 # CE
+                    else:
+                        error_report['UE'] += 1 # UE
 
     print("Error Report (X Error):",error_report)
 
@@ -78,55 +187,74 @@ def main():
     error_report = {'NE':0, 'CE':0, 'UE':0}
     error_type = 'Z'
 
-    for iters_idx in tqdm(range(0, iters)):
-        # 1. Encoding
-        initial_q0_value = '1'
-        qc_main=encoding_func(error_type=error_type)
-
-        # 2. Error Injection
-        error_injection_index = random.choice(Error_Cases)
-        error_injection_func(qc_main, error_injection_index, error_type=error_type)
-        qc_main.barrier()
-
-        # 3. Error Detection (store syndrome to c0, c1)
-        error_detection_func(qc_main, error_type=error_type)
-        qc_main.barrier()
-
-        # 4. Error Correction
-        error_correction_func(qc_main, error_type=error_type)
-        qc_main.barrier()
-
-        # 5. Decoding
-        decoding_func(qc_main, error_type=error_type)
-        qc_main.barrier()
-
-        # 6. Result report
-        qc_main.measure(0, 2) # q0 -> c2 (classical register)
-
-        # 7. Run Simulator
-        trans_qc_main = transpile(qc_main, simulator)
-        result = simulator.run(trans_qc_main, shots=1).result() # one shot (ideal case)
-        counts = result.get_counts()
-        measured_string = list(counts.keys())[0]
-
-        # 8. Error Report
-        # Qiskit has reverse bitstring: c2 (q0) c1 c0 (syndrome 2bit)
-        final_q0_value = measured_string[0] # c2 (q0)
-        syndrome_s1 = measured_string[1]    # c1
-        syndrome_s0 = measured_string[2]    # c0
-
-        if error_injection_index is None: # No Error
-            if final_q0_value == initial_q0_value:
-                error_report['NE'] += 1 # NE
-            else:
-                error_report['UE'] += 1 # UE
-        else: # Error Injection
-            if final_q0_value == initial_q0_value:
-                error_report['CE'] += 1 # CE
-            else:
-                error_report['UE'] += 1 # UE
+    if simulation_mode == 'hybrid':
+        error_report = run_simulation_hybrid(simulator, error_type, iters, Error_Cases, correction_mode=correction_mode)
+    else:
+        flip_table = deferred_flip_table(error_type) if correction_mode == 'deferred' else None
+        for iters_idx in tqdm(range(0, iters)):
+            # 1. Encoding
+            initial_q0_value = '1'
+            with stage('circuit build'):
+                qc_main=encoding_func(error_type=error_type)
+
+            # 2. Error Injection
+            with stage('error injection'):
+                error_injection_index = random.choice(Error_Cases)
+                error_injection_func(qc_main, error_injection_index, error_type=error_type)
+                qc_main.barrier()
+
+            with stage('circuit build'):
+                # 3. Error Detection (store syndrome to c0, c1)
+                error_detection_func(qc_main, error_type=error_type)
+                qc_main.barrier()
+
+                # 4. Error Correction
+                if correction_mode == 'dynamic':
+                    error_correction_func(qc_main, error_type=error_type)
+                    qc_main.barrier()
+
+                # 5. Decoding
+                decoding_func(qc_main, error_type=error_type)
+                qc_main.barrier()
+
+                # 6. Result report
+                qc_main.measure(0, 2) # q0 -> c2 (classical register)
+
+            # 7. Run Simulator
+            with stage('transpile'):
+                trans_qc_main = transpile(qc_main, simulator)
+            with stage('simulate'):
+                result = simulator.run(trans_qc_main, shots=1).result() # one shot (ideal case)
+            with stage('parse'):
+                counts = result.get_counts()
+                if correction_mode == 'deferred':
+                    counts = apply_deferred_correction(counts, flip_table, 2)
+                measured_string = list(counts.keys())[0]
+
+            # 8. Error Report
+            with stage('report'):
+                # Qiskit has reverse bitstring: c2 (q0) c1 c0 (syndrome 2bit)
+                final_q0_value = measured_string[0] # c2 (q0)
+                syndrome_s1 = measured_string[1]    # c1
+                syndrome_s0 = measured_string[2]    # c0
+
+                if error_injection_index is None: # No Error
+                    if final_q0_value == initial_q0_value:
+                        error_report['NE'] += 1 # NE
+                    else:
+                        error_report['UE'] += 1 # UE
+                else: # Error Injection
+                    if final_q0_value == initial_q0_value:
+                        error_report['CE'] += 1 # CE
+                    else:
+                        error_report['UE'] += 1 # UE
 
     print("Error Report (Z Error):",error_report)
+
+    profiler.stop()
+    profiler.print_report()
+    if profile_json_path:
+        profiler.export_json(profile_json_path)
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,6 +1,7 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from qiskit.circuit import Gate
 import sys
+import numpy as np
 
 # Correct a 3-qubit bit-flip code block (X errors)
 def error_correction_bit_flip_block(qc, c, q_indices, c_indices):
@@ -65,4 +66,24 @@ def error_correction_func(qc):
         with qc.if_test((c[7], 1)):
             qc.z(6) # Apply Z_L = Z to Block 3
 
-    return
\ No newline at end of file
+    return
+
+# Parity-check matrices of the syndromes measured by error_detection_func (row i = syndrome bit):
+# H_Z: c0 ~ c5 = Z0Z1, Z1Z2, Z3Z4, Z4Z5, Z6Z7, Z7Z8 (bit-flip, X errors)
+# H_X: c6 ~ c7 = X0X1X2X3X4X5, X3X4X5X6X7X8 (phase-flip, Z errors)
+# The deferred correction mode (main.py) generates the syndrome tables of error_correction_func from them
+# (common/lookup_decoder.py): minimum-weight corrections, e.g., c0c1 = '10' -> X on q0, c6c7 = '10' -> Z on q0
+def parity_check_matrices_func():
+    H_Z = np.array([
+        [1, 1, 0, 0, 0, 0, 0, 0, 0],
+        [0, 1, 1, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 1, 1, 0, 0, 0, 0],
+        [0, 0, 0, 0, 1, 1, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 1, 1, 0],
+        [0, 0, 0, 0, 0, 0, 0, 1, 1],
+    ], dtype=np.uint8)
+    H_X = np.array([
+        [1, 1, 1, 1, 1, 1, 0, 0, 0],
+        [0, 0, 0, 1, 1, 1, 1, 1, 1],
+    ], dtype=np.uint8)
+    return H_X, H_Z
@@ -1,21 +1,159 @@
+import os
+import sys
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, transpile
 from collections import Counter
 from qiskit.circuit import Gate
 from qiskit_aer import AerSimulator
 from tqdm import tqdm
 import random
+import numpy as np
 from encoding import *
 from error_injection import *
 from error_detection import *
 from error_correction import *
 from decoding import *
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from stage_profiler import StageProfiler, stage
+from deferred_correction import logical_flip_table, apply_deferred_correction
+from lookup_decoder import CSSLookupDecoder
+from fault_enumeration import FaultEnumerator, print_fault_report, export_fault_report
+
+# Readout flip of every syndrome value for correction_mode = 'deferred' (common/deferred_correction.py)
+# The syndrome tables are generated from H_X / H_Z (common/lookup_decoder.py)
+def deferred_flip_table():
+    decoder = CSSLookupDecoder(*parity_check_matrices_func())
+    qc_decoding = QuantumCircuit(17)
+    decoding_func(qc_decoding)
+    return logical_flip_table(decoder.correction_table(), qc_decoding)
+
+# Simulates by distributing the total 'iters' among the Error_Cases with one multinomial draw,
+# then runs each case's circuit once with shots = its count (same NE/CE/UE statistics as the per-iteration loop).
+def run_simulation_hybrid(simulator, error_type, iters, Error_Cases, initial_q0_value='1', correction_mode='dynamic'):
+    error_report = {'NE':0, 'CE':0, 'UE':0}
+    flip_table = deferred_flip_table() if correction_mode == 'deferred' else None
+
+    # 1. Multinomial draw: how many of the 'iters' iterations land on each error case (uniform choice)
+    # (e.g., {None: 98, 0: 105, 1: 95, 2: 101, ...})
+    shot_counts = np.random.default_rng().multinomial(iters, [1 / len(Error_Cases)] * len(Error_Cases))
+    case_shot_counts = {error_index: int(count) for error_index, count in zip(Error_Cases, shot_counts)}
+    print(f"Random distribution (Total {sum(case_shot_counts.values())} shots): {case_shot_counts}")
+
+    for error_index, shots_for_this_case in tqdm(case_shot_counts.items()):
+        # Skip if this case was picked 0 times (e.g., if iters < len(Error_Cases))
+        if shots_for_this_case == 0:
+            continue
+
+        # 2. Build and transpile the circuit of this case once
+        with stage('circuit build'):
+            qc_main = encoding_func(initial_q0_value)
+        with stage('error injection'):
+            error_injection_func(qc_main, error_index, error_type=error_type)
+            qc_main.barrier()
+        with stage('circuit build'):
+            error_detection_func(qc_main)
+            qc_main.barrier()
+            if correction_mode == 'dynamic':
+                error_correction_func(qc_main)
+                qc_main.barrier()
+            decoding_func(qc_main)
+            qc_main.barrier()
+            qc_main.measure(0, 8) # q0 -> c8
+        with stage('transpile'):
+            trans_qc_main = transpile(qc_main, simulator)
+
+        # 3. Run Simulator (shots = number of iterations of this case)
+        with stage('simulate'):
+            result = simulator.run(trans_qc_main, shots=shots_for_this_case).result()
+        with stage('parse'):
+            counts = result.get_counts()
+            if correction_mode == 'deferred':
+                counts = apply_deferred_correction(counts, flip_table, 8)
+
+        # 4. Error Report (same logic as the per-iteration loop, weighted by count)
+        with stage('report'):
+            for measured_string, count in counts.items():
+                final_q0_value = measured_string[0] # decoded q0
+
+                if error_index is None: # No Error
+                    if final_q0_value == initial_q0_value:
+                        error_report['NE'] += count # NE
+                    else:
+                        error_report['UE'] += count # UE
+                else: # Error Injection
+                    if final_q0_value == initial_q0_value:
+                        error_report['CE'] += count # CE
+                    else:
+                        error_report['UE'] += count # UE
+
+    return error_report
+
+# Appends syndrome detection, correction, decoding and the q0 readout (c8) to an encoded circuit
+def append_correction_and_readout(qc, correction_mode='dynamic'):
+    error_detection_func(qc)
+    qc.barrier()
+    if correction_mode == 'dynamic':
+        error_correction_func(qc)
+        qc.barrier()
+    decoding_func(qc)
+    qc.barrier()
+    qc.measure(0, 8) # q0 -> c8
+
+# Visits every single-qubit Pauli fault (X, Y, Z on q0 ~ q8) exactly once, and every weight-2 pair if max_weight=2
+def run_fault_enumeration(simulator, max_weight=1, json_path=None, initial_q0_value='1', correction_mode='dynamic'):
+    print(f"--- Shor Code [Fault Enumeration, weight <= {max_weight}] ---")
+    postprocess_counts = None
+    if correction_mode == 'deferred':
+        flip_table = deferred_flip_table()
+        postprocess_counts = lambda counts: apply_deferred_correction(counts, flip_table, 8)
+    enumerator = FaultEnumerator(
+        'Shor Code', 9,
+        encode=lambda: encoding_func(initial_q0_value),
+        inject=lambda qc, qubit, pauli: error_injection_func(qc, qubit, error_type=pauli),
+        finish=lambda qc: append_correction_and_readout(qc, correction_mode),
+        simulator=simulator, expected_value=initial_q0_value, postprocess_counts=postprocess_counts
+    )
+    report = enumerator.run(max_weight)
+    with stage('report'):
+        print_fault_report(report)
+        if json_path:
+            export_fault_report(report, json_path)
+    return report
 
 def main():
     # Shor code uses 9 data qubits
     Error_Cases = [None, 0, 1, 2, 3, 4, 5, 6, 7, 8] # No error / q0 error / ... / q8 error
     iters = 1000 # Number of simulations
+    # 'hybrid': one multinomial draw of the iterations per error case, one circuit + transpile + multi-shot run per case
+    # 'per_iteration': one circuit + transpile + 1-shot run per iteration
+    # 'enumerate': every single-qubit X/Y/Z fault exactly once (+ weight-2 pairs with enumeration_max_weight = 2)
+    simulation_mode = 'hybrid'
+    enumeration_max_weight = 1
+    enumeration_json_path = None # e.g., 'faults_002.json' (outcome of every fault)
+    # 'dynamic': correction inside the circuit (if_test on the syndrome bits)
+    # 'deferred': static circuit (no if_test, Aer picks the stabilizer method), correction applied to the counts
+    #             by a syndrome -> readout flip table (common/deferred_correction.py)
+    correction_mode = 'dynamic'
+    if simulation_mode not in ['hybrid', 'per_iteration', 'enumerate']:
+        print(f"Wrong Simulation Mode: {simulation_mode}")
+        sys.exit(1)
+    if correction_mode not in ['dynamic', 'deferred']:
+        print(f"Wrong Correction Mode: {correction_mode}")
+        sys.exit(1)
     error_report = {'NE':0, 'CE':0, 'UE':0} # No Error (NE) / Correctable Error (CE) / Uncorrectable Error (UE)
     simulator = AerSimulator()
+    # Profiling (common/stage_profiler.py): wall time / calls per stage are always recorded
+    profile_modes = [] # Opt-in: 'tracemalloc' (peak memory per stage), 'cprofile' (top functions)
+    profile_json_path = None # e.g., 'profile_002.json' (None -> print only)
+    profiler = StageProfiler('002 Shor Code', profile_modes).start()
+
+    if simulation_mode == 'enumerate':
+        # Replaces the random X / Z / Y runs below
+        run_fault_enumeration(simulator, enumeration_max_weight, enumeration_json_path, correction_mode=correction_mode)
+        profiler.stop()
+        profiler.print_report()
+        if profile_json_path:
+            profiler.export_json(profile_json_path)
+        return
 
     # Shor Code configuration
     # 17 qubits (9 data + 8 ancilla) / 9 classical bits (8 syndrome + 1 result)
@@ -26,55 +164,68 @@ def main():
     error_report = {'NE':0, 'CE':0, 'UE':0} # error report reset
     error_type = 'X'
 
-    for iters_idx in tqdm(range(0, iters)):
-        # 1. Encoding
-        initial_q0_value = '1' # Test with logical |1>
-        qc_main = encoding_func(initial_q0_value) # Create a 17-qubit, 9-classical-bit circuit
-
-        # 2. Error Injection
-        error_injection_index = random.choice(Error_Cases) # None, 0, 1, ... 8
-        error_injection_func(qc_main, error_injection_index, error_type=error_type)
-        qc_main.barrier()
-
-        # 3. Error Detection (store syndrome to c0~c7)
-        error_detection_func(qc_main)
-        qc_main.barrier()
-
-        # 4. Error Correction (Based on c0~c7 values)
-        error_correction_func(qc_main)
-        qc_main.barrier()
-
-        # 5. Decoding (Restore logical state to q0)
-        decoding_func(qc_main)
-        qc_main.barrier()
-
-        # 6. Result report
-        qc_main.measure(0, 8) # Measure final logical qubit q0 -> c8
-
-        # 7. Run Simulator
-        trans_qc_main = transpile(qc_main, simulator)
-        result = simulator.run(trans_qc_main, shots=1).result() # one shot
-        counts = result.get_counts()
-        measured_string = list(counts.keys())[0]
-
-        # 8. Error Report
-        # Qiskit bitstring order (reversed): c8 c7 c6 c5 c4 c3 c2 c1 c0
-        final_q0_value = measured_string[0]    # c8 (final result)
-        syndrome_bits = measured_string[1:]  # c7 ~ c0 (syndromes)
-
-        if error_injection_index is None: # No Error
-            if final_q0_value == initial_q0_value:
-                error_report['NE'] += 1 # NE
-            else:
-                error_report['UE'] += 1 # UE
-        else: # Error Injection
-            if final_q0_value == initial_q0_value:
-                error_report['CE'] += 1 # CE
-            else:
-                # Print error for debugging
-                # print(f"UE: Error on q{error_injection_index}, Type: {error_type}, Syndromes: {syndrome_bits}, Result: {final_q0_value}")
-                error_report['UE'] += 1 # UE
-        
+    if simulation_mode == 'hybrid':
+        error_report = run_simulation_hybrid(simulator, error_type, iters, Error_Cases, correction_mode=correction_mode)
+    else:
+        flip_table = deferred_flip_table() if correction_mode == 'deferred' else None
+        for iters_idx in tqdm(range(0, iters)):
+            # 1. Encoding
+            initial_q0_value = '1' # Test with logical |1>
+            with stage('circuit build'):
+                qc_main = encoding_func(initial_q0_value) # Create a 17-qubit, 9-classical-bit circuit
+
+            # 2. Error Injection
+            with stage('error injection'):
+                error_injection_index = random.choice(Error_Cases) # None, 0, 1, ... 8
+                error_injection_func(qc_main, error_injection_index, error_type=error_type)
+                qc_main.barrier()
+
+            with stage('circuit build'):
+                # 3. Error Detection (store syndrome to c0~c7)
+                error_detection_func(qc_main)
+                qc_main.barrier()
+
+                # 4. Error Correction (Based on c0~c7 values)
+                if correction_mode == 'dynamic':
+                    error_correction_func(qc_main)
+                    qc_main.barrier()
+
+                # 5. Decoding (Restore logical state to q0)
+                decoding_func(qc_main)
+                qc_main.barrier()
+
+                # 6. Result report
+                qc_main.measure(0, 8) # Measure final logical qubit q0 -> c8
+
+            # 7. Run Simulator
+            with stage('transpile'):
+                trans_qc_main = transpile(qc_main, simulator)
+            with stage('simulate'):
+                result = simulator.run(trans_qc_main, shots=1).result() # one shot
+            with stage('parse'):
+                counts = result.get_counts()
+                if correction_mode == 'deferred':
+                    counts = apply_deferred_correction(counts, flip_table, 8)
+                measured_string = list(counts.keys())[0]
+
+            # 8. Error Report
+            with stage('report'):
+                # Qiskit bitstring order (reversed): c8 c7 c6 c5 c4 c3 c2 c1 c0
+                final_q0_value = measured_string[0]    # c8 (final result)
+                syndrome_bits = measured_string[1:]  # c7 ~ c0 (syndromes)
+
+                if error_injection_index is None: # No Error
+                    if final_q0_value == initial_q0_value:
+                        error_report['NE'] += 1 # NE
+                    else:
+                        error_report['UE'] += 1 # UE
+                else: # Error Injection
+                    if final_q0_value == initial_q0_value:
+                        error_report['CE'] += 1 # CE
+                    else:
+                        # Print error for debugging
+                        # print(f"UE: Error on q{error_injection_index}, Type: {error_type}, Syndromes: {syndrome_bits}, Result: {final_q0_value}")
+                        error_report['UE'] += 1 # UE
 
     print("Error Report (X Error):", error_report)
 
@@ -83,52 +234,66 @@ def main():
     error_report = {'NE':0, 'CE':0, 'UE':0} # error report reset
     error_type = 'Z'
 
-    for iters_idx in tqdm(range(0, iters)):
-        # 1. Encoding
-        initial_q0_value = '1'
-        qc_main = encoding_func(initial_q0_value)
-
-        # 2. Error Injection
-        error_injection_index = random.choice(Error_Cases)
-        error_injection_func(qc_main, error_injection_index, error_type=error_type)
-        qc_main.barrier()
-
-        # 3. Error Detection
-        error_detection_func(qc_main)
-        qc_main.barrier()
-
-        # 4. Error Correction
-        error_correction_func(qc_main)
-        qc_main.barrier()
-
-        # 5. Decoding
-        decoding_func(qc_main)
-        qc_main.barrier()
-
-        # 6. Result report
-        qc_main.measure(0, 8) # q0 -> c8
-
-        # 7. Run Simulator
-        trans_qc_main = transpile(qc_main, simulator)
-        result = simulator.run(trans_qc_main, shots=1).result()
-        counts = result.get_counts()
-        measured_string = list(counts.keys())[0]
-
-        # 8. Error Report
-        final_q0_value = measured_string[0] # c8
-        syndrome_bits = measured_string[1:] # c7-c0
-
-        if error_injection_index is None: # No Error
-            if final_q0_value == initial_q0_value:
-                error_report['NE'] += 1 # NE
-            else:
-                error_report['UE'] += 1 # UE
-        else: # Error Injection
-            if final_q0_value == initial_q0_value:
-                error_report['CE'] += 1 # CE
-            else:
-                # print(f"UE: Error on q{error_injection_index}, Type: {error_type}, Syndromes: {syndrome_bits}, Result: {final_q0_value}")
-                error_report['UE'] += 1 # UE
+    if simulation_mode == 'hybrid':
+        error_report = run_simulation_hybrid(simulator, error_type, iters, Error_Cases, correction_mode=correction_mode)
+    else:
+        flip_table = deferred_flip_table() if correction_mode == 'deferred' else None
+        for iters_idx in tqdm(range(0, iters)):
+            # 1. Encoding
+            initial_q0_value = '1'
+            with stage('circuit build'):
+                qc_main = encoding_func(initial_q0_value)
+
+            # 2. Error Injection
+            with stage('error injection'):
+                error_injection_index = random.choice(Error_Cases)
+                error_injection_func(qc_main, error_injection_index, error_type=error_type)
+                qc_main.barrier()
+
+            with stage('circuit build'):
+                # 3. Error Detection
+                error_detection_func(qc_main)
+                qc_main.barrier()
+
+                # 4. Error Correction
+                if correction_mode == 'dynamic':
+                    error_correction_func(qc_main)
+                    qc_main.barrier()
+
+                # 5. Decoding
+                decoding_func(qc_main)
+                qc_main.barrier()
+
+                # 6. Result report
+                qc_main.measure(0, 8) # q0 -> c8
+
+            # 7. Run Simulator
+            with stage('transpile'):
+                trans_qc_main = transpile(qc_main, simulator)
+            with stage('simulate'):
+                result = simulator.run(trans_qc_main, shots=1).result()
+            with stage('parse'):
+                counts = result.get_counts()
+                if correction_mode == 'deferred':
+                    counts = apply_deferred_correction(counts, flip_table, 8)
+                measured_string = list(counts.keys())[0]
+
+            # 8. Error Report
+            with stage('report'):
+                final_q0_value = measured_string[0] # c8
+                syndrome_bits = measured_string[1:] # c7-c0
+
+                if error_injection_index is None: # No Error
+                    if final_q0_value == initial_q0_value:
+                        error_report['NE'] += 1 # NE
+                    else:
+                        error_report['UE'] += 1 # UE
+                else: # Error Injection
+                    if final_q0_value == initial_q0_value:
+                        error_report['CE'] += 1 # CE
+                    else:
+                        # print(f"UE: Error on q{error_injection_index}, Type: {error_type}, Syndromes: {syndrome_bits}, Result: {final_q0_value}")
+                        error_report['UE'] += 1 # UE
 
     print("Error Report (Z Error):", error_report)
 
@@ -137,55 +302,74 @@ def main():
     error_report = {'NE':0, 'CE':0, 'UE':0} # error report reset
     error_type = 'Y' # Y = XZ
 
-    for iters_idx in tqdm(range(0, iters)):
-        # 1. Encoding
-        initial_q0_value = '1'
-        qc_main = encoding_func(initial_q0_value)
-
-        # 2. Error Injection
-        error_injection_index = random.choice(Error_Cases)
-        error_injection_func(qc_main, error_injection_index, error_type=error_type)
-        qc_main.barrier()
-
-        # 3. Error Detection
-        error_detection_func(qc_main)
-        qc_main.barrier()
-
-        # 4. Error Correction
-        error_correction_func(qc_main)
-        qc_main.barrier()
-
-        # 5. Decoding
-        decoding_func(qc_main)
-        qc_main.barrier()
-
-        # 6. Result report
-        qc_main.measure(0, 8) # q0 -> c8
-
-        # 7. Run Simulator
-        trans_qc_main = transpile(qc_main, simulator)
-        result = simulator.run(trans_qc_main, shots=1).result()
-        counts = result.get_counts()
-        measured_string = list(counts.keys())[0]
-
-        # 8. Error Report
-        final_q0_value = measured_string[0] # c8
-        syndrome_bits = measured_string[1:] # c7-c0
-
-        if error_injection_index is None: # No Error
-            if final_q0_value == initial_q0_value:
-                error_report['NE'] += 1 # NE
-            else:
-                error_report['UE'] += 1 # UE
-        else: # Error Injection
-            if final_q0_value == initial_q0_value:
-                error_report['CE'] += 1 # CE
-            else:
-                # print(f"UE: Error on q{error_injection_index}, Type: {error_type}, Syndromes: {syndrome_bits}, Result: {final_q0_value}")
-                error_report['UE'] += 1 # UE
+    if simulation_mode == 'hybrid':
+        error_report = run_simulation_hybrid(simulator, error_type, iters, Error_Cases, correction_mode=correction_mode)
+    else:
+        flip_table = deferred_flip_table() if correction_mode == 'deferred' else None
+        for iters_idx in tqdm(range(0, iters)):
+            # 1. Encoding
+            initial_q0_value = '1'
+            with stage('circuit build'):
+                qc_main = encoding_func(initial_q0_value)
+
+            # 2. Error Injection
+            with stage('error injection'):
+                error_injection_index = random.choice(Error_Cases)
+                error_injection_func(qc_main, error_injection_index, error_type=error_type)
+                qc_main.barrier()
+
+            with stage('circuit build'):
+                # 3. Error Detection
+                error_detection_func(qc_main)
+                qc_main.barrier()
+
+                # 4. Error Correction
+                if correction_mode == 'dynamic':
+                    error_correction_func(qc_main)
+                    qc_main.barrier()
+
+                # 5. Decoding
+                decoding_func(qc_main)
+                qc_main.barrier()
+
+                # 6. Result report
+                qc_main.measure(0, 8) # q0 -> c8
+
+            # 7. Run Simulator
+            with stage('transpile'):
+                trans_qc_main = transpile(qc_main, simulator)
+            with stage('simulate'):
+                result = simulator.run(trans_qc_main, shots=1).result()
+            with stage('parse'):
+                counts = result.get_counts()
+                if correction_mode == 'deferred':
+                    counts = apply_deferred_correction(counts, flip_table, 8)
+                measured_string = list(counts.keys())[0]
+
+            # 8. Error Report
+            with stage('report'):
+                final_q0_value = measured_string[0] # c8
+                syndrome_bits = measured_string[1:] # c7-c0
+
+                if error_injection_index is None: # No Error
+                    if final_q0_value == initial_q0_value:
+                        error_report['NE'] += 1 # NE
+                    else:
+                        error_report['UE'] += 1 # UE
+                else: # Error Injection
+                    if final_q0_value == initial_q0_value:
+                        error_report['CE'] += 1 # CE
+                    else:
+                        # print(f"UE: Error on q{error_injection_index}, Type: {error_type}, Syndromes: {syndrome_bits}, Result: {final_q0_value}")
+                        error_report['UE'] += 1 # UE
 
     print("Error Report (Y Error):", error_report)
 
+    profiler.stop()
+    profiler.print_report()
+    if profile_json_path:
+        profiler.export_json(profile_json_path)
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import sys
+import numpy as np
+from qiskit_aer import AerSimulator
+from encoding import *
+from error_injection import *
+from error_correction import *
+import main as steane_main
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from css_code import CSSCode, CSSDecoder, fault_outcomes, exact_code_capacity_ler, run_memory_experiment
+from fault_enumeration import FaultEnumerator
+from deferred_correction import apply_deferred_correction
+
+# --- Steane Code as a CSSCode (common/css_code.py) ---
+# The code is only H_X / H_Z (parity_check_matrices_func, Hamming [7, 4, 3]) and the logical operators
+# X_L = X^7, Z_L = Z^7. Circuits, fault model and decoder are generated by the framework and checked
+# against the circuits of this folder (encoding -> fault -> detection -> correction -> decoding).
+def steane_css_code():
+    H_X, H_Z = parity_check_matrices_func()
+    return CSSCode('Steane Code', H_X, H_Z, logical_x=np.ones(7, dtype=np.uint8), logical_z=np.ones(7, dtype=np.uint8))
+
+# Outcome of every fault (weight <= max_weight) in the circuits of this folder (deferred correction, stabilizer method)
+def folder_fault_outcomes(simulator, max_weight=2, initial_q0_value='1'):
+    flip_table = steane_main.deferred_flip_table()
+    enumerator = FaultEnumerator(
+        'Steane Code', 7,
+        encode=lambda: encoding_func(initial_q0_value),
+        inject=lambda qc, qubit, pauli: error_injection_func(qc, qubit, error_type=pauli),
+        finish=lambda qc: steane_main.append_correction_and_readout(qc, 'deferred'),
+        simulator=simulator, expected_value=initial_q0_value,
+        postprocess_counts=lambda counts: apply_deferred_correction(counts, flip_table, 6)
+    )
+    return enumerator.run(max_weight, show_progress=False)
+
+def main():
+    max_weight = 2 # Faults compared with the circuits of this folder (weight 2: 189 Pauli pairs)
+    physical_error_rates = [0.01, 0.05, 0.1]
+    num_shots = 100000 # Monte Carlo shots per p (memory_circuit, Pauli-frame simulator)
+    seed = 2024
+
+    code = steane_css_code()
+    print(f"--- {code.name} (CSSCode) ---")
+    print(f"[[n, k, d]] = [[{code.num_data_qubits}, {code.num_logical_qubits}, {code.distance()}]]")
+
+    # 1. Every fault: CSSCode lookup decoder vs. the circuits of this folder
+    decoder = CSSDecoder(code, 'lookup', basis='Z')
+    css_report = fault_outcomes(decoder, max_weight)
+    folder_report = folder_fault_outcomes(AerSimulator(), max_weight)
+    mismatches = [(css['fault'], css['outcome'], folder['outcome'])
+                  for css, folder in zip(css_report['faults'], folder_report['faults']) if css['outcome'] != folder['outcome']]
+    print(f"\n--- Fault Outcomes (weight <= {max_weight}) ---")
+    for weight in css_report['summary']:
+        print(f"Weight {weight}: CSSCode {css_report['summary'][weight]} | folder circuits {folder_report['summary'][weight]}")
+    print(f"Same outcome: {len(css_report['faults']) - len(mismatches)}/{len(css_report['faults'])} faults")
+    for fault, css_outcome, folder_outcome in mismatches:
+        print(f"  {fault}: CSSCode {css_outcome}, folder circuits {folder_outcome}")
+
+    # 2. Code capacity LER: Monte Carlo on the generated circuit vs. exact (all 2^7 patterns)
+    print(f"\n--- Code Capacity LER (Z memory, lookup decoder, {num_shots} shots per p) ---")
+    print(f"{'p':>6} | {'Monte Carlo':>11} | {'exact':>9}")
+    for p in physical_error_rates:
+        report = run_memory_experiment(code, num_shots, p, 'code_capacity', 'lookup', seed=seed)
+        print(f"{p:>6} | {report['UE'] / num_shots:>11.6f} | {exact_code_capacity_ler(decoder, p):>9.6f}")
+
+if __name__ == '__main__':
+    main()
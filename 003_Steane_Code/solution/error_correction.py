@@ -1,6 +1,7 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from qiskit.circuit import Gate
 import sys
+import numpy as np
 
 # Applies correction operations (X, Z) based on the measured syndrome bits
 def error_correction_func(qc):
@@ -117,4 +118,17 @@ def error_correction_func(qc):
             with qc.if_test((c_reg[5], 1)):
                 qc.z(6)
     
-    return
\ No newline at end of file
+    return
+
+# Parity-check matrices of the syndromes measured by error_detection_func (row i = syndrome bit):
+# H_Z: c0 ~ c2 = Z0Z2Z4Z6, Z1Z2Z5Z6, Z3Z4Z5Z6 (X errors) / H_X: c3 ~ c5 = same supports with X (Z errors)
+# Column q is the binary number q + 1 (Hamming [7, 4, 3]), so a single error on q gives the syndrome q + 1.
+# The deferred correction mode (main.py) generates the syndrome tables of error_correction_func from them
+# (common/lookup_decoder.py)
+def parity_check_matrices_func():
+    hamming = np.array([
+        [1, 0, 1, 0, 1, 0, 1],
+        [0, 1, 1, 0, 0, 1, 1],
+        [0, 0, 0, 1, 1, 1, 1],
+    ], dtype=np.uint8)
+    return hamming.copy(), hamming.copy() # H_X, H_Z
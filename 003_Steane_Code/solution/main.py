@@ -1,7 +1,9 @@
+import os
+import sys
 from qiskit import QuantumCircuit, transpile
 from qiskit_aer import AerSimulator
 from collections import Counter
-import random # Re-importing for random distribution
+import numpy as np
 from qiskit.circuit import Gate
 
 from encoding import *
@@ -9,40 +11,56 @@ from error_injection import *
 from error_detection import *
 from error_correction import *
 from decoding import *
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from stage_profiler import StageProfiler, stage
+from deferred_correction import logical_flip_table, apply_deferred_correction
+from lookup_decoder import CSSLookupDecoder
+from fault_enumeration import FaultEnumerator, print_fault_report, export_fault_report
+
+# Readout flip of every syndrome value for correction_mode = 'deferred' (common/deferred_correction.py)
+# The syndrome tables are generated from H_X / H_Z (common/lookup_decoder.py)
+def deferred_flip_table():
+    decoder = CSSLookupDecoder(*parity_check_matrices_func())
+    qc_decoding = QuantumCircuit(13)
+    decoding_func(qc_decoding)
+    return logical_flip_table(decoder.correction_table(), qc_decoding)
 
 # Simulates by randomly distributing the total 'iters' among the Error_Cases.
-def run_simulation_hybrid(simulator, error_type, iters, Error_Cases, initial_q0_value='1'):
+def run_simulation_hybrid(simulator, error_type, iters, Error_Cases, initial_q0_value='1', correction_mode='dynamic'):
     print(f"--- Steane Code ({error_type} Error) [Hybrid Random Sampling] ---")
     error_report = {'NE':0, 'CE':0, 'UE':0}
+    flip_table = deferred_flip_table() if correction_mode == 'deferred' else None
     
-    # 1. Randomly pick from the 8 error cases 'iters' number of times.
+    # 1-2. One multinomial draw: how many of the 'iters' trials land on each of the 8 error cases (uniform choice)
     print(f"Generating random distribution for {iters} total trials...")
-    # (e.g., make 1000 picks)
-    trial_picks = random.choices(Error_Cases, k=iters)
-    
-    # 2. Count how many times each case was picked.
     # (e.g., {None: 98, 0: 105, 1: 95, 2: 101, ...})
-    case_shot_counts = Counter(trial_picks)
-    print(f"Random distribution (Total {sum(case_shot_counts.values())} shots): {dict(case_shot_counts)}")
+    shot_counts = np.random.default_rng().multinomial(iters, [1 / len(Error_Cases)] * len(Error_Cases))
+    case_shot_counts = {error_index: int(count) for error_index, count in zip(Error_Cases, shot_counts)}
+    print(f"Random distribution (Total {sum(case_shot_counts.values())} shots): {case_shot_counts}")
 
     # 3. Pre-generate and transpile the 8 base circuits.
     # (Prepare them in advance to avoid creating them in a loop)
     print("Preparing and transpiling 8 base circuits...")
     transpiled_circuits_map = {}
     for error_index in Error_Cases:
-        qc = encoding_func(initial_q0_value)
-        error_injection_func(qc, error_index, error_type=error_type)
-        qc.barrier()
-        error_detection_func(qc)
-        qc.barrier()
-        error_correction_func(qc)
-        qc.barrier()
-        decoding_func(qc)
-        qc.barrier()
-        qc.measure(0, 6) # q0 -> c6
+        with stage('circuit build'):
+            qc = encoding_func(initial_q0_value)
+        with stage('error injection'):
+            error_injection_func(qc, error_index, error_type=error_type)
+            qc.barrier()
+        with stage('circuit build'):
+            error_detection_func(qc)
+            qc.barrier()
+            if correction_mode == 'dynamic':
+                error_correction_func(qc)
+                qc.barrier()
+            decoding_func(qc)
+            qc.barrier()
+            qc.measure(0, 6) # q0 -> c6
         
         # Store the transpiled circuit in a dictionary
-        transpiled_circuits_map[error_index] = transpile(qc, simulator)
+        with stage('transpile'):
+            transpiled_circuits_map[error_index] = transpile(qc, simulator)
 
     # 4. Run 'individual' simulations for each case with its 'randomly assigned shot count'
     print("Running simulations with random shot counts...")
@@ -53,38 +71,102 @@ def run_simulation_hybrid(simulator, error_type, iters, Error_Cases, initial_q0_
             
         trans_qc = transpiled_circuits_map[error_index]
         # Run only for the number of shots assigned to this case (e.g., 98 shots)
-        result = simulator.run(trans_qc, shots=shots_for_this_case).result()
-        counts = result.get_counts()
+        with stage('simulate'):
+            result = simulator.run(trans_qc, shots=shots_for_this_case).result()
+        with stage('parse'):
+            counts = result.get_counts()
+            if correction_mode == 'deferred':
+                counts = apply_deferred_correction(counts, flip_table, 6)
         
         # 5. Aggregate results (same logic as before)
-        for measured_string, count in counts.items():
-            final_q0_value = measured_string[0] # c6
-            
-            if error_index is None: # 'No Error' case
-                if final_q0_value == initial_q0_value:
-                    error_report['NE'] += count
-                else:
-                    error_report['UE'] += count
-            else: # 'Error Injected' case
-                if final_q0_value == initial_q0_value:
-                    error_report['CE'] += count
-                else:
-                    error_report['UE'] += count
+        with stage('report'):
+            for measured_string, count in counts.items():
+                final_q0_value = measured_string[0] # c6
+                
+                if error_index is None: # 'No Error' case
+                    if final_q0_value == initial_q0_value:
+                        error_report['NE'] += count
+                    else:
+                        error_report['UE'] += count
+                else: # 'Error Injected' case
+                    if final_q0_value == initial_q0_value:
+                        error_report['CE'] += count
+                    else:
+                        error_report['UE'] += count
                         
     print(f"Error Report ({error_type} Error):", error_report)
     return error_report
 
+# Appends syndrome detection, correction, decoding and the q0 readout (c6) to an encoded circuit
+def append_correction_and_readout(qc, correction_mode='dynamic'):
+    error_detection_func(qc)
+    qc.barrier()
+    if correction_mode == 'dynamic':
+        error_correction_func(qc)
+        qc.barrier()
+    decoding_func(qc)
+    qc.barrier()
+    qc.measure(0, 6) # q0 -> c6
+
+# Visits every single-qubit Pauli fault (X, Y, Z on q0 ~ q6) exactly once, and every weight-2 pair if max_weight=2
+def run_fault_enumeration(simulator, max_weight=1, json_path=None, initial_q0_value='1', correction_mode='dynamic'):
+    print(f"--- Steane Code [Fault Enumeration, weight <= {max_weight}] ---")
+    postprocess_counts = None
+    if correction_mode == 'deferred':
+        flip_table = deferred_flip_table()
+        postprocess_counts = lambda counts: apply_deferred_correction(counts, flip_table, 6)
+    enumerator = FaultEnumerator(
+        'Steane Code', 7,
+        encode=lambda: encoding_func(initial_q0_value),
+        inject=lambda qc, qubit, pauli: error_injection_func(qc, qubit, error_type=pauli),
+        finish=lambda qc: append_correction_and_readout(qc, correction_mode),
+        simulator=simulator, expected_value=initial_q0_value, postprocess_counts=postprocess_counts
+    )
+    report = enumerator.run(max_weight)
+    with stage('report'):
+        print_fault_report(report)
+        if json_path:
+            export_fault_report(report, json_path)
+    return report
+
 def main():
     # Steane code uses 7 data qubits
     Error_Cases = [None, 0, 1, 2, 3, 4, 5, 6] # No error / q0 error / ... / q6 error
     iters = 1000 # Total number of simulation iterations
     simulator = AerSimulator()
     initial_q0_value = '1' # The logical state to test
+    # 'hybrid': random error cases (one multinomial draw, one multi-shot run per case) per error type
+    # 'enumerate': every single-qubit X/Y/Z fault exactly once (+ weight-2 pairs with enumeration_max_weight = 2)
+    simulation_mode = 'hybrid'
+    enumeration_max_weight = 1
+    enumeration_json_path = None # e.g., 'faults_003.json' (outcome of every fault)
+    # 'dynamic': correction inside the circuit (if_test on the syndrome bits)
+    # 'deferred': static circuit (no if_test, Aer picks the stabilizer method), correction applied to the counts
+    #             by a syndrome -> readout flip table (common/deferred_correction.py)
+    correction_mode = 'dynamic'
+    if simulation_mode not in ['hybrid', 'enumerate']:
+        print(f"Wrong Simulation Mode: {simulation_mode}")
+        sys.exit(1)
+    if correction_mode not in ['dynamic', 'deferred']:
+        print(f"Wrong Correction Mode: {correction_mode}")
+        sys.exit(1)
+    # Profiling (common/stage_profiler.py): wall time / calls per stage are always recorded
+    profile_modes = [] # Opt-in: 'tracemalloc' (peak memory per stage), 'cprofile' (top functions)
+    profile_json_path = None # e.g., 'profile_003.json' (None -> print only)
+    profiler = StageProfiler('003 Steane Code', profile_modes).start()
+
+    if simulation_mode == 'enumerate':
+        run_fault_enumeration(simulator, enumeration_max_weight, enumeration_json_path, initial_q0_value, correction_mode)
+    else:
+        # --- Run 'hybrid' simulation for each error type ---
+        run_simulation_hybrid(simulator, 'X', iters, Error_Cases, initial_q0_value, correction_mode)
+        run_simulation_hybrid(simulator, 'Z', iters, Error_Cases, initial_q0_value, correction_mode)
+        run_simulation_hybrid(simulator, 'Y', iters, Error_Cases, initial_q0_value, correction_mode)
 
-    # --- Run 'hybrid' simulation for each error type ---
-    run_simulation_hybrid(simulator, 'X', iters, Error_Cases, initial_q0_value)
-    run_simulation_hybrid(simulator, 'Z', iters, Error_Cases, initial_q0_value)
-    run_simulation_hybrid(simulator, 'Y', iters, Error_Cases, initial_q0_value)
+    profiler.stop()
+    profiler.print_report()
+    if profile_json_path:
+        profiler.export_json(profile_json_path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,76 @@
+import time
+import numpy as np
+import error_correction
+import error_injection
+import surface_code_layout
+
+# Decoder benchmark: accuracy (LER) and speed of every decoder engine on the same shots.
+# Shots are sampled with a phenomenological noise model directly in NumPy (no circuit simulation):
+#   each round, every data qubit gets an X (Z) error with p_data_x (p_data_z), the errors accumulate,
+#   and every syndrome bit is flipped with p_meas_z (p_meas_x).
+
+def sample_phenomenological_shots(decoder, num_shots, p_data_x, p_data_z, p_meas_x, p_meas_z, rng):
+    """
+    Returns:
+        tuple: (sx, sz, res) uint8 arrays in the decode_batch format.
+    """
+    num_rounds = decoder.num_rounds
+    num_data_qubits = decoder.num_data_qubits
+
+    x_errors = np.zeros((num_shots, num_data_qubits), dtype=np.uint8)
+    z_errors = np.zeros((num_shots, num_data_qubits), dtype=np.uint8)
+    sx = np.zeros((num_shots, num_rounds, decoder.num_x_ancillas), dtype=np.uint8)
+    sz = np.zeros((num_shots, num_rounds, decoder.num_z_ancillas), dtype=np.uint8)
+
+    for r in range(num_rounds):
+        x_errors ^= (rng.random(x_errors.shape) < p_data_x)
+        z_errors ^= (rng.random(z_errors.shape) < p_data_z)
+        sz[:, r] = error_correction.gf2_product_packed(error_correction.pack_gf2(x_errors), decoder.H_Z_packed)
+        sx[:, r] = error_correction.gf2_product_packed(error_correction.pack_gf2(z_errors), decoder.H_X_packed)
+
+    sx, sz = error_injection.inject_measurement_errors_batch(sx, sz, p_meas_x, p_meas_z, rng)
+    res = x_errors # Final data qubit measurement (|0_L> input, Z-basis readout)
+    return sx, sz, res
+
+def main():
+    # 0. Setup (same layout as main.py)
+    d = 3
+    num_rounds = 3
+    layout = surface_code_layout.get_surface_code_layout(d)
+    num_x_ancillas = layout['num_x_ancillas']
+    num_z_ancillas = layout['num_z_ancillas']
+    spatial_edges_z = layout['spatial_edges_z']
+    spatial_edges_x = layout['spatial_edges_x']
+    num_shots = 20000
+    seed = 1234
+    physical_error_rates = [0.001, 0.005, 0.01, 0.02, 0.05] # p_data = p_meas = p
+    engines = error_correction.DECODER_ENGINES
+
+    print(f"--- Decoder Benchmark (d={d}) ---")
+    print(f"Shots per point: {num_shots}, rounds: {num_rounds}, seed: {seed}")
+    print(f"{'p':>7} | {'engine':>10} | {'LER':>9} | {'+/- (1 std)':>11} | {'decode [us/shot]':>16}")
+
+    for p in physical_error_rates:
+        # Same shots for every engine
+        rng = np.random.default_rng(seed)
+        decoder_ref = error_correction.SurfaceCodeDecoder(
+            num_rounds, num_x_ancillas, num_z_ancillas, spatial_edges_z, spatial_edges_x,
+            p, p, p, p, engine='pymatching', d=d)
+        sx, sz, res = sample_phenomenological_shots(decoder_ref, num_shots, p, p, p, p, rng)
+
+        for engine in engines:
+            decoder = error_correction.SurfaceCodeDecoder(
+                num_rounds, num_x_ancillas, num_z_ancillas, spatial_edges_z, spatial_edges_x,
+                p, p, p, p, engine=engine, d=d)
+
+            start = time.perf_counter()
+            outcomes = decoder.decode_batch(sx, sz, res)
+            elapsed = time.perf_counter() - start
+
+            report = error_correction.outcome_counts(outcomes)
+            ler = report['UE'] / num_shots
+            ler_std = np.sqrt(ler * (1 - ler) / num_shots)
+            print(f"{p:>7} | {engine:>10} | {ler:>9.5f} | {ler_std:>11.5f} | {elapsed / num_shots * 1e6:>16.2f}")
+
+if __name__ == '__main__':
+    main()
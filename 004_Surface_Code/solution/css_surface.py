@@ -0,0 +1,107 @@
+import os
+import sys
+import math
+import numpy as np
+import ler_sampler
+import error_correction
+from surface_code_layout import get_surface_code_layout
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from css_code import CSSCode, CSSDecoder, OUTCOME_LABELS, fault_outcomes, gf2_product, run_memory_experiment
+
+# --- Surface Code as a CSSCode (common/css_code.py) ---
+# The code is only H_X / H_Z (get_parity_check_matrices) and the logical operators of the layout:
+# Z_L = rightmost column (layout['logical_z']), X_L = top row (d=3: d[0] d[1] d[2]).
+# Circuits, fault model and decoder are generated by the framework and checked against this folder's
+# LER pipeline (LERSampler): the same shots through both decoders, and the generated circuit vs. LERSampler shots.
+def surface_css_code(d=3):
+    layout = get_surface_code_layout(d)
+    H_Z, H_X, logical_z = error_correction.get_parity_check_matrices(d)
+    logical_x = np.zeros(layout['num_data_qubits'], dtype=np.uint8)
+    logical_x[[q for q, (r, c) in enumerate(layout['data_coords']) if r == 0]] = 1
+    return CSSCode(f'Surface Code (d={d})', H_X, H_Z, logical_x, logical_z)
+
+def two_proportion_p_value(failures_a, shots_a, failures_b, shots_b):
+    """
+    Two-sided p-value of "same LER" (two-proportion z-test).
+    """
+    pooled = (failures_a + failures_b) / (shots_a + shots_b)
+    if pooled in (0, 1):
+        return 1.0
+    z = (failures_a / shots_a - failures_b / shots_b) / math.sqrt(pooled * (1 - pooled) * (1 / shots_a + 1 / shots_b))
+    return math.erfc(abs(z) / math.sqrt(2))
+
+def folder_matching_edges(decoder, sz, res, p):
+    """
+    Number of graph edges in the folder decoder's (pymatching engine) matching of every shot: same syndrome as
+    SurfaceCodeDecoder.match_patterns (final defects on the last round slice, boundary node = defect parity),
+    uniform weights -log(p) (p_data = p_meas = p).
+    """
+    z_defects = sz.copy()
+    z_defects[:, 1:] ^= sz[:, :-1]
+    z_defects[:, -1] ^= sz[:, -1] ^ gf2_product(res, decoder.H_Z)
+    syndromes = z_defects.reshape(len(res), -1)
+    syndromes = np.concatenate([syndromes, syndromes.sum(axis=1, keepdims=True) % 2], axis=1)
+    _, weights = decoder.z_matcher.decode_batch(syndromes[:, :decoder.z_matcher.num_nodes], return_weights=True)
+    return weights / -np.log(p)
+
+def css_matching_edges(css_decoder, sz, res, p):
+    """
+    Number of graph edges in the CSSCode decoder's matching, without the forced timelike edge of each event of the
+    readout layer (its only edge; the folder graph merges the readout into the last round slice instead).
+    """
+    layers = np.concatenate([sz, gf2_product(res, css_decoder.H)[:, None, :]], axis=1)
+    events = layers.copy()
+    events[:, 1:] ^= layers[:, :-1]
+    _, weights = css_decoder.matcher.decode_batch(events.reshape(len(res), -1), return_weights=True)
+    return weights / np.log((1 - p) / p) - events[:, -1].sum(axis=1)
+
+def compare_with_folder(d, num_rounds, p, num_shots, seed):
+    code = surface_css_code(d)
+    print(f"--- {code.name} (CSSCode) ---")
+    print(f"[[n, k, d]] = [[{code.num_data_qubits}, {code.num_logical_qubits}, {code.distance()}]]")
+    print(f"Single faults (code capacity, matching): {fault_outcomes(CSSDecoder(code, 'matching', p=p), 1)['summary'][1]}")
+
+    # 1. Same shots (LERSampler, Pauli-frame) through the folder's decoder and the CSSCode decoder.
+    # Only X data errors and Z-ancilla flips: Z memory (logical Z readout), so both decoders see the same problem.
+    # Both graphs model these faults (the CSSCode readout layer only connects to the last round), so the
+    # matchings have the same number of edges; a different decision is a tie between two logical classes.
+    layout = get_surface_code_layout(d)
+    config = ler_sampler.make_ler_config(
+        num_rounds, layout['num_data_qubits'], layout['num_x_ancillas'], layout['num_z_ancillas'],
+        layout['spatial_edges_z'], layout['spatial_edges_x'],
+        p, 0.0, 0.0, p, decoder_engine='pymatching', execution_mode='pauli_frame', d=d
+    )
+    sampler = ler_sampler.LERSampler(config)
+    sx, sz, res = sampler.sample(num_shots, np.random.default_rng(seed))
+    folder_errors = sampler.decoder.decode_batch(sx, sz, res) == error_correction.OUTCOME_LABELS.index('UE')
+    css_decoder = CSSDecoder(code, 'matching', 'Z', num_rounds, p, p)
+    css_errors = css_decoder.decode_batch({'res': res, 'sz': sz.reshape(num_shots, -1)}) == OUTCOME_LABELS.index('UE')
+    different = folder_errors != css_errors
+    ties = np.isclose(folder_matching_edges(sampler.decoder, sz, res, p), css_matching_edges(css_decoder, sz, res, p))
+    print(f"Same shots ({num_shots}, {num_rounds} rounds, p = {p}): LER folder decoder {folder_errors.mean():.5f} | "
+          f"CSSCode decoder {css_errors.mean():.5f} | different decision on {different.sum()} shots, "
+          f"equal matching weight on {ties[different].sum()} of them ({'ok' if ties[different].all() else 'MISMATCH'})")
+
+    # 2. Generated circuit (phenomenological fault model) vs. the folder's sampler: independent samples,
+    # both through the CSSCode decoder (the decoders break ties differently, see 1.)
+    css_report = run_memory_experiment(code, num_shots, p, 'phenomenological', 'matching', 'Z', num_rounds, seed=seed + 1)
+    sx, sz, res = sampler.sample(num_shots, np.random.default_rng(seed + 1))
+    folder_outcomes = css_decoder.decode_batch({'res': res, 'sz': sz.reshape(num_shots, -1)})
+    folder_report = {label: int(np.count_nonzero(folder_outcomes == i)) for i, label in enumerate(OUTCOME_LABELS)}
+    p_value = two_proportion_p_value(css_report['UE'], num_shots, folder_report['UE'], num_shots)
+    print(f"Independent samples (CSSCode decoder): CSSCode memory circuit {css_report} | LERSampler {folder_report} | "
+          f"p-value: {p_value:.3f} ({'ok' if p_value > 0.001 else 'MISMATCH'})\n")
+
+def main():
+    # d=3: many defect patterns have equal-weight matchings in different logical classes (e.g., a pair of
+    # boundary edges vs. a bulk path of two edges), so the folder decoder and the CSSCode decoder differ in LER
+    # by their tie-breaking; check 1 verifies that every different decision is such a tie.
+    distances = [3, 5]
+    p = 0.02 # Data X errors before every round and Z-ancilla measurement flips
+    num_shots = 100000
+    seed = 2024
+    for d in distances:
+        compare_with_folder(d, d, p, num_shots, seed) # d rounds
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+import os
+import sys
+import numpy as np
+import networkx as nx
+import ler_sampler
+import error_injection
+import surface_code_layout
+from error_correction import get_parity_check_matrices
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from pauli_frame import PauliFrameSimulator
+
+# --- Detector Error Model (DEM) ---
+# Instead of two scalar weights and hand-written edge -> data qubit maps, the decoding graphs are derived
+# from the circuit itself:
+# 1) Every single fault of the LER circuit is listed with its probability (per-location noise spec):
+#    X / Y / Z on every data qubit noise location ('id' gates, one per round), and a flip of every syndrome bit.
+# 2) Each fault is propagated through the circuit (Pauli frame, one fault per shot) to the measurement bits it flips,
+#    then to the detectors of the decoders and to the logical observable:
+#      Z-graph node (r, a), r < T-1 : sz[r, a] ^ sz[r-1, a]                  (sz[-1] = 0)
+#      Z-graph node (T-1, a)        : sz[T-2, a] ^ (H_Z res)[a]              (last round merged with the final syndrome,
+#                                                                             as in decode_batch)
+#      X-graph node (r, a)          : sx[r, a] ^ sx[r-1, a] for every round   (res is a Z-basis readout: no final
+#                                                                             X-syndrome, so a last-round sx flip
+#                                                                             is a single detector / boundary edge)
+#      observable                   : Z_L . res (Z-errors cannot flip it, as in decode_batch)
+# 3) Faults with the same (detectors, observable) are merged (p = p1 (1 - p2) + p2 (1 - p1)).
+#    A fault with 1 detector becomes a boundary edge, 2 detectors an edge between them.
+# The decoding graphs built from the DEM have the node numbering of create_decoding_graph,
+# so every decoder engine can use them directly (SurfaceCodeDecoder(..., detector_error_model=dem)).
+
+def make_noise_spec(num_rounds, num_data_qubits, num_x_ancillas, num_z_ancillas,
+                    prob_data_x, prob_data_z, prob_meas_x, prob_meas_z):
+    """
+    Per-location noise specification of the LER test error model (same channels as ler_sampler):
+    independent X (prob_data_x) and Z (prob_data_z) on every data qubit in every round, and syndrome bit flips.
+    Any entry can be edited afterwards (e.g., one noisy qubit or round).
+
+    Args:
+        prob_meas_x, prob_meas_z: Scalar, per ancilla or per (round, ancilla) (see error_injection.measurement_error_probabilities).
+
+    Returns:
+        dict:
+            'data' (np.ndarray): (rounds, num_data_qubits, 3) probabilities of X, Y, Z.
+            'meas_x', 'meas_z' (np.ndarray): (rounds, ancillas) syndrome bit flip probabilities.
+    """
+    px = prob_data_x * (1 - prob_data_z)
+    py = prob_data_x * prob_data_z
+    pz = (1 - prob_data_x) * prob_data_z
+    return {
+        'data': np.tile(np.array([px, py, pz], dtype=float), (num_rounds, num_data_qubits, 1)),
+        'meas_x': np.array(error_injection.measurement_error_probabilities(prob_meas_x, num_rounds, num_x_ancillas), dtype=float),
+        'meas_z': np.array(error_injection.measurement_error_probabilities(prob_meas_z, num_rounds, num_z_ancillas), dtype=float),
+    }
+
+def detector_flips(sx, sz, res, H_Z, logical_z):
+    """
+    Detector / observable flips of (shots, ...) measurement flips (node numbering of the decoding graphs).
+
+    Returns:
+        tuple: (z_nodes (shots, rounds * N_z), x_nodes (shots, rounds * N_x), observable (shots,)) uint8
+    """
+    def nodes(syndromes, final_syndrome=None):
+        defects = syndromes.copy()
+        defects[:, 1:] ^= syndromes[:, :-1]
+        if final_syndrome is not None:
+            defects[:, -1] ^= syndromes[:, -1] ^ final_syndrome # Last slice: merged with the final defects
+        return defects.reshape(defects.shape[0], -1)
+
+    final_z = (res @ H_Z.T % 2).astype(np.uint8)
+    observable = (res @ logical_z % 2).astype(np.uint8)
+    return nodes(sz, final_z), nodes(sx), observable
+
+def extract_detector_error_model(num_rounds, noise_spec, d=3):
+    """
+    Enumerates, propagates and merges every single fault of the LER circuit.
+
+    Returns:
+        dict:
+            'z', 'x' (dict): {(detector nodes tuple, observable flip): {'p': p, 'data_qubit': q or None}}
+                (data_qubit: the data qubit flip a decoder applies for this edge, None for measurement faults).
+            'undetectable_logical_p' (float): Total probability of faults that flip Z_L without any detector.
+            'num_faults' (int): Single faults enumerated.
+    """
+    layout = surface_code_layout.get_surface_code_layout(d)
+    num_data_qubits = layout['num_data_qubits']
+    num_x_ancillas = layout['num_x_ancillas']
+    num_z_ancillas = layout['num_z_ancillas']
+    H_Z, _, logical_z = get_parity_check_matrices(d)
+
+    # 1. Fault list: circuit noise locations (k-th location of a data qubit = round k) + syndrome bit flips
+    qc = ler_sampler.build_ler_circuit(num_rounds, num_data_qubits, d)
+    simulator = PauliFrameSimulator(qc, gate_noise={'id': (0, 0, 0)}) # Locations only, probabilities from noise_spec
+    faults, probabilities, data_qubits = [], [], []
+    location_round = {}
+    for step_idx, q, _ in simulator.noise_locations():
+        round_idx = location_round.get(q, 0)
+        location_round[q] = round_idx + 1
+        for pauli_idx, pauli in enumerate('XYZ'):
+            p = noise_spec['data'][round_idx, q, pauli_idx]
+            if p > 0:
+                faults.append(('pauli', step_idx, q, pauli))
+                probabilities.append(p)
+                data_qubits.append((q if pauli in 'XY' else None, q if pauli in 'YZ' else None)) # (Z-graph, X-graph)
+
+    num_sx = num_rounds * num_x_ancillas
+    # Measurement errors are classical flips of the syndrome bits (as in the LER test), not circuit faults
+    meas_faults = []
+    for round_idx in range(num_rounds):
+        for a in range(num_x_ancillas):
+            if noise_spec['meas_x'][round_idx, a] > 0:
+                meas_faults.append(('sx', round_idx * num_x_ancillas + a, noise_spec['meas_x'][round_idx, a]))
+        for a in range(num_z_ancillas):
+            if noise_spec['meas_z'][round_idx, a] > 0:
+                meas_faults.append(('sz', round_idx * num_z_ancillas + a, noise_spec['meas_z'][round_idx, a]))
+
+    # 2. Propagation: (clbits, faults) flips -> registers -> detectors
+    flips = simulator.fault_flips(faults).T if faults else np.zeros((0, qc.num_clbits), dtype=np.uint8)
+    clbit_index = {name: [qc.find_bit(bit).index for bit in creg] for name, creg in ((c.name, c) for c in qc.cregs)}
+    sx = flips[:, clbit_index['sx']]
+    sz = flips[:, clbit_index['sz']]
+    res = flips[:, clbit_index['res']]
+
+    meas_sx = np.zeros((len(meas_faults), num_sx), dtype=np.uint8)
+    meas_sz = np.zeros((len(meas_faults), num_rounds * num_z_ancillas), dtype=np.uint8)
+    for i, (register, bit, p) in enumerate(meas_faults):
+        (meas_sx if register == 'sx' else meas_sz)[i, bit] = 1
+        probabilities.append(p)
+        data_qubits.append((None, None))
+    sx = np.concatenate([sx, meas_sx]).reshape(-1, num_rounds, num_x_ancillas)
+    sz = np.concatenate([sz, meas_sz]).reshape(-1, num_rounds, num_z_ancillas)
+    res = np.concatenate([res, np.zeros((len(meas_faults), num_data_qubits), dtype=np.uint8)])
+    z_nodes, x_nodes, observable = detector_flips(sx, sz, res, H_Z, logical_z)
+
+    # 3. Merge faults with the same signature (per graph)
+    dem = {'z': {}, 'x': {}, 'undetectable_logical_p': 0.0, 'num_faults': len(probabilities)}
+    for i, p in enumerate(probabilities):
+        for graph_name, nodes, obs, data_qubit in (('z', z_nodes[i], observable[i], data_qubits[i][0]),
+                                                    ('x', x_nodes[i], 0, data_qubits[i][1])):
+            detectors = tuple(int(n) for n in np.flatnonzero(nodes))
+            if not detectors:
+                if graph_name == 'z' and obs:
+                    q = dem['undetectable_logical_p']
+                    dem['undetectable_logical_p'] = q * (1 - p) + p * (1 - q)
+                continue
+            if len(detectors) > 2:
+                print(f"Wrong Fault (not graph-like): {faults[i] if i < len(faults) else meas_faults[i - len(faults)]} "
+                      f"flips {len(detectors)} {graph_name.upper()}-graph detectors")
+                sys.exit(1)
+            key = (detectors, int(obs))
+            if key in dem[graph_name]:
+                entry = dem[graph_name][key]
+                if entry['data_qubit'] is None or (data_qubit is not None and p > entry['p_max']):
+                    entry['data_qubit'], entry['p_max'] = data_qubit, p # Decoder applies the most likely fault
+                entry['p'] = entry['p'] * (1 - p) + p * (1 - entry['p'])
+            else:
+                dem[graph_name][key] = {'p': p, 'data_qubit': data_qubit, 'p_max': p}
+    return dem
+
+def dem_decoding_graph(dem_edges, num_rounds, num_ancillas):
+    """
+    Decoding graph of one DEM part ('z' or 'x'): nodes 0 .. rounds * N - 1 + one boundary node (create_decoding_graph numbering),
+    weight -ln(p) (same convention as create_decoding_graph). Parallel faults (same detectors, different observable)
+    keep the more likely one.
+    """
+    G = nx.Graph()
+    boundary_node = num_rounds * num_ancillas
+    G.add_nodes_from(range(boundary_node + 1))
+    for (detectors, observable), entry in dem_edges.items():
+        u, v = (detectors[0], boundary_node) if len(detectors) == 1 else detectors
+        if G.has_edge(u, v) and G[u][v]['p'] >= entry['p']:
+            continue
+        if len(detectors) == 1:
+            edge_type = 'boundary'
+        elif detectors[0] % num_ancillas == detectors[1] % num_ancillas:
+            edge_type = 'temporal'
+        else:
+            edge_type = 'spatial'
+        G.add_edge(u, v, weight=-np.log(entry['p']), p=entry['p'], type=edge_type, qubits=(),
+                   data_qubit=entry['data_qubit'], observable=observable)
+    return G
+
+def build_dem_decoding_graphs(num_rounds, noise_spec, d=3):
+    """
+    Returns:
+        dict: {'z_graph': nx.Graph, 'x_graph': nx.Graph, 'dem': DEM} for SurfaceCodeDecoder(detector_error_model=...).
+    """
+    layout = surface_code_layout.get_surface_code_layout(d)
+    dem = extract_detector_error_model(num_rounds, noise_spec, d)
+    return {
+        'z_graph': dem_decoding_graph(dem['z'], num_rounds, layout['num_z_ancillas']),
+        'x_graph': dem_decoding_graph(dem['x'], num_rounds, layout['num_x_ancillas']),
+        'dem': dem,
+    }
+
+def compare_with_layout_maps(dem, num_rounds, d=3):
+    """
+    Checks the data-qubit edges of the DEM Z-graph against the hand-written style maps of surface_code_layout
+    (z_spatial_map / z_boundary_map) in every round.
+
+    Returns:
+        list: Mismatch descriptions (empty if the circuit matches the layout).
+    """
+    layout = surface_code_layout.get_surface_code_layout(d)
+    num_z_ancillas = layout['num_z_ancillas']
+    expected = {}
+    for r in range(num_rounds):
+        offset = r * num_z_ancillas
+        for (a_i, a_j), q in layout['z_spatial_map'].items():
+            expected[(a_i + offset, a_j + offset)] = q
+        for a, q in layout['z_boundary_map'].items():
+            expected[(a + offset,)] = q
+
+    derived = {detectors: entry['data_qubit'] for (detectors, _), entry in dem['z'].items() if entry['data_qubit'] is not None}
+    mismatches = []
+    for detectors in sorted(set(expected) | set(derived)):
+        if expected.get(detectors) != derived.get(detectors):
+            mismatches.append(f"detectors {detectors}: layout d[{expected.get(detectors)}], circuit d[{derived.get(detectors)}]")
+    return mismatches
+
+def main():
+    d = 3
+    num_rounds = 3
+    layout = surface_code_layout.get_surface_code_layout(d)
+    noise_spec = make_noise_spec(num_rounds, layout['num_data_qubits'], layout['num_x_ancillas'], layout['num_z_ancillas'],
+                                 0.001, 0.001, 0.01, 0.01)
+    dem = extract_detector_error_model(num_rounds, noise_spec, d)
+
+    print(f"--- Detector Error Model (d={d}, rounds={num_rounds}) ---")
+    print(f"Single faults enumerated: {dem['num_faults']}")
+    for graph_name in ['z', 'x']:
+        edges = dem[graph_name]
+        num_boundary = sum(len(detectors) == 1 for detectors, _ in edges)
+        num_logical = sum(observable for _, observable in edges)
+        print(f"{graph_name.upper()}-graph: {len(edges)} merged edges ({num_boundary} boundary, {num_logical} flip Z_L)")
+    print(f"Undetectable logical error probability: {dem['undetectable_logical_p']:.3e}")
+
+    mismatches = compare_with_layout_maps(dem, num_rounds, d)
+    print(f"Z-graph data qubit edges vs. surface_code_layout maps: {'match' if not mismatches else 'MISMATCH'}")
+    for mismatch in mismatches:
+        print(f"  {mismatch}")
+
+if __name__ == '__main__':
+    main()
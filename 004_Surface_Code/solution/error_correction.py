@@ -1,51 +1,89 @@
 import networkx as nx
 import numpy as np
 import itertools 
+import sys
+import pymatching
+from collections import OrderedDict
+from functools import lru_cache
+from scipy.sparse.csgraph import dijkstra
+from union_find import UnionFindDecoder
+from surface_code_layout import get_surface_code_layout, distance_from_num_data_qubits
 
-def get_stabilizer_and_decoding_maps():
+def get_stabilizer_and_decoding_maps(d=3):
     """
     Defines the stabilizer connectivity and the mapping for the decoding graph.
-    This corresponds to a specific surface code layout (e.g., rotated surface code 13-qubit).
-    """
-    z_stabilizers = {
-        'c_z[0]': ('d[0]', 'd[1]', 'd[3]'),
-        'c_z[1]': ('d[1]', 'd[2]', 'd[4]'),
-        'c_z[2]': ('d[3]', 'd[5]', 'd[6]', 'd[8]'),
-        'c_z[3]': ('d[4]', 'd[6]', 'd[7]', 'd[9]'),
-        'c_z[4]': ('d[8]', 'd[10]', 'd[11]'),
-        'c_z[5]': ('d[9]', 'd[11]', 'd[12]')
-    }
-    x_stabilizers = {
-        'c_x[0]': ('d[0]', 'd[3]', 'd[5]'),
-        'c_x[1]': ('d[1]', 'd[3]', 'd[4]', 'd[6]'),
-        'c_x[2]': ('d[2]', 'd[4]', 'd[7]'),
-        'c_x[3]': ('d[5]', 'd[8]', 'd[10]'),
-        'c_x[4]': ('d[6]', 'd[8]', 'd[9]', 'd[11]'),
-        'c_x[5]': ('d[7]', 'd[9]', 'd[12]')
-    }
-    
-    # Maps spatial edges (ancilla pairs) to the corresponding data qubit index for Z-graph (X-errors)
-    z_spatial_map = {
-        (0, 1): 1, (0, 2): 3, (1, 3): 4, (2, 3): 6, 
-        (2, 4): 8, (3, 5): 9, (4, 5): 11
-    }
-    # Maps boundary ancilla indices to their corresponding data qubit index for Z-graph
-    z_boundary_map = {0: 0, 1: 2, 2: 5, 3: 7, 4: 10, 5: 12}
-    
-    # Maps spatial edges (ancilla pairs) to the corresponding data qubit index for X-graph (Z-errors)
-    x_spatial_map = {
-        (0, 1): 3, (0, 3): 5, (1, 2): 4, (1, 4): 6, 
-        (2, 5): 7, (3, 4): 8, (4, 5): 9
-    }
-    # Maps boundary ancilla indices to their corresponding data qubit index for X-graph
-    x_boundary_map = {0: 0, 1: 1, 2: 2, 3: 10, 4: 11, 5: 12}
+    The tables come from the distance-d layout generator (surface_code_layout.py);
+    d=3 is the 13-data-qubit layout, e.g.:
+        z_stabilizers  : {'c_z[0]': ('d[0]', 'd[1]', 'd[3]'), ...}
+        z_spatial_map  : {(0, 1): 1, (0, 2): 3, ...}  (spatial edge (ancilla pair) -> shared data qubit, Z-graph / X-errors)
+        z_boundary_map : {0: 0, 1: 2, 2: 5, ...}      (boundary ancilla -> boundary data qubit)
+        (x_*: same for the X-stabilizers / X-graph / Z-errors)
+    """
+    layout = get_surface_code_layout(d)
 
     return (
-        z_stabilizers, x_stabilizers, 
-        z_spatial_map, z_boundary_map, 
-        x_spatial_map, x_boundary_map
+        layout['z_stabilizers'], layout['x_stabilizers'], 
+        layout['z_spatial_map'], layout['z_boundary_map'], 
+        layout['x_spatial_map'], layout['x_boundary_map']
     )
 
+# --- Parity-Check Matrices (GF(2)) ---
+def get_parity_check_matrices(d=3):
+    """
+    Builds the GF(2) parity-check matrices and the logical operator from the stabilizer tables.
+
+    Returns:
+        tuple: (H_Z, H_X, logical_z) uint8 0/1 arrays
+            H_Z (np.ndarray): (num_z_ancillas, num_data_qubits), H_Z[a, q] = 1 if Z-stabilizer a acts on d[q].
+            H_X (np.ndarray): (num_x_ancillas, num_data_qubits), same for the X-stabilizers.
+            logical_z (np.ndarray): (num_data_qubits,) support of the logical Z-operator (d=3: Z_L = d[2]d[7]d[12]).
+    """
+    layout = get_surface_code_layout(d)
+    num_data_qubits = layout['num_data_qubits']
+
+    def to_matrix(stabilizers_map):
+        H = np.zeros((len(stabilizers_map), num_data_qubits), dtype=np.uint8)
+        for a_idx, data_qubits in enumerate(stabilizers_map.values()):
+            for dq_str in data_qubits:
+                H[a_idx, int(dq_str[2:-1])] = 1 # e.g., 'd[0]' -> 0
+        return H
+
+    logical_z = np.zeros(num_data_qubits, dtype=np.uint8)
+    logical_z[layout['logical_z']] = 1
+
+    return to_matrix(layout['z_stabilizers']), to_matrix(layout['x_stabilizers']), logical_z
+
+# Parity (0/1) of every byte value (fallback popcount for NumPy < 2.0)
+BYTE_PARITY = np.array([bin(i).count('1') & 1 for i in range(256)], dtype=np.uint8)
+
+def pack_gf2(matrix):
+    """
+    Packs the last axis of a 0/1 array into 64-bit words (64 qubits per word, little-endian bit order).
+    """
+    matrix = np.asarray(matrix, dtype=np.uint8)
+    num_words = max(1, -(-matrix.shape[-1] // 64))
+    padded = np.zeros(matrix.shape[:-1] + (num_words * 64,), dtype=np.uint8)
+    padded[..., :matrix.shape[-1]] = matrix
+    return np.packbits(padded, axis=-1, bitorder='little').view('<u8')
+
+def gf2_product_packed(packed_bits, packed_rows):
+    """
+    Batched GF(2) product over bit-packed vectors: out[s, a] = <bits[s], rows[a]> mod 2.
+
+    Args:
+        packed_bits (np.ndarray): (shots, words) packed 0/1 vectors (see pack_gf2).
+        packed_rows (np.ndarray): (rows, words) packed parity checks / logical operators.
+
+    Returns:
+        np.ndarray: (shots, rows) uint8.
+    """
+    overlap = packed_bits[:, None, :] & packed_rows[None, :, :]
+    if hasattr(np, 'bitwise_count'):
+        parity = np.bitwise_count(overlap) & 1
+    else:
+        parity = np.bitwise_xor.reduce(BYTE_PARITY[overlap.view(np.uint8)].reshape(overlap.shape + (8,)), axis=-1)
+    return np.bitwise_xor.reduce(parity, axis=2).astype(np.uint8)
+
 # --- Create Decoding Graph (with a single boundary node) ---
 def create_decoding_graph(num_rounds, num_ancillas, spatial_edges, boundary_map, p_data, p_meas):
     """
@@ -86,51 +124,488 @@ def create_decoding_graph(num_rounds, num_ancillas, spatial_edges, boundary_map,
             G.add_edge(a + offset1, a + offset2, weight=w_temporal, type='temporal', qubits=())
 
     # 3. Boundary edges
-    # Connect nodes in the final round to a single boundary node
-    final_round_offset = (num_rounds - 1) * num_nodes_per_round
+    # Connect the boundary ancillas of *every* round to a single boundary node
+    # (a boundary data qubit error before round r creates one defect in round r only;
+    # it must not be forced through temporal edges to the final round)
     boundary_node = num_rounds * num_nodes_per_round # The single boundary node
     G.add_node(boundary_node) 
     
-    for a_idx in range(num_ancillas):
-        if a_idx in boundary_map: 
-            # Find the corresponding node in the final measurement round
-            node_in_final_round = a_idx + final_round_offset
-            G.add_edge(
-                node_in_final_round, 
-                boundary_node, 
-                weight=w_boundary_edge, 
-                type='boundary', 
-                qubits=((a_idx,),) # Store which ancilla this boundary edge corresponds to
-            )
+    for r in range(num_rounds):
+        offset = r * num_nodes_per_round
+        for a_idx in range(num_ancillas):
+            if a_idx in boundary_map: 
+                G.add_edge(
+                    a_idx + offset, 
+                    boundary_node, 
+                    weight=w_boundary_edge, 
+                    type='boundary', 
+                    qubits=((a_idx,),) # Store which ancilla this boundary edge corresponds to
+                )
         
     return G
 
-# --- Calculate Syndrome from Final Result Bits ---
-def calculate_syndrome_from_res(res_bits, stabilizers_map, num_ancillas):
+# --- Sparse Adjacency Matrix for Shortest Paths ---
+def create_shortest_path_matrix(G):
     """
-    Calculates the final syndrome by measuring stabilizers on the final data qubit state (res_bits).
+    Converts a decoding graph into a sparse (N, N) weight matrix for scipy.sparse.csgraph.
+
+    Args:
+        G (nx.Graph): Decoding graph whose nodes are 0 .. N-1 (see create_decoding_graph).
     """
-    final_syndrome = np.zeros(num_ancillas, dtype=int)
-    
-    for a_idx, (a_name, data_qubits) in enumerate(stabilizers_map.items()):
-        parity = 0
-        for dq_str in data_qubits: 
-            dq_idx = int(dq_str[2:-1]) # e.g., 'd[0]' -> 0
-            parity ^= res_bits[dq_idx]
-        final_syndrome[a_idx] = parity
-        
-    return final_syndrome
+    return nx.to_scipy_sparse_array(G, nodelist=range(G.number_of_nodes()), weight='weight', format='csr')
+
+# --- Shortest Paths from the Defects (Dijkstra) ---
+def compute_shortest_path_tables(graph_matrix, sources):
+    """
+    Runs Dijkstra from every source node (only the defects of a shot, instead of all-pairs
+    Floyd-Warshall: O(k (E + N log N)) for k defects, so large graphs such as d=9 with 10d rounds stay usable).
+
+    Args:
+        graph_matrix (scipy.sparse.csr_array): See create_shortest_path_matrix.
+        sources (list): Source nodes.
+
+    Returns:
+        tuple: (dist, pred)
+            dist (np.ndarray): (k, N) float array, dist[i, v] = shortest path weight sources[i] -> v (inf if unreachable).
+            pred (np.ndarray): (k, N) int array, pred[i, v] = node before v on the path sources[i] -> v (negative if none).
+    """
+    return dijkstra(graph_matrix, directed=False, indices=sources, return_predecessors=True)
+
+# --- Reconstruct a Shortest Path from the Predecessor Row ---
+def shortest_path_from_table(pred_row, u, v):
+    """
+    Walks the predecessor row of source u back from v to u and returns the node list [u, ..., v].
+    """
+    path = [v]
+    while path[-1] != u:
+        path.append(int(pred_row[path[-1]]))
+    return path[::-1]
+
+# --- Build a PyMatching Matcher from a Decoding Graph ---
+def create_pymatching_matcher(G):
+    """
+    Converts a decoding graph (see create_decoding_graph) into a PyMatching matcher.
+
+    Every graph edge gets its own fault id, so the correction returned by PyMatching
+    tells exactly which edges of G are used by the matched paths.
+    The single boundary node is kept as a *regular* detector: its syndrome bit is set to
+    the parity of the defects (see decode_edges_with_pymatching), which reproduces the
+    "pair one defect with the boundary only if the count is odd" rule of the networkx path.
+    The matcher only knows nodes up to the last one with an edge: trailing isolated nodes
+    (e.g., the boundary node of a detector error model graph without boundary faults) are cut off
+    the syndromes, they can never hold a defect.
+
+    Returns:
+        tuple: (matcher, edge_list)
+            matcher (pymatching.Matching): The matcher over nodes 0 .. N-1.
+            edge_list (list): edge_list[fault_id] = (u, v) with u < v.
+    """
+    matcher = pymatching.Matching()
+    edge_list = []
+    for u, v, data in G.edges(data=True):
+        if not np.isfinite(data['weight']):
+            continue # Impossible fault (p = 0), never used by a shortest path
+        matcher.add_edge(u, v, fault_ids=len(edge_list), weight=data['weight'])
+        edge_list.append(tuple(sorted((u, v))))
+
+    return matcher, edge_list
+
+# --- Match Defects with PyMatching ---
+def decode_edges_with_pymatching(matcher, edge_list, defect_nodes, num_nodes):
+    """
+    Runs MWPM over the defect nodes with PyMatching.
+
+    Returns:
+        set: Edges (u, v) with u < v of the decoding graph used by the matched paths.
+    """
+    syndrome = np.zeros(num_nodes, dtype=np.uint8)
+    for node in defect_nodes:
+        syndrome[node] ^= 1
+    if not syndrome.any():
+        return set()
+
+    correction = matcher.decode(syndrome[:matcher.num_nodes])
+    return {edge_list[i] for i in np.flatnonzero(correction)}
+
+# --- Map Decoding-Graph Edges to Data Qubits ---
+def create_edge_to_qubit_map(G, spatial_map, boundary_map):
+    """
+    Maps every spatial/boundary edge (u, v) (u < v) of a decoding graph to the data qubit it flips.
+    Temporal edges (measurement errors) do not flip a data qubit and are left out.
+    Edges of a detector error model graph carry their data qubit themselves ('data_qubit').
+    """
+    edge_to_qubit = {}
+    for u, v, data in G.edges(data=True):
+        if 'data_qubit' in data:
+            qubit = data['data_qubit']
+        elif data['type'] == 'spatial':
+            qubit = spatial_map.get(tuple(sorted(data['qubits'][0])))
+        elif data['type'] == 'boundary':
+            qubit = boundary_map.get(data['qubits'][0][0])
+        else:
+            qubit = None
+        if qubit is not None:
+            edge_to_qubit[tuple(sorted((u, v)))] = qubit
+
+    return edge_to_qubit
+
+# --- Precompiled MWPM Decoder ---
+DECODER_ENGINES = ['networkx', 'pymatching', 'union_find']
+OUTCOME_LABELS = ['NE', 'CE', 'UE'] # Outcome code i <-> OUTCOME_LABELS[i] (decode_batch)
+
+class SurfaceCodeDecoder:
+    """
+    MWPM decoder that builds the Z/X decoding graphs once and reuses them for every shot.
+
+    The decoding graphs only depend on (num_rounds, spatial edges, boundary map, p_data, p_meas),
+    so the graphs and the engine's matching data are computed in the constructor
+    (for 'networkx': the sparse weight matrix of each graph; shortest paths are found per shot
+    by Dijkstra from its defect nodes only, see compute_shortest_path_tables).
+    Decoding a shot only runs the matching over its defects.
+
+    engine selects the matching backend:
+        'networkx'   : nx.min_weight_matching over the defects (reference implementation).
+        'pymatching' : PyMatching (sparse blossom) on the same graphs, microseconds per shot.
+        'union_find' : Union-Find (cluster growth + peeling), near-linear time, slightly less accurate.
+
+    cache_size bounds the number of defect patterns remembered by decode_batch (0 disables the cache).
+    d selects the layout (stabilizer tables, boundary maps, logical operator) of surface_code_layout.py.
+    detector_error_model (dict or None): {'z_graph', 'x_graph'} decoding graphs derived from the circuit
+        (detector_error_model.build_dem_decoding_graphs); None -> graphs from the scalar probabilities.
+    """
+    def __init__(self, num_rounds, num_x_ancillas, num_z_ancillas,
+                 spatial_edges_z, spatial_edges_x,
+                 prob_data_x, prob_data_z, prob_meas_z, prob_meas_x,
+                 engine='networkx', cache_size=65536, d=3, detector_error_model=None):
+        if engine not in DECODER_ENGINES:
+            print(f"Wrong Decoder Engine: {engine} (choose from {DECODER_ENGINES})")
+            sys.exit(1)
+        self.engine = engine
+
+        # Bounded LRU caches (defect pattern bytes -> data qubit flips) used by decode_batch
+        self.cache_size = cache_size
+        self.z_cache = OrderedDict()
+        self.x_cache = OrderedDict()
+
+        (self.z_stabilizers, self.x_stabilizers,
+         self.z_spatial_map, self.z_boundary_map,
+         self.x_spatial_map, self.x_boundary_map) = get_stabilizer_and_decoding_maps(d)
+        self.d = d
+
+        self.num_rounds = num_rounds
+        self.num_x_ancillas = num_x_ancillas
+        self.num_z_ancillas = num_z_ancillas
+
+        # Stabilizers as GF(2) parity-check matrices (built once) and their bit-packed rows
+        self.H_Z, self.H_X, self.logical_z = get_parity_check_matrices(d)
+        self.num_data_qubits = self.H_Z.shape[1]
+        self.H_Z_packed = pack_gf2(self.H_Z)
+        self.H_X_packed = pack_gf2(self.H_X)
+        self.logical_z_packed = pack_gf2(self.logical_z[None, :])
+
+        if detector_error_model is not None:
+            # Graphs (edges, weights, edge -> data qubit) derived from the circuit's single faults
+            self.z_graph = detector_error_model['z_graph']
+            self.x_graph = detector_error_model['x_graph']
+        else:
+            # Z-Graph (for correcting X-errors)
+            self.z_graph = create_decoding_graph(num_rounds, num_z_ancillas, spatial_edges_z, self.z_boundary_map, prob_data_x, prob_meas_z)
+            # X-Graph (for correcting Z-errors)
+            self.x_graph = create_decoding_graph(num_rounds, num_x_ancillas, spatial_edges_x, self.x_boundary_map, prob_data_z, prob_meas_x)
+        self.z_boundary_node = num_rounds * num_z_ancillas
+        self.x_boundary_node = num_rounds * num_x_ancillas
+
+        # Edge -> data qubit flipped by that edge (used by decode_batch)
+        self.z_edge_to_qubit = create_edge_to_qubit_map(self.z_graph, self.z_spatial_map, self.z_boundary_map)
+        self.x_edge_to_qubit = create_edge_to_qubit_map(self.x_graph, self.x_spatial_map, self.x_boundary_map)
+
+        if engine == 'networkx':
+            self.z_graph_matrix = create_shortest_path_matrix(self.z_graph)
+            self.x_graph_matrix = create_shortest_path_matrix(self.x_graph)
+        elif engine == 'pymatching':
+            self.z_matcher, self.z_edge_list = create_pymatching_matcher(self.z_graph)
+            self.x_matcher, self.x_edge_list = create_pymatching_matcher(self.x_graph)
+            # (num_fault_ids, num_data_qubits) 0/1 matrix: fault id (edge) -> data qubit flip
+            self.z_edge_flip_matrix = self.edge_flip_matrix(self.z_edge_list, self.z_edge_to_qubit)
+            self.x_edge_flip_matrix = self.edge_flip_matrix(self.x_edge_list, self.x_edge_to_qubit)
+        elif engine == 'union_find':
+            self.z_union_find = UnionFindDecoder(self.z_graph)
+            self.x_union_find = UnionFindDecoder(self.x_graph)
+
+    def edge_flip_matrix(self, edge_list, edge_to_qubit):
+        flip_matrix = np.zeros((len(edge_list), self.num_data_qubits), dtype=np.uint8)
+        for i, edge in enumerate(edge_list):
+            if edge in edge_to_qubit:
+                flip_matrix[i, edge_to_qubit[edge]] = 1
+        return flip_matrix
+
+    def match(self, defect_nodes, graph_matrix):
+        """
+        Runs MWPM (networkx) over the defect nodes, with shortest paths from Dijkstra on the defects.
+
+        Returns:
+            set: Edges (u, v) with u < v of the decoding graph used by the matched paths.
+        """
+        # Create the complete graph K over the defects for matching
+        # (unreachable pairs are left out, e.g., separate components of a detector error model graph)
+        defect_nodes = list(defect_nodes)
+        if len(defect_nodes) == 0:
+            return set()
+        dist, pred = compute_shortest_path_tables(graph_matrix, defect_nodes)
+        row = {u: i for i, u in enumerate(defect_nodes)}
+        K = nx.Graph()
+        for u, v in itertools.combinations(defect_nodes, 2):
+            if np.isfinite(dist[row[u], v]):
+                K.add_edge(u, v, weight=dist[row[u], v])
+
+        # Find the minimum weight perfect matching
+        matching_edges = nx.min_weight_matching(K)
+
+        # Convert the matching on K back to a set of edges on the original graph
+        matching = set()
+        for u, v in matching_edges:
+            path = shortest_path_from_table(pred[row[u]], u, v)
+            for i in range(len(path) - 1):
+                matching ^= {tuple(sorted((path[i], path[i+1])))} # An edge used by two paths cancels
+        return matching
+
+    def match_z(self, z_defect_nodes):
+        if self.engine == 'pymatching':
+            return decode_edges_with_pymatching(self.z_matcher, self.z_edge_list, z_defect_nodes, self.z_boundary_node + 1)
+        if self.engine == 'union_find':
+            return self.z_union_find.decode(z_defect_nodes)
+        return self.match(z_defect_nodes, self.z_graph_matrix)
+
+    def match_x(self, x_defect_nodes):
+        if self.engine == 'pymatching':
+            return decode_edges_with_pymatching(self.x_matcher, self.x_edge_list, x_defect_nodes, self.x_boundary_node + 1)
+        if self.engine == 'union_find':
+            return self.x_union_find.decode(x_defect_nodes)
+        return self.match(x_defect_nodes, self.x_graph_matrix)
+
+    def decode_batch(self, sx, sz, res, no_error_injected=False):
+        """
+        Decodes many shots at once.
+
+        Args:
+            sx (np.ndarray): (shots, rounds, x_ancillas) uint8 X-syndrome bits (not needed for the outcome:
+                res is a Z-basis readout, only logical-X errors (Z_L flips) are detected).
+            sz (np.ndarray): (shots, rounds, z_ancillas) uint8 Z-syndrome bits.
+            res (np.ndarray): (shots, data_qubits) uint8 final data qubit bits.
+            no_error_injected (bool or np.ndarray): Per-shot (or global) flag, same meaning
+                as in run_error_correction_and_reporting (True -> 'NE' instead of 'CE').
+
+        Returns:
+            np.ndarray: (shots,) uint8 outcome codes, index into OUTCOME_LABELS (0: NE, 1: CE, 2: UE).
+        """
+        sz = np.asarray(sz, dtype=np.uint8)
+        res = np.asarray(res, dtype=np.uint8)
+        num_shots = res.shape[0]
+
+        # --- 1. Defect Calculation (all shots) ---
+        z_defects = sz.copy()
+        z_defects[:, 1:] ^= sz[:, :-1]
+
+        # --- 2. Boundary Defect Calculation ---
+        # The data qubits are read out in the Z basis: res gives the final Z-syndrome, but no X-syndrome.
+        # Z-errors commute with this readout and cannot flip Z_L, so (as in the single-shot path)
+        # only the Z-graph decides the outcome; sx is not needed for it.
+        final_z_defects = sz[:, -1] ^ gf2_product_packed(pack_gf2(res), self.H_Z_packed)
+
+        # --- 3. Matching -> Data qubit flips ---
+        x_flips = self.data_flips_batch('z', z_defects, final_z_defects) # X-errors (Z-graph)
+
+        # --- 4. Error Reporting ---
+        corrected_res = pack_gf2(res ^ x_flips)
+        corrected_z_syndrome = gf2_product_packed(corrected_res, self.H_Z_packed)
+        logical_x_error_parity = gf2_product_packed(corrected_res, self.logical_z_packed)[:, 0]
+
+        logical_error_detected = corrected_z_syndrome.any(axis=1) | (logical_x_error_parity == 1)
+        no_error_injected = np.broadcast_to(np.asarray(no_error_injected, dtype=bool), (num_shots,))
+
+        outcomes = np.where(no_error_injected, OUTCOME_LABELS.index('NE'), OUTCOME_LABELS.index('CE')).astype(np.uint8)
+        outcomes[logical_error_detected] = OUTCOME_LABELS.index('UE')
+        return outcomes
+
+    def data_flips_batch(self, graph_name, defects, final_defects):
+        """
+        Matches the defects of every shot on the Z ('z') or X ('x') decoding graph.
+
+        Fast paths:
+            1) Shots without any defect are skipped (no correction).
+            2) Each distinct defect pattern is matched once and broadcast to all shots sharing it.
+            3) Matched patterns are kept in a bounded LRU cache across calls.
+
+        Returns:
+            np.ndarray: (shots, data_qubits) uint8, 1 where the matching flips the data qubit.
+        """
+        num_shots, num_rounds, num_ancillas = defects.shape
+        flips = np.zeros((num_shots, self.num_data_qubits), dtype=np.uint8)
+
+        # Defect pattern of each shot = bulk defects + final defects
+        patterns = np.concatenate([defects.reshape(num_shots, -1), final_defects], axis=1)
+        has_defect = patterns.any(axis=1)
+        if not has_defect.any():
+            return flips
+
+        # Distinct patterns, found on their bit-packed form (one 64-bit word per 64 defect bits)
+        patterns = patterns[has_defect]
+        packed = pack_gf2(patterns)
+        if packed.shape[1] == 1:
+            _, first_index, inverse = np.unique(packed[:, 0], return_index=True, return_inverse=True)
+        else:
+            _, first_index, inverse = np.unique(packed, axis=0, return_index=True, return_inverse=True)
+        unique_patterns = patterns[first_index]
+        unique_flips = np.zeros((len(unique_patterns), self.num_data_qubits), dtype=np.uint8)
+
+        # Look up the LRU cache, collect the misses
+        cache = self.z_cache if graph_name == 'z' else self.x_cache
+        keys = [packed[i].tobytes() for i in first_index]
+        misses = []
+        for i, key in enumerate(keys):
+            if key in cache:
+                cache.move_to_end(key)
+                unique_flips[i] = cache[key]
+            else:
+                misses.append(i)
+
+        if misses:
+            miss_patterns = unique_patterns[misses]
+            unique_flips[misses] = self.match_patterns(graph_name, miss_patterns, num_rounds, num_ancillas)
+            if self.cache_size > 0:
+                for i in misses:
+                    cache[keys[i]] = unique_flips[i]
+                while len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+
+        flips[has_defect] = unique_flips[inverse.reshape(-1)]
+        return flips
+
+    def match_patterns(self, graph_name, patterns, num_rounds, num_ancillas):
+        """
+        Matches defect patterns (bulk defects of all rounds + final defects, one row each).
+
+        Returns:
+            np.ndarray: (patterns, data_qubits) uint8 data qubit flips.
+        """
+        num_patterns = patterns.shape[0]
+        boundary_node = num_rounds * num_ancillas
+        bulk = patterns[:, :boundary_node]
+        final_defects = patterns[:, boundary_node:]
+
+        # Syndrome over the graph nodes: bulk defects, final defects on the last round slice,
+        # and the boundary node when the total defect count is odd
+        parity = patterns.sum(axis=1, dtype=np.int64) % 2
+
+        if self.engine == 'pymatching':
+            matcher = self.z_matcher if graph_name == 'z' else self.x_matcher
+            flip_matrix = self.z_edge_flip_matrix if graph_name == 'z' else self.x_edge_flip_matrix
+            syndromes = np.zeros((num_patterns, boundary_node + 1), dtype=np.uint8)
+            syndromes[:, :boundary_node] = bulk
+            syndromes[:, boundary_node - num_ancillas:boundary_node] ^= final_defects
+            syndromes[:, boundary_node] = parity
+            if matcher.num_nodes == 0:
+                return np.zeros((num_patterns, self.num_data_qubits), dtype=np.uint8)
+            corrections = matcher.decode_batch(syndromes[:, :matcher.num_nodes])
+            return ((corrections.astype(np.int64) @ flip_matrix) % 2).astype(np.uint8)
+
+        # networkx / union_find: same defect node list as run_error_correction_and_reporting, one pattern at a time
+        match = self.match_z if graph_name == 'z' else self.match_x
+        edge_to_qubit = self.z_edge_to_qubit if graph_name == 'z' else self.x_edge_to_qubit
+        final_offset = (num_rounds - 1) * num_ancillas
+        flips = np.zeros((num_patterns, self.num_data_qubits), dtype=np.uint8)
+        for i in range(num_patterns):
+            syndrome = bulk[i].copy()
+            syndrome[final_offset:] ^= final_defects[i] # Final defects on the last round slice (as for pymatching)
+            defect_nodes = list(np.flatnonzero(syndrome))
+            if parity[i] == 1:
+                defect_nodes.append(boundary_node)
+            flips[i] = self.matching_to_data_flips(match([int(n) for n in defect_nodes]), edge_to_qubit)
+        return flips
+
+    def matching_to_data_flips(self, matching, edge_to_qubit):
+        """
+        Converts a set of matched graph edges into a (data_qubits,) 0/1 flip vector.
+        """
+        flips = np.zeros(self.num_data_qubits, dtype=np.uint8)
+        for edge in matching:
+            qubit = edge_to_qubit.get(edge)
+            if qubit is not None:
+                flips[qubit] ^= 1
+        return flips
+
+# --- Parse Many Qiskit Bitstrings into Shot Arrays ---
+def parse_measured_strings(measured_strings, num_rounds, num_x_ancillas, num_z_ancillas):
+    """
+    Converts Qiskit bitstrings ('sx sz res', e.g., from get_memory()) into shot arrays for decode_batch.
+
+    Returns:
+        tuple: (sx, sz, res) uint8 arrays of shapes
+            (shots, rounds, x_ancillas), (shots, rounds, z_ancillas), (shots, data_qubits).
+    """
+    num_sx = num_rounds * num_x_ancillas
+    num_sz = num_rounds * num_z_ancillas
+    cleaned = "".join(measured_strings).replace(" ", "").encode()
+    bits = np.frombuffer(cleaned, dtype=np.uint8).reshape(len(measured_strings), -1) - ord('0')
+
+    # [:, ::-1] reverses the bits to match the order (e.g., R0, R1, R2...)
+    sx = bits[:, 0:num_sx][:, ::-1].reshape(-1, num_rounds, num_x_ancillas)
+    sz = bits[:, num_sx:num_sx + num_sz][:, ::-1].reshape(-1, num_rounds, num_z_ancillas)
+    res = np.ascontiguousarray(bits[:, num_sx + num_sz:][:, ::-1])
+    return np.ascontiguousarray(sx), np.ascontiguousarray(sz), res
+
+# --- Count Outcome Codes ---
+def outcome_counts(outcomes):
+    """
+    Converts decode_batch outcome codes into an error report dict ({'NE': n, 'CE': n, 'UE': n}).
+    """
+    counts = np.bincount(outcomes, minlength=len(OUTCOME_LABELS))
+    return {label: int(counts[i]) for i, label in enumerate(OUTCOME_LABELS)}
+
+# --- Decoder Cache for the Single-Shot Path ---
+def hashable_graph_setting(value):
+    """
+    Converts a decoding graph setting (edge list, probability or per-ancilla probability array) into a hashable key.
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(hashable_graph_setting(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+@lru_cache(maxsize=16)
+def get_cached_decoder(num_rounds, num_x_ancillas, num_z_ancillas, spatial_edges_z, spatial_edges_x,
+                       prob_data_x, prob_data_z, prob_meas_z, prob_meas_x, d):
+    """
+    SurfaceCodeDecoder (networkx engine) for one graph key, built once per key
+    (arguments: see hashable_graph_setting; tuples of probabilities become per-ancilla arrays again).
+    """
+    def unpack(prob):
+        return np.asarray(prob) if isinstance(prob, tuple) else prob
+    return SurfaceCodeDecoder(
+        num_rounds, num_x_ancillas, num_z_ancillas,
+        list(spatial_edges_z), list(spatial_edges_x),
+        unpack(prob_data_x), unpack(prob_data_z), unpack(prob_meas_z), unpack(prob_meas_x),
+        d=d
+    )
 
 # --- Main Reporting Function ---
 def run_error_correction_and_reporting(
     measured_string, num_rounds, num_data_qubits, num_x_ancillas, num_z_ancillas,
     spatial_edges_z, spatial_edges_x, prob_data_x, prob_data_z, prob_meas_z, prob_meas_x,
     injected_error_group, injected_data_flip_index, injected_ancilla_flip_index,
-    enable_debug_printing=False): 
+    enable_debug_printing=False, decoder=None): 
     
-    (z_stabilizers, x_stabilizers, 
-     z_spatial_map, z_boundary_map, 
-     x_spatial_map, x_boundary_map) = get_stabilizer_and_decoding_maps()
+    # Reuse a precompiled decoder when given; otherwise one decoder per graph key is built once and cached
+    if decoder is None:
+        decoder = get_cached_decoder(
+            num_rounds, num_x_ancillas, num_z_ancillas,
+            hashable_graph_setting(spatial_edges_z), hashable_graph_setting(spatial_edges_x),
+            hashable_graph_setting(prob_data_x), hashable_graph_setting(prob_data_z),
+            hashable_graph_setting(prob_meas_z), hashable_graph_setting(prob_meas_x),
+            distance_from_num_data_qubits(num_data_qubits)
+        )
+
     
     # --- 1. Parsing ---
     # Parse the long measurement string into separate arrays
@@ -162,18 +637,16 @@ def run_error_correction_and_reporting(
 
     # --- 4. Boundary Defect Calculation ---
     # Calculate the "final" syndrome based on the measured data qubits (res_bits)
-    final_z_syndrome = calculate_syndrome_from_res(res_bits, z_stabilizers, num_z_ancillas)
-    # Note: X-syndrome from res_bits is assumed 0 as we only correct Z-errors on res_bits
-    final_x_syndrome = np.zeros(num_x_ancillas, dtype=int) 
+    final_z_syndrome = (decoder.H_Z @ np.array(res_bits)) % 2
+    # Note: res_bits is a Z-basis readout, so it gives no final X-syndrome. The X-graph is matched over
+    # the measured rounds only (no final X-defects), and a last-round sx flip is not a logical error.
     
     # The final defect is the XOR between the last measurement (R_T-1) and the final calculated syndrome
     final_z_defects = np.bitwise_xor(sz_syndromes[num_rounds-1, :], final_z_syndrome)
-    final_x_defects = np.bitwise_xor(sx_syndromes[num_rounds-1, :], final_x_syndrome)
 
     # --- 5. MWPM Graph Creation (Total Parity Check) ---
     
     # Z-Graph (for correcting X-errors)
-    z_graph = create_decoding_graph(num_rounds, num_z_ancillas, spatial_edges_z, z_boundary_map, prob_data_x, prob_meas_z)
     z_defect_nodes = []
     z_boundary_node = num_rounds * num_z_ancillas # Index of the single boundary node
     
@@ -188,125 +661,50 @@ def run_error_correction_and_reporting(
     final_z_defect_count = 0
     for a in range(num_z_ancillas):
         if final_z_defects[a] == 1:
-            # This defect is located at the node in the *final* round (R_T-1 slice)
-            z_defect_nodes.append((num_rounds - 1) * num_z_ancillas + a)
+            # This defect is located at the node in the *final* round (R_T-1 slice);
+            # it cancels a bulk defect already on that node
+            node = (num_rounds - 1) * num_z_ancillas + a
+            if node in z_defect_nodes:
+                z_defect_nodes.remove(node)
+            else:
+                z_defect_nodes.append(node)
             final_z_defect_count += 1
             
     # Check parity of *all* defects. If odd, pair one with the boundary.
     if len(z_defect_nodes) % 2 == 1:
         z_defect_nodes.append(z_boundary_node)
     
-    # Create the complete graph K_z for matching
-    K_z = nx.Graph()
-    for u, v in itertools.combinations(z_defect_nodes, 2):
-        path_weight = nx.shortest_path_length(z_graph, source=u, target=v, weight='weight')
-        K_z.add_edge(u, v, weight=path_weight)
-        
-    # Find the minimum weight perfect matching
-    z_matching_edges = nx.min_weight_matching(K_z)
-    
-    # Convert the matching on K_z back to a set of edges on the original z_graph
-    z_matching = set()
-    for u, v in z_matching_edges:
-        path = nx.shortest_path(z_graph, source=u, target=v, weight='weight')
-        for i in range(len(path) - 1):
-            z_matching.add(tuple(sorted((path[i], path[i+1]))))
+    # MWPM on the complete graph K_z (shortest paths by Dijkstra from the defects)
+    z_matching = decoder.match_z(z_defect_nodes)
 
     # X-Graph (for correcting Z-errors)
-    x_graph = create_decoding_graph(num_rounds, num_x_ancillas, spatial_edges_x, x_boundary_map, prob_data_z, prob_meas_x)
     x_defect_nodes = []
     x_boundary_node = num_rounds * num_x_ancillas 
 
-    # 1. Add bulk defects (R0, R1, ...)
+    # 1. Add bulk defects (R0, R1, ...) (no final X-defects, see above)
     for r in range(num_rounds):
         for a in range(num_x_ancillas):
             if x_defects[r, a] == 1:
                 x_defect_nodes.append(r * num_x_ancillas + a)
-
-    # 2. Add final boundary defects
-    final_x_defect_count = 0
-    for a in range(num_x_ancillas):
-        if final_x_defects[a] == 1:
-            # This defect is located at the node in the *final* round (R_T-1 slice)
-            x_defect_nodes.append((num_rounds - 1) * num_x_ancillas + a)
-            final_x_defect_count += 1
             
     # Check parity. If odd, pair one with the boundary.
     if len(x_defect_nodes) % 2 == 1:
         x_defect_nodes.append(x_boundary_node)
 
-    # Create the complete graph K_x for matching
-    K_x = nx.Graph()
-    for u, v in itertools.combinations(x_defect_nodes, 2):
-        path_weight = nx.shortest_path_length(x_graph, source=u, target=v, weight='weight')
-        K_x.add_edge(u, v, weight=path_weight)
-        
-    # Find the minimum weight perfect matching
-    x_matching_edges = nx.min_weight_matching(K_x)
-    
-    # Convert the matching on K_x back to a set of edges on the original x_graph
-    x_matching = set()
-    for u, v in x_matching_edges:
-        path = nx.shortest_path(x_graph, source=u, target=v, weight='weight')
-        for i in range(len(path) - 1):
-            x_matching.add(tuple(sorted((path[i], path[i+1]))))
+    # MWPM on the complete graph K_x (shortest paths by Dijkstra from the defects)
+    x_matching = decoder.match_x(x_defect_nodes)
 
     # --- 6. Apply Correction ---
     
     corrected_res_bits = np.array(res_bits)
-    # We apply Z-error corrections to the *syndrome* (or defect), not the res_bits
-    corrected_final_x_syndrome = np.array(final_x_defects) 
     
     # Z-Graph (X-Error) Correction -> Flips res_bits
-    for u, v in z_matching:
-        edge_data = z_graph.get_edge_data(u, v)
-        if edge_data is None: continue
-        edge_type = edge_data['type']
-        
-        if edge_type == 'spatial':
-            # This edge corresponds to a data qubit flip
-            ancilla_pair = edge_data['qubits'][0] 
-            key = tuple(sorted(ancilla_pair)) 
-            qubit_to_flip = z_spatial_map.get(key)
-            if qubit_to_flip is not None:
-                corrected_res_bits[qubit_to_flip] = 1 - corrected_res_bits[qubit_to_flip]
-                
-        elif edge_type == 'boundary':
-            # This edge corresponds to a data qubit flip at the boundary
-            ancilla_idx = edge_data['qubits'][0][0] 
-            qubit_to_flip = z_boundary_map.get(ancilla_idx)
-            if qubit_to_flip is not None:
-                corrected_res_bits[qubit_to_flip] = 1 - corrected_res_bits[qubit_to_flip]
-
-    # X-Graph (Z-Error) Correction -> Flips the final_x_syndrome
-    # We are tracking the *logical* Z error, which is detected by the final X-stabilizers
-    for u, v in x_matching:
-        edge_data = x_graph.get_edge_data(u, v)
-        if edge_data is None: continue
-        edge_type = edge_data['type']
-        
-        if edge_type == 'spatial':
-            ancilla_pair = edge_data['qubits'][0]
-            key = tuple(sorted(ancilla_pair))
-            qubit_to_flip = x_spatial_map.get(key) # This is a Z-error on d[qubit_to_flip]
-            
-            if qubit_to_flip is not None: 
-                # Find all X-stabilizers that measure this data qubit
-                for a_idx, data_qubits in enumerate(x_stabilizers.values()):
-                    if f'd[{qubit_to_flip}]' in data_qubits:
-                        # Flip the corresponding syndrome bit
-                        corrected_final_x_syndrome[a_idx] = 1 - corrected_final_x_syndrome[a_idx]
-
-        elif edge_type == 'boundary':
-            ancilla_idx = edge_data['qubits'][0][0]
-            qubit_to_flip = x_boundary_map.get(ancilla_idx) # Z-error on d[qubit_to_flip]
-
-            if qubit_to_flip is not None: 
-                # Find all X-stabilizers that measure this data qubit
-                for a_idx, data_qubits in enumerate(x_stabilizers.values()):
-                    if f'd[{qubit_to_flip}]' in data_qubits:
-                        # Flip the corresponding syndrome bit
-                        corrected_final_x_syndrome[a_idx] = 1 - corrected_final_x_syndrome[a_idx]
+    x_error_flips = decoder.matching_to_data_flips(z_matching, decoder.z_edge_to_qubit)
+    corrected_res_bits ^= x_error_flips
+
+    # X-Graph (Z-Error) Correction -> Z-errors commute with the Z-basis readout (res_bits),
+    # so they are only reported (debug dump), they cannot flip Z_L
+    z_error_flips = decoder.matching_to_data_flips(x_matching, decoder.x_edge_to_qubit)
 
     # --- 7. Error Reporting ---
     
@@ -314,23 +712,20 @@ def run_error_correction_and_reporting(
                           (injected_error_group == 'Measurement' and injected_ancilla_flip_index is None)
 
     # 1. Recalculate Z-stabilizers with the *corrected* res_bits
-    corrected_final_z_syndrome = calculate_syndrome_from_res(corrected_res_bits, z_stabilizers, num_z_ancillas)
+    corrected_final_z_syndrome = (decoder.H_Z @ corrected_res_bits) % 2
     
     # 2. Check for Logical-X error
     # This is the parity of the logical Z-operator (e.g., Z_L = d[2]d[7]d[12])
-    logical_x_error_parity = corrected_res_bits[2] ^ corrected_res_bits[7] ^ corrected_res_bits[12]
+    logical_x_error_parity = (decoder.logical_z @ corrected_res_bits) % 2
     
     # 3. Detect Logical-X error
     # A logical-X error is detected if:
     # a) Any Z-stabilizer is unsatisfied OR
     # b) The logical-Z operator parity is 1
+    # (A logical-Z error does not change a Z-basis readout, so it cannot be detected here)
     logical_x_error_detected = any(corrected_final_z_syndrome) or (logical_x_error_parity == 1)
     
-    # 4. Detect Logical-Z error
-    # A logical-Z error is detected if any (corrected) X-stabilizer is unsatisfied
-    logical_z_error_detected = any(corrected_final_x_syndrome)
-    
-    logical_error_detected = logical_x_error_detected or logical_z_error_detected
+    logical_error_detected = logical_x_error_detected
     
     # --- Debug Printing ---
     if enable_debug_printing and logical_error_detected:
@@ -349,37 +744,19 @@ def run_error_correction_and_reporting(
         print(f"Parsed res_bits: {res_bits}")
         print(f"X-Defects (R0..R{num_rounds-1}): {x_defects.T}")
         print(f"Z-Defects (R0..R{num_rounds-1}): {z_defects.T}")
-        print(f"Final X-Defects: {final_x_defects}")
         print(f"Final Z-Defects: {final_z_defects}")
 
-        # Recalculate defect nodes for printing (as they were modified by parity check)
-        debug_x_nodes = []
-        for r in range(num_rounds):
-            for a in range(num_x_ancillas):
-                if x_defects[r, a] == 1: debug_x_nodes.append(r*num_x_ancillas+a)
-        for a in range(num_x_ancillas):
-            if final_x_defects[a] == 1: debug_x_nodes.append((num_rounds-1)*num_x_ancillas+a)
-        if len(debug_x_nodes) % 2 == 1: debug_x_nodes.append(x_boundary_node)
-        
-        debug_z_nodes = []
-        for r in range(num_rounds):
-            for a in range(num_z_ancillas):
-                if z_defects[r, a] == 1: debug_z_nodes.append(r*num_z_ancillas+a)
-        for a in range(num_z_ancillas):
-            if final_z_defects[a] == 1: debug_z_nodes.append((num_rounds-1)*num_z_ancillas+a)
-        if len(debug_z_nodes) % 2 == 1: debug_z_nodes.append(z_boundary_node)
-
-        print(f"X-Defect Nodes (for MWPM): {debug_x_nodes}")
-        print(f"Z-Defect Nodes (for MWPM): {debug_z_nodes}")
+        print(f"X-Defect Nodes (for MWPM): {x_defect_nodes}")
+        print(f"Z-Defect Nodes (for MWPM): {z_defect_nodes}")
         
         print(f"X-Matching (edges): {x_matching}")
         print(f"Z-Matching (edges): {z_matching}")
         print(f"Original res_bits: {np.array(res_bits)}")
         print(f"Corrected res_bits: {corrected_res_bits}")
-        print(f"Corrected X-Syndrome: {corrected_final_x_syndrome} (Any={any(corrected_final_x_syndrome)})")
+        print(f"Z-Error Flips (X-Matching): {z_error_flips}")
         print(f"Corrected Z-Syndrome: {corrected_final_z_syndrome} (Any={any(corrected_final_z_syndrome)})")
         print(f"Logical X Parity (Z_L): {logical_x_error_parity}")
-        print(f"-> Result: logical_x_error: {logical_x_error_detected}, logical_z_error: {logical_z_error_detected}")
+        print(f"-> Result: logical_x_error: {logical_x_error_detected}")
         print("---------------------------------------")
     # --- [END DEBUG] ---
 
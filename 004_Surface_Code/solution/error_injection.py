@@ -1,6 +1,8 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from qiskit_aer.noise import NoiseModel, pauli_error, ReadoutError
 import sys
 import random
+import numpy as np
 
 # --- Example: Single Data Qubit Error ---
 # single data qubit error 'or' single measurement error
@@ -41,16 +43,19 @@ def error_injection_single_qubit_error_func(qc, flip_index, error_type='X'):
 
     return
 
-def post_process_measurement_error_func(measured_string, ancilla_flip_index, error_type, round_idx, num_z_ancillas, num_x_ancillas):
+def post_process_measurement_error_func(measured_string, ancilla_flip_index, error_type, round_idx, num_z_ancillas, num_x_ancillas, num_rounds=3):
     """
     Manually injects a single measurement error (classical bit flip)
     into the 'measured_string' obtained *after* simulator execution.
     This is for single-error injection tests.
+    num_rounds must match the syndrome registers of the circuit (generate_circuit_func).
     """
     if ancilla_flip_index is None:
         return measured_string
 
-    num_rounds = 3 # This code is fixed for d=3, 3 rounds
+    if not 0 <= round_idx < num_rounds:
+        print(f"Wrong Round Index: {round_idx} (num_rounds={num_rounds})")
+        sys.exit(1)
     num_total_sx_bits = num_rounds * num_x_ancillas
     num_total_sz_bits = num_rounds * num_z_ancillas
 
@@ -143,3 +148,131 @@ def post_process_ler_measurement_errors(measured_string, num_rounds, num_x_ancil
                         
     # Rejoin all error-injected strings and return
     return "".join(sx_bits) + "".join(sz_bits) + "".join(res_bits)
+
+# --- Batch measurement errors: (shots, rounds, ancillas) uint8 arrays (see error_correction.parse_measured_strings) ---
+def measurement_error_probabilities(prob_meas, num_rounds, num_ancillas):
+    """
+    Broadcasts a measurement error probability to one value per (round, ancilla).
+
+    Args:
+        prob_meas (float or array): scalar, (ancillas,) per ancilla, or (rounds, ancillas) per round and ancilla.
+
+    Returns:
+        np.ndarray: (rounds, ancillas) float probabilities.
+    """
+    prob_meas = np.asarray(prob_meas, dtype=float)
+    if prob_meas.ndim > 2 or (prob_meas.ndim >= 1 and prob_meas.shape[-1] != num_ancillas) or \
+            (prob_meas.ndim == 2 and prob_meas.shape[0] != num_rounds):
+        print(f"Wrong Measurement Error Probability Shape: {prob_meas.shape} (expected (), ({num_ancillas},) or ({num_rounds}, {num_ancillas}))")
+        sys.exit(1)
+    return np.broadcast_to(prob_meas, (num_rounds, num_ancillas))
+
+def inject_measurement_errors_batch(sx, sz, prob_meas_x, prob_meas_z, rng=None):
+    """
+    For LER testing on shot arrays (same error model as post_process_ler_measurement_errors):
+    flips every syndrome bit independently, one random draw per error class (X-ancillas, Z-ancillas).
+
+    Args:
+        sx, sz (np.ndarray): (shots, rounds, ancillas) uint8 X/Z-syndrome bits.
+        prob_meas_x, prob_meas_z (float or array): see measurement_error_probabilities.
+        rng (np.random.Generator): Random number generator (new one if None).
+
+    Returns:
+        tuple: (sx, sz) with the measurement errors applied (new arrays).
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    num_shots, num_rounds, num_x_ancillas = sx.shape
+    num_z_ancillas = sz.shape[2]
+
+    prob_x = measurement_error_probabilities(prob_meas_x, num_rounds, num_x_ancillas)
+    prob_z = measurement_error_probabilities(prob_meas_z, num_rounds, num_z_ancillas)
+
+    sx = sx ^ (rng.random(sx.shape) < prob_x).view(np.uint8)
+    sz = sz ^ (rng.random(sz.shape) < prob_z).view(np.uint8)
+    return sx, sz
+
+def inject_single_measurement_errors_batch(sx, sz, ancilla_flip_index, error_type, round_idx=0):
+    """
+    For single-error testing on shot arrays (same as post_process_measurement_error_func, one error per shot).
+
+    Args:
+        sx, sz (np.ndarray): (shots, rounds, ancillas) uint8 X/Z-syndrome bits (modified in place).
+        ancilla_flip_index (np.ndarray): (shots,) ancilla index per shot, -1 for no measurement error.
+        error_type (np.ndarray): (shots,) 'X' (sx flip), 'Z' or 'Y' (sz flip) per shot.
+        round_idx (int): Round of the measurement error.
+    """
+    ancilla_flip_index = np.asarray(ancilla_flip_index)
+    error_type = np.asarray(error_type)
+    flipped = ancilla_flip_index >= 0
+
+    x_shots = np.flatnonzero(flipped & (error_type == 'X'))
+    z_shots = np.flatnonzero(flipped & ((error_type == 'Z') | (error_type == 'Y')))
+    sx[x_shots, round_idx, ancilla_flip_index[x_shots]] ^= 1
+    sz[z_shots, round_idx, ancilla_flip_index[z_shots]] ^= 1
+    return
+
+# --- Multi-shot LER: errors sampled *inside* the simulator (Aer NoiseModel) ---
+def error_injection_noise_location_func(qc, num_data_qubits):
+    """
+    For multi-shot LER testing:
+    Marks one noisy location (identity gate) on *all* data qubits.
+    The NoiseModel from build_ler_noise_model attaches the X/Z errors to these 'id' gates,
+    so the circuit stays fixed and the simulator samples new errors for every shot.
+    (Transpile with optimization_level=0 so the 'id' gates are kept.)
+    """
+    for i in range(num_data_qubits):
+        qc.id(i)
+
+    return
+
+def build_ler_noise_model(num_data_qubits, num_z_ancillas, num_x_ancillas, prob_data_x, prob_data_z, prob_meas_x, prob_meas_z, include_measurement_errors=True):
+    """
+    For multi-shot LER testing:
+    Builds the NoiseModel equivalent to error_injection_logical_error_rate_func + post_process_ler_measurement_errors.
+    - 'id' gate on a data qubit: independent X (prob_data_x) and Z (prob_data_z) errors (Y if both).
+    - Measurement of a Z-ancilla (X-ancilla): classical bit flip with prob_meas_z (prob_meas_x).
+    Qubit order follows generate_circuit_func: d (data), cz (Z-ancillas), cx (X-ancillas).
+    include_measurement_errors=False: data errors only (measurement errors applied afterwards, e.g., inject_measurement_errors_batch).
+    """
+    # Only Clifford gates in the basis -> the circuit can run with the stabilizer method
+    noise_model = NoiseModel(basis_gates=['id', 'x', 'z', 'h', 'cx'])
+
+    data_error = pauli_error([
+        ('X', prob_data_x * (1 - prob_data_z)),
+        ('Z', (1 - prob_data_x) * prob_data_z),
+        ('Y', prob_data_x * prob_data_z),
+        ('I', (1 - prob_data_x) * (1 - prob_data_z))
+    ])
+    for i in range(num_data_qubits):
+        noise_model.add_quantum_error(data_error, 'id', [i])
+
+    if not include_measurement_errors:
+        return noise_model
+
+    z_meas_error = ReadoutError([[1 - prob_meas_z, prob_meas_z], [prob_meas_z, 1 - prob_meas_z]])
+    for a in range(num_z_ancillas):
+        noise_model.add_readout_error(z_meas_error, [num_data_qubits + a])
+
+    x_meas_error = ReadoutError([[1 - prob_meas_x, prob_meas_x], [prob_meas_x, 1 - prob_meas_x]])
+    for a in range(num_x_ancillas):
+        noise_model.add_readout_error(x_meas_error, [num_data_qubits + num_z_ancillas + a])
+
+    return noise_model
+
+def build_ler_pauli_frame_noise(num_data_qubits, num_z_ancillas, num_x_ancillas, prob_data_x, prob_data_z, prob_meas_x, prob_meas_z, include_measurement_errors=True):
+    """
+    For Pauli-frame LER testing (common/pauli_frame.py):
+    Same error model as build_ler_noise_model, in the (gate_noise, readout_noise) format of PauliFrameSimulator.
+    """
+    # 'id' is only placed on data qubits (error_injection_noise_location_func)
+    gate_noise = {'id': (prob_data_x * (1 - prob_data_z), prob_data_x * prob_data_z, (1 - prob_data_x) * prob_data_z)}
+
+    readout_noise = {}
+    if not include_measurement_errors:
+        return gate_noise, readout_noise
+    for a in range(num_z_ancillas):
+        readout_noise[num_data_qubits + a] = prob_meas_z
+    for a in range(num_x_ancillas):
+        readout_noise[num_data_qubits + num_z_ancillas + a] = prob_meas_x
+
+    return gate_noise, readout_noise
@@ -1,41 +1,29 @@
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from surface_code_layout import get_surface_code_layout
 
-def generate_circuit_func():
-    # Z-stabilizers (Ancilla -> Data Qubits)
-    z_stabilizers = {
-        'c_z[0]': ['d[0]', 'd[1]', 'd[3]'],
-        'c_z[1]': ['d[1]', 'd[2]', 'd[4]'],
-        'c_z[2]': ['d[3]', 'd[5]', 'd[6]', 'd[8]'],
-        'c_z[3]': ['d[4]', 'd[6]', 'd[7]', 'd[9]'],
-        'c_z[4]': ['d[8]', 'd[10]', 'd[11]'],
-        'c_z[5]': ['d[9]', 'd[11]', 'd[12]']
-    }
-
-    # X-stabilizers (Ancilla -> Data Qubits)
-    x_stabilizers = {
-        'c_x[0]': ['d[0]', 'd[3]', 'd[5]'],
-        'c_x[1]': ['d[1]', 'd[3]', 'd[4]', 'd[6]'],
-        'c_x[2]': ['d[2]', 'd[4]', 'd[7]'],
-        'c_x[3]': ['d[5]', 'd[8]', 'd[10]'],
-        'c_x[4]': ['d[6]', 'd[8]', 'd[9]', 'd[11]'],
-        'c_x[5]': ['d[7]', 'd[9]', 'd[12]']
-    }
+def generate_circuit_func(d=3, num_rounds=3):
+    # Stabilizers, register sizes, ... of the distance-d layout (surface_code_layout.py)
+    # e.g., d=3: Z-stabilizers 'c_z[0]': ('d[0]', 'd[1]', 'd[3]'), ... / X-stabilizers 'c_x[0]': ('d[0]', 'd[3]', 'd[5]'), ...
+    layout = get_surface_code_layout(d)
+    num_data_qubits = layout['num_data_qubits']
+    num_z_ancillas = layout['num_z_ancillas']
+    num_x_ancillas = layout['num_x_ancillas']
 
     # Register
-    # 13 Data Qubits
-    d = QuantumRegister(13, 'd')
-    # 6 Z-ancilla Qubits
-    cz = QuantumRegister(6, 'cz')
-    # 6 X-ancilla Qubits
-    cx = QuantumRegister(6, 'cx')
+    # Data Qubits (d=3: 13)
+    d = QuantumRegister(num_data_qubits, 'd')
+    # Z-ancilla Qubits (d=3: 6)
+    cz = QuantumRegister(num_z_ancillas, 'cz')
+    # X-ancilla Qubits (d=3: 6)
+    cx = QuantumRegister(num_x_ancillas, 'cx')
 
-    # 13 Data Qubit measurement results
-    res = ClassicalRegister(13, 'res')
-    # 3 round x 6 Z-syndrome bits
-    sz = ClassicalRegister(18, 'sz')
-    # 3 round x 6 X-syndrome bits
-    sx = ClassicalRegister(18, 'sx')
+    # Data Qubit measurement results
+    res = ClassicalRegister(num_data_qubits, 'res')
+    # num_rounds x Z-syndrome bits (round r -> sz[r*N_z : (r+1)*N_z])
+    sz = ClassicalRegister(num_rounds * num_z_ancillas, 'sz')
+    # num_rounds x X-syndrome bits
+    sx = ClassicalRegister(num_rounds * num_x_ancillas, 'sx')
 
     qc = QuantumCircuit(d, cz, cx, res, sz, sx)
 
-    return qc
\ No newline at end of file
+    return qc
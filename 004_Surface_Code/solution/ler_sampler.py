@@ -0,0 +1,287 @@
+import os
+import sys
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from qiskit_aer import AerSimulator
+from qiskit import transpile
+from tqdm import tqdm
+import generate_circuit
+import error_injection
+import syndrome_extraction
+import result_report
+import error_correction
+import detector_error_model
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from pauli_frame import PauliFrameSimulator
+from stage_profiler import stage
+
+# --- Multi-shot LER Sampler ---
+# One fixed circuit (noise locations instead of sampled gates), errors sampled per shot
+# by the Aer NoiseModel ('multi_shot') or the Pauli-frame simulator ('pauli_frame'),
+# measurement errors injected on the shot arrays, then batch decoding.
+LER_EXECUTION_MODES = ['multi_shot', 'pauli_frame']
+DECODING_GRAPHS = ['uniform', 'dem'] # Scalar-probability graphs / detector error model of the circuit
+
+def build_ler_circuit(num_rounds, num_data_qubits, d=3):
+    """
+    Builds the LER test circuit: |0_L> -> (noise locations + syndrome extraction) x num_rounds -> data measurement.
+    """
+    # 1. Generate Surface Code Layout
+    qc = generate_circuit.generate_circuit_func(d, num_rounds)
+    # Initialize in |0_L> state (reset keeps the circuit Clifford -> stabilizer simulation)
+    qc.reset(qc.qregs[0])
+    qc.barrier()
+
+    # 2. Noise Locations & Detection (Per Round)
+    for round_idx in range(num_rounds):
+        # Data qubit errors (X, Z) are sampled BEFORE syndrome measurement
+        error_injection.error_injection_noise_location_func(qc, num_data_qubits)
+        syndrome_extraction.syndrome_extraction_func(qc, round_idx)
+
+    # 3. Final data qubit measurement
+    result_report.result_report_func(qc)
+    return qc
+
+def logical_error_rate_per_round(ler, num_rounds):
+    """
+    Per-round logical error rate eps of a num_rounds memory experiment, assuming independent rounds:
+    P_L = (1 - (1 - 2 eps)^num_rounds) / 2  ->  eps = (1 - (1 - 2 P_L)^(1 / num_rounds)) / 2
+    (P_L >= 0.5: fully mixed, eps = 0.5). Makes LERs of different round counts (d, 10d, ...) comparable.
+    """
+    if ler >= 0.5:
+        return 0.5
+    return (1 - (1 - 2 * ler) ** (1 / num_rounds)) / 2
+
+def build_ler_decoder(config):
+    """
+    SurfaceCodeDecoder of a LER config (make_ler_config): config['decoding_graph'] 'uniform' -> graphs from the
+    prob_* weights, 'dem' -> graphs from the single faults of the sampled error model (incl. ler_prob_meas_x/z).
+    """
+    decoding_graph = config.get('decoding_graph', 'uniform')
+    if decoding_graph not in DECODING_GRAPHS:
+        print(f"Wrong Decoding Graph: {decoding_graph} (choose from {DECODING_GRAPHS})")
+        sys.exit(1)
+    dem_graphs = None
+    if decoding_graph == 'dem':
+        # Weights / edge maps from the single faults of the sampled error model (incl. ler_prob_meas_x/z)
+        noise_spec = detector_error_model.make_noise_spec(
+            config['num_rounds'], config['num_data_qubits'], config['num_x_ancillas'], config['num_z_ancillas'],
+            config['prob_data_x'], config['prob_data_z'], config['ler_prob_meas_x'], config['ler_prob_meas_z'])
+        dem_graphs = detector_error_model.build_dem_decoding_graphs(config['num_rounds'], noise_spec, config['d'])
+
+    return error_correction.SurfaceCodeDecoder(
+        config['num_rounds'], config['num_x_ancillas'], config['num_z_ancillas'],
+        config['spatial_edges_z'], config['spatial_edges_x'],
+        config['prob_data_x'], config['prob_data_z'], config['prob_meas_z'], config['prob_meas_x'],
+        engine=config['decoder_engine'], d=config['d'], detector_error_model=dem_graphs
+    )
+
+class LERSampler:
+    """
+    Samples and decodes LER test shots. Everything expensive (circuit, transpile, noise model, decoder)
+    is built once in the constructor; run() only samples and decodes.
+
+    Args:
+        config (dict): Keys of make_ler_config (layout, error model, decoder engine, execution mode, aer_threads).
+    """
+    def __init__(self, config):
+        self.config = config
+        self.num_rounds = config['num_rounds']
+        self.num_x_ancillas = config['num_x_ancillas']
+        self.num_z_ancillas = config['num_z_ancillas']
+        self.execution_mode = config['execution_mode']
+        if self.execution_mode not in LER_EXECUTION_MODES:
+            print(f"Wrong LER Execution Mode: {self.execution_mode}")
+            sys.exit(1)
+
+        with stage('decoder build'):
+            self.decoder = build_ler_decoder(config)
+
+        with stage('circuit build'):
+            qc = build_ler_circuit(config['num_rounds'], config['num_data_qubits'], config['d'])
+        noise_args = (config['num_data_qubits'], config['num_z_ancillas'], config['num_x_ancillas'],
+                      config['prob_data_x'], config['prob_data_z'], config['prob_meas_x'], config['prob_meas_z'])
+        if self.execution_mode == 'multi_shot':
+            with stage('error injection'):
+                # Measurement errors are injected on the shot arrays (run)
+                noise_model = error_injection.build_ler_noise_model(*noise_args, include_measurement_errors=False)
+            # aer_threads caps Aer's internal OpenMP threads (e.g., 1 per worker process)
+            self.simulator = AerSimulator(method='stabilizer', noise_model=noise_model,
+                                          max_parallel_threads=config.get('aer_threads') or 0)
+            with stage('transpile'):
+                self.trans_qc = transpile(qc, self.simulator, optimization_level=0) # keep the 'id' noise locations
+        else:
+            with stage('error injection'):
+                gate_noise, readout_noise = error_injection.build_ler_pauli_frame_noise(*noise_args, include_measurement_errors=False)
+            with stage('circuit build'):
+                self.frame_simulator = PauliFrameSimulator(qc, gate_noise=gate_noise, readout_noise=readout_noise)
+
+    def sample(self, num_shots, rng):
+        """
+        Returns:
+            tuple: (sx, sz, res) shot arrays (decode_batch format), measurement errors included.
+        """
+        if self.execution_mode == 'multi_shot':
+            # Aer draws its own random numbers: seed it from rng so the stream stays reproducible
+            seed = int(rng.integers(0, 2**31 - 1))
+            with stage('simulate'):
+                result = self.simulator.run(self.trans_qc, shots=num_shots, memory=True, seed_simulator=seed).result()
+            with stage('parse'):
+                sx, sz, res = error_correction.parse_measured_strings(
+                    result.get_memory(), self.num_rounds, self.num_x_ancillas, self.num_z_ancillas
+                )
+        else:
+            with stage('simulate'):
+                registers = self.frame_simulator.sample_registers(num_shots, rng)
+            with stage('parse'):
+                sx = registers['sx'].reshape(num_shots, self.num_rounds, self.num_x_ancillas)
+                sz = registers['sz'].reshape(num_shots, self.num_rounds, self.num_z_ancillas)
+                res = registers['res']
+
+        # Measurement errors (all shots, rounds and ancillas at once)
+        with stage('error injection'):
+            sx, sz = error_injection.inject_measurement_errors_batch(
+                sx, sz, self.config['ler_prob_meas_x'], self.config['ler_prob_meas_z'], rng
+            )
+        return sx, sz, res
+
+    def run(self, num_shots, rng):
+        """
+        Returns:
+            dict: Error report of num_shots shots ({'NE': n, 'CE': n, 'UE': n}).
+        """
+        sx, sz, res = self.sample(num_shots, rng)
+        with stage('decode'):
+            outcomes = self.decoder.decode_batch(sx, sz, res)
+        with stage('report'):
+            return error_correction.outcome_counts(outcomes)
+
+def make_ler_config(num_rounds, num_data_qubits, num_x_ancillas, num_z_ancillas, spatial_edges_z, spatial_edges_x,
+                    prob_data_x, prob_data_z, prob_meas_x, prob_meas_z, ler_prob_meas_x=None, ler_prob_meas_z=None,
+                    decoder_engine='networkx', execution_mode='multi_shot', aer_threads=None, d=3,
+                    decoding_graph='uniform'):
+    """
+    Collects the LERSampler settings into one (picklable) dict, so worker processes can rebuild the sampler.
+    ler_prob_meas_x/z default to prob_meas_x/z (see error_injection.measurement_error_probabilities for shapes).
+    decoding_graph: 'uniform' (create_decoding_graph, prob_* weights) or 'dem' (detector_error_model.py).
+    """
+    return {
+        'num_rounds': num_rounds, 'num_data_qubits': num_data_qubits,
+        'num_x_ancillas': num_x_ancillas, 'num_z_ancillas': num_z_ancillas,
+        'spatial_edges_z': list(spatial_edges_z), 'spatial_edges_x': list(spatial_edges_x),
+        'prob_data_x': prob_data_x, 'prob_data_z': prob_data_z, 'prob_meas_x': prob_meas_x, 'prob_meas_z': prob_meas_z,
+        'ler_prob_meas_x': prob_meas_x if ler_prob_meas_x is None else ler_prob_meas_x,
+        'ler_prob_meas_z': prob_meas_z if ler_prob_meas_z is None else ler_prob_meas_z,
+        'decoder_engine': decoder_engine, 'execution_mode': execution_mode, 'aer_threads': aer_threads,
+        'd': d, 'decoding_graph': decoding_graph,
+    }
+
+# --- Parallel Driver (ProcessPoolExecutor) ---
+# The trial budget is split into fixed-size chunks; chunk i always uses the i-th child of one SeedSequence.
+# The result therefore depends only on (seed, num_trials, shots_per_chunk), not on the number of workers
+# or on which worker finishes first. Counts are integers, so merging them is exact.
+worker_sampler = None # One LERSampler per worker process (built by init_ler_worker)
+
+def init_ler_worker(config):
+    global worker_sampler
+    worker_sampler = LERSampler(config)
+
+def run_ler_chunk(num_shots, seed_sequence):
+    rng = np.random.default_rng(seed_sequence)
+    return worker_sampler.run(num_shots, rng)
+
+def split_trials(num_trials, shots_per_chunk):
+    """
+    [shots_per_chunk, shots_per_chunk, ..., remainder]
+    """
+    chunks = [shots_per_chunk] * (num_trials // shots_per_chunk)
+    if num_trials % shots_per_chunk:
+        chunks.append(num_trials % shots_per_chunk)
+    return chunks
+
+class LERRunner:
+    """
+    Runs the LER test of one config many times (e.g., the batches of a threshold sweep point) without
+    rebuilding anything: one LERSampler (num_workers=1) or one process pool whose workers each build
+    their LERSampler once (init_ler_worker). Use as a context manager, or call close().
+
+    Args:
+        config (dict): From make_ler_config.
+        num_workers (int): Worker processes (None -> all cores). Aer is limited to 1 thread per worker
+            unless config['aer_threads'] is set.
+    """
+    def __init__(self, config, num_workers=1):
+        self.config = config
+        self.sampler = None
+        self.executor = None
+        if num_workers == 1:
+            self.sampler = LERSampler(config)
+        else:
+            num_workers = num_workers or os.cpu_count()
+            if config.get('aer_threads') is None:
+                config = dict(config, aer_threads=1) # workers x 1 thread: no oversubscription
+            # 'spawn': forking a process that already started Aer's OpenMP threads can deadlock the workers
+            self.executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=init_ler_worker, initargs=(config,))
+
+    def run(self, num_trials, shots_per_chunk=10000, seed=None, show_progress=True):
+        """
+        Runs num_trials shots (chunk i uses the i-th child of SeedSequence(seed)).
+
+        Args:
+            seed (int, list or None): Root seed (None -> fresh entropy, printed so the run can be reproduced).
+
+        Returns:
+            dict: Merged error report ({'NE': n, 'CE': n, 'UE': n}).
+        """
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+            print(f"LER seed: {seed}")
+        chunks = split_trials(num_trials, shots_per_chunk)
+        chunk_seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+        error_report = {label: 0 for label in error_correction.OUTCOME_LABELS}
+
+        pbar = tqdm(total=num_trials, desc=f"Running LER Test ({self.config['execution_mode']})", disable=not show_progress)
+        if self.sampler is not None:
+            for num_shots, chunk_seed in zip(chunks, chunk_seeds):
+                for status, count in self.sampler.run(num_shots, np.random.default_rng(chunk_seed)).items():
+                    error_report[status] += count
+                pbar.update(num_shots)
+        else:
+            futures = {self.executor.submit(run_ler_chunk, num_shots, chunk_seed): num_shots
+                       for num_shots, chunk_seed in zip(chunks, chunk_seeds)}
+            for future in as_completed(futures):
+                for status, count in future.result().items():
+                    error_report[status] += count
+                pbar.update(futures[future])
+        pbar.close()
+        return error_report
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def run_ler(config, num_trials, shots_per_chunk=10000, num_workers=1, seed=None, show_progress=True):
+    """
+    Runs the LER test over num_trials shots, serially (num_workers=1) or on a process pool
+    (one LERRunner for this call; keep an LERRunner to run the same config repeatedly).
+
+    Args:
+        config (dict): From make_ler_config.
+        num_workers (int): Worker processes (None -> all cores). Aer is limited to 1 thread per worker
+            unless config['aer_threads'] is set.
+        seed (int or None): Root seed (None -> fresh entropy, printed so the run can be reproduced).
+
+    Returns:
+        dict: Merged error report ({'NE': n, 'CE': n, 'UE': n}).
+    """
+    with LERRunner(config, num_workers) as runner:
+        return runner.run(num_trials, shots_per_chunk, seed, show_progress)
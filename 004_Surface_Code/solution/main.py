@@ -11,29 +11,89 @@ import error_injection
 import syndrome_extraction
 import result_report
 import error_correction
+import surface_code_layout
+import ler_sampler
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from stage_profiler import StageProfiler, stage
+
+def build_single_error_circuit(variant, num_rounds, simulator, d=3):
+    """
+    Builds and transpiles the single error test circuit of one variant.
+
+    Args:
+        variant (tuple or None): (data_flip_index, error_type) of the injected data qubit error, None for no error.
+
+    Returns:
+        QuantumCircuit: Transpiled circuit.
+    """
+    # 1. Generate Surface Code Layout
+    with stage('circuit build'):
+        qc = generate_circuit.generate_circuit_func(d, num_rounds)
+        # Initialize in |0_L> state (reset keeps the circuit Clifford -> stabilizer simulation)
+        qc.reset(qc.qregs[0])
+        qc.barrier()
+
+    # 2. Error Injection (Single specific error)
+    with stage('error injection'):
+        if variant is not None:
+            data_flip_index, error_type = variant
+            error_injection.error_injection_single_qubit_error_func(qc, data_flip_index, error_type)
+
+    with stage('circuit build'):
+        # 3. Error Detection
+        for round_idx in range(num_rounds):
+            syndrome_extraction.syndrome_extraction_func(qc, round_idx)
+
+        # 4. Result report
+        result_report.result_report_func(qc)
+
+    # optimization_level=0: keep the injected Paulis (a merged x-z would become a non-Clifford 'u' gate -> statevector)
+    with stage('transpile'):
+        return transpile(qc, simulator, optimization_level=0)
 
 def main():
     # 0. Setup (weight = -ln(p))
     d=3 # code distance
     error_report = {'NE':0, 'CE':0, 'UE':0} # No Error (NE) / Correctable Error (CE) / Uncorrectable Error (UE)
     simulator = AerSimulator()
-    num_data_qubits = 13
-    num_x_ancillas = 6
-    num_z_ancillas = 6
+    layout = surface_code_layout.get_surface_code_layout(d) # Stabilizers / registers / decoding maps of distance d
+    num_data_qubits = layout['num_data_qubits'] # d=3: 13
+    num_x_ancillas = layout['num_x_ancillas'] # d=3: 6
+    num_z_ancillas = layout['num_z_ancillas'] # d=3: 6
     num_trials = 100 # Monte-Carlo Simulation
-    num_rounds = 3  # syndrome extraction round
+    num_rounds = 3  # syndrome extraction rounds (any number >= 1, e.g., d or 10*d for memory experiments)
     # Error Model
     prob_data_x = 0.001  # For Z-Decoding Graph (Space)
     prob_data_z = 0.001  # For X-Decoding Graph (Space)
     prob_meas_z = 0.01  # For Z-Decoding Graph (Time)
     prob_meas_x = 0.01  # For X-Decoding Graph (Time)
+    # LER test measurement errors (multi_shot / pauli_frame): scalar, per ancilla (ancillas,) or per round and ancilla (rounds, ancillas)
+    ler_prob_meas_z = prob_meas_z
+    ler_prob_meas_x = prob_meas_x
+    # Decoder engine: 'networkx' (reference MWPM) / 'pymatching' (sparse blossom, much faster) / 'union_find' (near-linear time)
+    decoder_engine = 'networkx'
+    # LER execution mode: 'multi_shot' (one circuit, errors sampled by an Aer NoiseModel, decode_batch)
+    #                     'pauli_frame' (one circuit, errors propagated as bit-packed Pauli frames, no simulator per shot)
+    #                     'per_trial'  (fresh circuit + transpile + 1-shot run per trial)
+    ler_execution_mode = 'multi_shot'
+    ler_shots_per_job = 10000 # Max shots per simulator job (multi_shot / pauli_frame)
+    ler_num_workers = 1 # Worker processes for multi_shot / pauli_frame (None -> all cores, Aer limited to 1 thread each)
+    ler_seed = None # Root seed of the LER test (None -> fresh entropy, printed)
+    # LER decoding graphs: 'uniform' (weights from prob_*) / 'dem' (detector error model of the circuit, detector_error_model.py)
+    ler_decoding_graph = 'uniform'
+    # Profiling (common/stage_profiler.py): wall time / calls per stage are always recorded
+    profile_modes = [] # Opt-in: 'tracemalloc' (peak memory per stage), 'cprofile' (top functions)
+    profile_json_path = None # e.g., 'profile_004.json' (None -> print only)
 
-    Error_Data_Cases = [None, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
-    Error_Ancilla_Cases = [None, 0, 1, 2, 3, 4, 5]
+    Error_Data_Cases = [None] + list(range(num_data_qubits)) # d=3: [None, 0, 1, ..., 12]
+    Error_Ancilla_Cases = [None] + list(range(min(num_x_ancillas, num_z_ancillas))) # d=3: [None, 0, ..., 5]
     Error_Group = ['Data', 'Measurement']
     Error_Types = ['X','Z','Y']
 
-    print("--- Surface Code Monte Carlo Test (d=3) ---")
+    profiler = StageProfiler(f'004 Surface Code (d={d})', profile_modes).start()
+    print(f"--- Surface Code Monte Carlo Test (d={d}) ---")
     print(f"Using {num_rounds} syndrome rounds.")
 
     print("--- Error Model (Probabilities) ---")
@@ -43,76 +103,81 @@ def main():
     print(f"X-Meas Error (p_meas_x):  {prob_meas_x} (Weight: {-np.log(prob_meas_x):.3f})")
     
     # 1-1. Generate Z_Decoding Graph (ZZ) with weight (Constant setup)
-    start_index_z_graph = [0, 0, 1, 2, 2, 3, 4]
-    end_index_z_graph = [1, 2, 3, 3, 4, 5, 5]
-    spatial_edges_z = list(zip(start_index_z_graph, end_index_z_graph))
+    # d=3: [(0, 1), (0, 2), (1, 3), (2, 3), (2, 4), (3, 5), (4, 5)]
+    spatial_edges_z = layout['spatial_edges_z']
 
     # 1-2. Generate X_Decoding Graph (XX) with weight (Constant setup)
-    start_index_x_graph = [0, 0, 1, 1, 2, 3, 4]
-    end_index_x_graph = [1, 3, 2, 4, 5, 4, 5]
-    spatial_edges_x = list(zip(start_index_x_graph, end_index_x_graph))
+    # d=3: [(0, 1), (0, 3), (1, 2), (1, 4), (2, 5), (3, 4), (4, 5)]
+    spatial_edges_x = layout['spatial_edges_x']
+
+    # 1-3. Precompile the decoder (graphs + matching data are built once; networkx: Dijkstra per shot from the defects)
+    with stage('decoder build'):
+        decoder = error_correction.SurfaceCodeDecoder(
+            num_rounds, num_x_ancillas, num_z_ancillas,
+            spatial_edges_z, spatial_edges_x,
+            prob_data_x, prob_data_z, prob_meas_z, prob_meas_x,
+            engine=decoder_engine, d=d
+        )
+    print(f"Decoder engine: {decoder_engine}")
     
     print(f"\n--- Test Correction Capabiliy (Single Error Injection) ---")
     print(f"Running {num_trials} trials for single error correction capability.")
 
     # Monte-Carlo Start (Single Error Test)
-    for trial_num in tqdm(range(num_trials), desc="Running Single Error Test"):
-        
-        # 1. Generate Surface Code Layout (Fresh circuit for each trial)
-        qc_main = generate_circuit.generate_circuit_func()
-        qc_main.initialize(0, qc_main.qregs[0])
-        qc_main.barrier()
-
-        # 2. Error Injection (Single specific error)
+    # 1. Draw all trials first, then group them by the circuit they need.
+    # Only the data qubit errors change the circuit (measurement errors are injected after simulation),
+    # so there are at most 13 x 3 + 1 (no error) distinct circuits ("variants").
+    trials_by_variant = {}
+    for trial_num in range(num_trials):
         data_flip_index = random.choice(Error_Data_Cases) 
         ancilla_flip_index = random.choice(Error_Ancilla_Cases)
         error_group = random.choice(Error_Group) 
         error_type = random.choice(Error_Types) 
 
-        if error_group == 'Data':
-            error_injection.error_injection_single_qubit_error_func(qc_main, data_flip_index, error_type)
+        if error_group == 'Data' and data_flip_index is not None:
+            variant = (data_flip_index, error_type)
+        else:
+            variant = None # No circuit-level error
+        trials_by_variant.setdefault(variant, []).append((data_flip_index, ancilla_flip_index, error_group, error_type))
 
-        # 3. Error Detection
-        for round_idx in range(num_rounds):
-            syndrome_extraction.syndrome_extraction_func(qc_main, round_idx)
+    # 2. Transpiled circuit of each variant (built once, reused by every trial of the variant)
+    transpiled_circuits_map = {}
 
-        # 4. Result report
-        result_report.result_report_func(qc_main)
-
-        # 5. Run Simulator
-        trans_qc_main = transpile(qc_main, simulator)
-        result = simulator.run(trans_qc_main, shots=1).result() 
-        counts = result.get_counts()
-        measured_string = list(counts.keys())[0]
-
-        # 6. Post-Process -> Measurement Error Injection (Single specific error)
-        if error_group == 'Measurement':
-            measured_string = error_injection.post_process_measurement_error_func(
-                measured_string, ancilla_flip_index, error_type, 
-                round_idx=0, # Single error test only injects at R0
-                num_z_ancillas=num_z_ancillas, 
-                num_x_ancillas=num_x_ancillas
-            )
-
-        # 7. Error Correction (MWPM, using Decoding Graph) and Reporting
-        status = error_correction.run_error_correction_and_reporting(
-            measured_string=measured_string,
-            num_rounds=num_rounds,
-            num_data_qubits=num_data_qubits,
-            num_x_ancillas=num_x_ancillas,
-            num_z_ancillas=num_z_ancillas,
-            spatial_edges_z=spatial_edges_z,
-            spatial_edges_x=spatial_edges_x,
-            prob_data_x=prob_data_x,
-            prob_data_z=prob_data_z,
-            prob_meas_z=prob_meas_z,
-            prob_meas_x=prob_meas_x,
-            injected_error_group=error_group,
-            injected_data_flip_index=data_flip_index,
-            injected_ancilla_flip_index=ancilla_flip_index
-        )
+    with tqdm(total=num_trials, desc="Running Single Error Test") as pbar:
+        for variant, variant_trials in trials_by_variant.items():
+            if variant not in transpiled_circuits_map:
+                transpiled_circuits_map[variant] = build_single_error_circuit(variant, num_rounds, simulator, d)
+
+            # 3. Run Simulator (one multi-shot run for all trials of this variant)
+            trans_qc_main = transpiled_circuits_map[variant]
+            with stage('simulate'):
+                result = simulator.run(trans_qc_main, shots=len(variant_trials), memory=True).result()
+            with stage('parse'):
+                sx, sz, res = error_correction.parse_measured_strings(
+                    result.get_memory(), num_rounds, num_x_ancillas, num_z_ancillas
+                )
 
-        error_report[status] += 1
+            # 4. Post-Process -> Measurement Error Injection (Single specific error, all trials of the variant at once)
+            with stage('error injection'):
+                data_flip_indices, ancilla_flip_indices, error_groups, error_types = zip(*variant_trials)
+                is_measurement = np.array([group == 'Measurement' for group in error_groups])
+                ancilla_flip_indices = np.array([-1 if a is None else a for a in ancilla_flip_indices])
+                error_injection.inject_single_measurement_errors_batch(
+                    sx, sz,
+                    np.where(is_measurement, ancilla_flip_indices, -1),
+                    np.array(error_types),
+                    round_idx=0 # Single error test only injects at R0
+                )
+
+            # 5. Error Correction (MWPM, using Decoding Graph) and Reporting
+            with stage('decode'):
+                no_error_injected = np.where(is_measurement, ancilla_flip_indices < 0, [idx is None for idx in data_flip_indices])
+                outcomes = decoder.decode_batch(sx, sz, res, no_error_injected=no_error_injected)
+            with stage('report'):
+                for status, count in error_correction.outcome_counts(outcomes).items():
+                    error_report[status] += count
+            pbar.update(len(variant_trials))
+    print(f"Distinct circuits transpiled: {len(transpiled_circuits_map)}")
     # Monte-Carlo End (Single Error Test)
 
     print("\n--- Final Correction Report (Single Error Test) ---")
@@ -125,75 +190,100 @@ def main():
 
 
     # --- [LER Test Start] ---
-    print("\n--- Test Logical Error Rate (LER) (d=3) ---")
+    print(f"\n--- Test Logical Error Rate (LER) (d={d}) ---")
     print(f"Running {num_trials} trials with probabilistic errors.")
     print(f"Using {num_rounds} syndrome rounds.")
     
     error_report_ler = {'NE':0, 'CE':0, 'UE':0} # Reset report for LER test
 
-    for trial_num in tqdm(range(num_trials), desc="Running LER Test"):
+    if ler_execution_mode in ler_sampler.LER_EXECUTION_MODES:
+        # One circuit + noise model + decoder per process, shots split into chunks (seeded by one SeedSequence)
+        ler_config = ler_sampler.make_ler_config(
+            num_rounds, num_data_qubits, num_x_ancillas, num_z_ancillas,
+            spatial_edges_z, spatial_edges_x,
+            prob_data_x, prob_data_z, prob_meas_x, prob_meas_z,
+            ler_prob_meas_x=ler_prob_meas_x, ler_prob_meas_z=ler_prob_meas_z,
+            decoder_engine=decoder_engine, execution_mode=ler_execution_mode, d=d,
+            decoding_graph=ler_decoding_graph
+        )
+        error_report_ler = ler_sampler.run_ler(
+            ler_config, num_trials, shots_per_chunk=ler_shots_per_job,
+            num_workers=ler_num_workers, seed=ler_seed
+        )
+    else:
+        for trial_num in tqdm(range(num_trials), desc="Running LER Test"):
         
-        # 1. Generate Surface Code Layout (Fresh circuit)
-        qc_ler = generate_circuit.generate_circuit_func()
-        # Initialize in |0_L> state
-        qc_ler.initialize(0, qc_ler.qregs[0]) 
-        qc_ler.barrier()
+            # 1. Generate Surface Code Layout (Fresh circuit)
+            with stage('circuit build'):
+                qc_ler = generate_circuit.generate_circuit_func(d, num_rounds)
+                # Initialize in |0_L> state
+                qc_ler.initialize(0, qc_ler.qregs[0]) 
+                qc_ler.barrier()
 
-        # 2. Error Injection & Detection (Per Round)
-        for round_idx in range(num_rounds):
-            # Inject probabilistic data qubit errors (X, Z) BEFORE syndrome measurement
-            error_injection.error_injection_logical_error_rate_func(
-                qc_ler, 
-                num_data_qubits, 
-                prob_data_x, 
-                prob_data_z
-            )
+            # 2. Error Injection & Detection (Per Round)
+            for round_idx in range(num_rounds):
+                # Inject probabilistic data qubit errors (X, Z) BEFORE syndrome measurement
+                with stage('error injection'):
+                    error_injection.error_injection_logical_error_rate_func(
+                        qc_ler, 
+                        num_data_qubits, 
+                        prob_data_x, 
+                        prob_data_z
+                    )
             
-            # Run syndrome extraction circuit for this round
-            syndrome_extraction.syndrome_extraction_func(qc_ler, round_idx)
+                # Run syndrome extraction circuit for this round
+                with stage('circuit build'):
+                    syndrome_extraction.syndrome_extraction_func(qc_ler, round_idx)
             
-            # Note: Measurement errors are injected *after* simulation
-
-        # 3. Final data qubit measurement
-        result_report.result_report_func(qc_ler)
-
-        # 4. Run Simulator
-        trans_qc_ler = transpile(qc_ler, simulator)
-        result_ler = simulator.run(trans_qc_ler, shots=1).result() 
-        counts_ler = result_ler.get_counts()
-        measured_string_ler = list(counts_ler.keys())[0]
-
-        # 5. Post-Process -> Inject Probabilistic Measurement Errors (All rounds)
-        measured_string_with_meas_errors = error_injection.post_process_ler_measurement_errors(
-            measured_string_ler,
-            num_rounds,
-            num_x_ancillas,
-            num_z_ancillas,
-            prob_meas_x,
-            prob_meas_z
-        )
+                # Note: Measurement errors are injected *after* simulation
 
-        # 6. Error Correction (MWPM) and Reporting
-        # For LER test, we don't have a *single* known injected error,
-        # so we pass 'None' for the injection details.
-        status_ler = error_correction.run_error_correction_and_reporting(
-            measured_string=measured_string_with_meas_errors,
-            num_rounds=num_rounds,
-            num_data_qubits=num_data_qubits,
-            num_x_ancillas=num_x_ancillas,
-            num_z_ancillas=num_z_ancillas,
-            spatial_edges_z=spatial_edges_z,
-            spatial_edges_x=spatial_edges_x,
-            prob_data_x=prob_data_x,
-            prob_data_z=prob_data_z,
-            prob_meas_z=prob_meas_z,
-            prob_meas_x=prob_meas_x,
-            injected_error_group=None, # Not tracking a single injected error
-            injected_data_flip_index=None,
-            injected_ancilla_flip_index=None
-        )
+            # 3. Final data qubit measurement
+            with stage('circuit build'):
+                result_report.result_report_func(qc_ler)
+
+            # 4. Run Simulator
+            with stage('transpile'):
+                trans_qc_ler = transpile(qc_ler, simulator)
+            with stage('simulate'):
+                result_ler = simulator.run(trans_qc_ler, shots=1).result() 
+            with stage('parse'):
+                counts_ler = result_ler.get_counts()
+                measured_string_ler = list(counts_ler.keys())[0]
 
-        error_report_ler[status_ler] += 1
+            # 5. Post-Process -> Inject Probabilistic Measurement Errors (All rounds)
+            with stage('error injection'):
+                measured_string_with_meas_errors = error_injection.post_process_ler_measurement_errors(
+                    measured_string_ler,
+                    num_rounds,
+                    num_x_ancillas,
+                    num_z_ancillas,
+                    prob_meas_x,
+                    prob_meas_z
+                )
+
+            # 6. Error Correction (MWPM) and Reporting
+            # For LER test, we don't have a *single* known injected error,
+            # so we pass 'None' for the injection details.
+            with stage('decode'):
+                status_ler = error_correction.run_error_correction_and_reporting(
+                    measured_string=measured_string_with_meas_errors,
+                    num_rounds=num_rounds,
+                    num_data_qubits=num_data_qubits,
+                    num_x_ancillas=num_x_ancillas,
+                    num_z_ancillas=num_z_ancillas,
+                    spatial_edges_z=spatial_edges_z,
+                    spatial_edges_x=spatial_edges_x,
+                    prob_data_x=prob_data_x,
+                    prob_data_z=prob_data_z,
+                    prob_meas_z=prob_meas_z,
+                    prob_meas_x=prob_meas_x,
+                    injected_error_group=None, # Not tracking a single injected error
+                    injected_data_flip_index=None,
+                    injected_ancilla_flip_index=None,
+                    decoder=decoder
+                )
+
+            error_report_ler[status_ler] += 1
     # LER Monte-Carlo End
 
     print("\n--- LER Test Final Report ---")
@@ -204,10 +294,16 @@ def main():
     # LER is the probability that an uncorrectable error (UE) occurred.
     ler = error_report_ler['UE'] / num_trials
     print(f"Logical Error Rate (LER) (UE / Trials): {ler:.6f}")
+    print(f"Logical Error Rate per Round ({num_rounds} rounds): {ler_sampler.logical_error_rate_per_round(ler, num_rounds):.6f}")
     
     success_rate_ler = (error_report_ler['NE'] + error_report_ler['CE']) / num_trials * 100
     print(f"Success Rate (NE + CE): {success_rate_ler:.2f}%")
     print(f"Failure Rate (UE): {100.0 - success_rate_ler:.2f}%")
+
+    profiler.stop()
+    profiler.print_report()
+    if profile_json_path:
+        profiler.export_json(profile_json_path)
     # --- [⭐️ LER Test End ⭐️] ---
 
 
@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+import error_correction
+import ler_sampler
+import surface_code_layout
+import threshold_sweep
+from syndrome_dataset import SyndromeDataset
+
+# --- Offline Re-decode ---
+# Decodes a stored syndrome dataset (syndrome_dataset.py) with any decoder engine / weight set,
+# without simulating again: decoder R&D only costs decode time.
+# The dataset is split into chunks of shots; every worker process opens its own memory map
+# and builds the decoder once, then decodes the chunks it is given.
+DECODER_WEIGHT_KEYS = ['prob_data_x', 'prob_data_z', 'prob_meas_x', 'prob_meas_z']
+
+def make_redecode_decoder(header, decoder_engine, weights, decoding_graph='uniform'):
+    """
+    SurfaceCodeDecoder for the layout stored in the dataset header (built like the LER sampler's, ler_sampler.build_ler_decoder).
+
+    Args:
+        weights (dict): Decoder weights (DECODER_WEIGHT_KEYS, -ln(p) edge weights), missing keys -> values the shots were sampled with.
+        decoding_graph (str): 'uniform' (weights as scalar edge probabilities) or 'dem' (detector error model of the
+            weights; measurement flips: prob_meas_x/z if set in weights, else the sampled ler_prob_meas_x/z).
+    """
+    sampled = header.get('config') or {}
+    resolved = {key: weights.get(key, sampled.get(key)) for key in DECODER_WEIGHT_KEYS}
+    if any(value is None for value in resolved.values()):
+        print(f"Wrong Decoder Weights: {resolved} (not stored in the dataset header, set them explicitly)")
+        sys.exit(1)
+
+    layout = surface_code_layout.get_surface_code_layout(header['d'])
+    config = ler_sampler.make_ler_config(
+        header['num_rounds'], header['num_data_qubits'], header['num_x_ancillas'], header['num_z_ancillas'],
+        layout['spatial_edges_z'], layout['spatial_edges_x'],
+        resolved['prob_data_x'], resolved['prob_data_z'], resolved['prob_meas_x'], resolved['prob_meas_z'],
+        ler_prob_meas_x=weights.get('prob_meas_x', sampled.get('ler_prob_meas_x')),
+        ler_prob_meas_z=weights.get('prob_meas_z', sampled.get('ler_prob_meas_z')),
+        decoder_engine=decoder_engine, d=header['d'], decoding_graph=decoding_graph
+    )
+    return ler_sampler.build_ler_decoder(config)
+
+# --- Parallel Driver (ProcessPoolExecutor) ---
+worker_dataset = None # One memory map + decoder per worker process (built by init_redecode_worker)
+worker_decoder = None
+
+def init_redecode_worker(dataset_path, decoder_engine, weights, decoding_graph='uniform'):
+    global worker_dataset, worker_decoder
+    worker_dataset = SyndromeDataset(dataset_path)
+    worker_decoder = make_redecode_decoder(worker_dataset.header, decoder_engine, weights, decoding_graph)
+
+def decode_chunk(start, stop):
+    sx, sz, res = worker_dataset.read(start, stop)
+    return error_correction.outcome_counts(worker_decoder.decode_batch(sx, sz, res))
+
+def redecode(dataset_path, decoder_engine='pymatching', weights=None, shots_per_chunk=100000,
+             num_workers=1, max_shots=None, show_progress=True, decoding_graph='uniform'):
+    """
+    Decodes (the first max_shots shots of) a dataset.
+
+    Args:
+        weights (dict or None): Decoder weights (see make_redecode_decoder), None -> sampled values.
+        decoding_graph (str): 'uniform' or 'dem' (see make_redecode_decoder).
+        num_workers (int): Worker processes (None -> all cores).
+
+    Returns:
+        dict: Merged error report ({'NE': n, 'CE': n, 'UE': n}).
+    """
+    weights = weights or {}
+    dataset = SyndromeDataset(dataset_path)
+    num_shots = len(dataset) if max_shots is None else min(max_shots, len(dataset))
+    chunks = [(start, min(start + shots_per_chunk, num_shots)) for start in range(0, num_shots, shots_per_chunk)]
+    error_report = {label: 0 for label in error_correction.OUTCOME_LABELS}
+
+    pbar = tqdm(total=num_shots, desc=f"Re-decoding ({decoder_engine})", disable=not show_progress)
+    if num_workers == 1:
+        init_redecode_worker(dataset_path, decoder_engine, weights, decoding_graph)
+        for start, stop in chunks:
+            for status, count in decode_chunk(start, stop).items():
+                error_report[status] += count
+            pbar.update(stop - start)
+    else:
+        num_workers = num_workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_redecode_worker,
+                                 initargs=(dataset_path, decoder_engine, weights, decoding_graph)) as executor:
+            futures = {executor.submit(decode_chunk, start, stop): stop - start for start, stop in chunks}
+            for future in as_completed(futures):
+                for status, count in future.result().items():
+                    error_report[status] += count
+                pbar.update(futures[future])
+    pbar.close()
+    return error_report
+
+def main():
+    settings = {
+        'dataset_path': 'syndromes_d3_r3_p0.001.syn', # From syndrome_dataset.py
+        'decoder_engines': ['pymatching', 'union_find'],
+        'weights': {}, # e.g., {'prob_meas_x': 0.02} (missing keys -> sampled values)
+        'decoding_graph': 'uniform', # 'uniform' or 'dem' (detector error model of the weights)
+        'shots_per_chunk': 100000,
+        'num_workers': 1, # None -> all cores
+        'max_shots': None, # None -> whole dataset
+    }
+    dataset = SyndromeDataset(settings['dataset_path'])
+    header = dataset.header
+    print(f"--- Re-decode {settings['dataset_path']} (d={header['d']}, rounds={header['num_rounds']}, seed={header['seed']}) ---")
+    print(f"Decoder weights: {settings['weights'] or 'sampled values'} ({settings['decoding_graph']} decoding graph)")
+    if len(dataset) == 0 or settings['max_shots'] == 0:
+        print(f"Wrong Dataset: no shots to decode in {settings['dataset_path']}")
+        sys.exit(1)
+
+    for engine in settings['decoder_engines']:
+        start = time.perf_counter()
+        report = redecode(settings['dataset_path'], engine, settings['weights'], settings['shots_per_chunk'],
+                          settings['num_workers'], settings['max_shots'], decoding_graph=settings['decoding_graph'])
+        elapsed = time.perf_counter() - start
+
+        num_shots = sum(report.values())
+        ler = report['UE'] / num_shots
+        ci_low, ci_high = threshold_sweep.wilson_interval(report['UE'], num_shots)
+        print(f"{engine}: {report}")
+        print(f"  LER: {ler:.6f} (95% CI [{ci_low:.6f}, {ci_high:.6f}]), "
+              f"per round: {ler_sampler.logical_error_rate_per_round(ler, header['num_rounds']):.6f}")
+        print(f"  Decode time: {elapsed:.2f} s ({num_shots / max(elapsed, 1e-9):.0f} shots/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import sys
+from functools import lru_cache
+
+# --- Surface Code Layout Generator (any distance d) ---
+# Planar surface code on a (2d-1) x (2d-1) grid of coordinates (row r, column c):
+#   - Data qubits      : r + c even          -> d^2 + (d-1)^2 qubits, numbered row by row (d[0], d[1], ...)
+#   - Z-ancillas (c_z) : r even, c odd       -> d(d-1) ancillas, numbered row by row
+#   - X-ancillas (c_x) : r odd,  c even      -> d(d-1) ancillas, numbered row by row
+# Every ancilla measures its (up to 4) neighbouring data qubits (up/down/left/right).
+#
+# d=3 (same numbering as the original hand-written layout):
+#   d0  Z0  d1  Z1  d2
+#   X0  d3  X1  d4  X2
+#   d5  Z2  d6  Z3  d7
+#   X3  d8  X4  d9  X5
+#   d10 Z4  d11 Z5  d12
+#
+# Decoding graph (one per stabilizer type):
+#   - Spatial edge between two ancillas of the same type that share a data qubit (an error on it flips both).
+#   - Boundary edge for an ancilla next to a data qubit that no other ancilla of that type measures
+#     (left/right columns for Z, top/bottom rows for X).
+# Logical Z (Z_L): the data qubits of the rightmost column (d=3: d[2] d[7] d[12]).
+
+@lru_cache(maxsize=None)
+def get_surface_code_layout(d=3):
+    """
+    Builds every table of the distance-d layout from the coordinate rules above.
+
+    Args:
+        d (int): Code distance (>= 3; for d=2 a corner ancilla would have two boundary qubits).
+
+    Returns:
+        dict:
+            'd', 'num_data_qubits', 'num_z_ancillas', 'num_x_ancillas'
+            'data_coords', 'z_coords', 'x_coords' (list): (r, c) of every qubit, in index order
+            'z_stabilizers', 'x_stabilizers' (dict): {'c_z[a]': ('d[q]', ...)} (data qubits sorted by index)
+            'spatial_edges_z', 'spatial_edges_x' (list): sorted ancilla pairs (a_i, a_j), a_i < a_j
+            'z_spatial_map', 'x_spatial_map' (dict): {(a_i, a_j): shared data qubit index}
+            'z_boundary_map', 'x_boundary_map' (dict): {boundary ancilla index: boundary data qubit index}
+            'logical_z' (list): data qubit indices of the logical Z-operator
+    """
+    if not isinstance(d, int) or d < 3:
+        print(f"Wrong Code Distance: {d} (d >= 3)")
+        sys.exit(1)
+
+    size = 2 * d - 1
+    data_coords = [(r, c) for r in range(size) for c in range(size) if (r + c) % 2 == 0]
+    z_coords = [(r, c) for r in range(0, size, 2) for c in range(1, size, 2)]
+    x_coords = [(r, c) for r in range(1, size, 2) for c in range(0, size, 2)]
+    data_index = {coord: q for q, coord in enumerate(data_coords)}
+
+    def neighbours(coord):
+        r, c = coord
+        return sorted(data_index[n] for n in [(r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)] if n in data_index)
+
+    def stabilizer_tables(ancilla_coords, name):
+        supports = [neighbours(coord) for coord in ancilla_coords]
+        stabilizers = {f'{name}[{a}]': tuple(f'd[{q}]' for q in support) for a, support in enumerate(supports)}
+
+        # Data qubit -> ancillas measuring it (1 -> boundary qubit, 2 -> spatial edge)
+        checks_of_qubit = {}
+        for a, support in enumerate(supports):
+            for q in support:
+                checks_of_qubit.setdefault(q, []).append(a)
+
+        spatial_map = {}
+        boundary_map = {}
+        for q, ancillas in sorted(checks_of_qubit.items()):
+            if len(ancillas) == 2:
+                spatial_map[tuple(sorted(ancillas))] = q
+            else:
+                boundary_map[ancillas[0]] = q # (d >= 3: at most one boundary qubit per ancilla)
+
+        spatial_map = dict(sorted(spatial_map.items()))
+        boundary_map = dict(sorted(boundary_map.items()))
+        return stabilizers, list(spatial_map), spatial_map, boundary_map
+
+    z_stabilizers, spatial_edges_z, z_spatial_map, z_boundary_map = stabilizer_tables(z_coords, 'c_z')
+    x_stabilizers, spatial_edges_x, x_spatial_map, x_boundary_map = stabilizer_tables(x_coords, 'c_x')
+
+    return {
+        'd': d,
+        'num_data_qubits': len(data_coords),
+        'num_z_ancillas': len(z_coords),
+        'num_x_ancillas': len(x_coords),
+        'data_coords': data_coords,
+        'z_coords': z_coords,
+        'x_coords': x_coords,
+        'z_stabilizers': z_stabilizers,
+        'x_stabilizers': x_stabilizers,
+        'spatial_edges_z': spatial_edges_z,
+        'spatial_edges_x': spatial_edges_x,
+        'z_spatial_map': z_spatial_map,
+        'x_spatial_map': x_spatial_map,
+        'z_boundary_map': z_boundary_map,
+        'x_boundary_map': x_boundary_map,
+        'logical_z': [data_index[(r, size - 1)] for r in range(0, size, 2)],
+    }
+
+def distance_from_num_data_qubits(num_data_qubits):
+    """
+    Inverse of num_data_qubits = d^2 + (d-1)^2 (e.g., 13 -> 3), used to recover d from a circuit's 'd' register.
+    """
+    d = 3
+    while d**2 + (d - 1)**2 < num_data_qubits:
+        d += 1
+    if d**2 + (d - 1)**2 != num_data_qubits:
+        print(f"Wrong Number of Data Qubits: {num_data_qubits} (not d^2 + (d-1)^2)")
+        sys.exit(1)
+    return d
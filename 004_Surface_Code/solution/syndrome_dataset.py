@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import numpy as np
+from tqdm import tqdm
+import ler_sampler
+import threshold_sweep
+
+# --- Syndrome Dataset (bit-packed, append-only) ---
+# File layout:
+#   MAGIC (8 bytes) | header length (8 bytes, little-endian) | JSON header (padded with spaces to 64-byte alignment)
+#   | shot 0 | shot 1 | ...
+# Every shot is one fixed-size record: np.packbits (bitorder='little') of
+#   [sx (rounds x N_x, round-major), sz (rounds x N_z, round-major), res (N_data)]
+# The header stores the layout (d, rounds, register sizes), the sampler config (noise, decoder weights), the seed
+# and the chunk size. The shots are always the first shots of one chunk stream (chunk i <- i-th child of
+# SeedSequence(seed)), so the header describes every shot: appending is only accepted with the same header,
+# continues the stream after the stored chunks, and never rewrites the header.
+# The number of shots is (file size - data offset) // bytes per shot; a record cut off by an interrupted run is ignored.
+#
+# d=3, 3 rounds: 18 + 18 + 13 = 49 bits -> 7 bytes per shot (10^8 shots = 700 MB, vs. > 5 GB as counts strings)
+MAGIC = b'QECSYN01'
+HEADER_ALIGNMENT = 64
+
+def json_default(value):
+    """
+    json.dumps fallback for NumPy values in the header config (e.g., per-ancilla ler_prob_meas_x/z arrays).
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def make_dataset_header(num_rounds, num_data_qubits, num_x_ancillas, num_z_ancillas, d=3, config=None, seed=None,
+                        shots_per_chunk=None):
+    """
+    Header of a dataset (JSON-serializable dict; NumPy arrays in config are written as lists, see json_default).
+
+    Args:
+        config (dict): Sampler settings (ler_sampler.make_ler_config), stored for reproduction / default decoder weights.
+        seed (int or list): Root seed of the sampled shots.
+        shots_per_chunk (int): Shots per seed chunk (generate_dataset).
+    """
+    num_sx_bits = num_rounds * num_x_ancillas
+    num_sz_bits = num_rounds * num_z_ancillas
+    bits_per_shot = num_sx_bits + num_sz_bits + num_data_qubits
+    return {
+        'format': MAGIC.decode(),
+        'd': d, 'num_rounds': num_rounds, 'num_data_qubits': num_data_qubits,
+        'num_x_ancillas': num_x_ancillas, 'num_z_ancillas': num_z_ancillas,
+        'record': [['sx', num_sx_bits], ['sz', num_sz_bits], ['res', num_data_qubits]],
+        'bitorder': 'little',
+        'bits_per_shot': bits_per_shot,
+        'bytes_per_shot': (bits_per_shot + 7) // 8,
+        'config': config,
+        'seed': seed,
+        'shots_per_chunk': shots_per_chunk,
+    }
+
+def read_dataset_header(path):
+    """
+    Returns:
+        tuple: (header dict, data offset in bytes)
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            print(f"Wrong Dataset Format: {path}")
+            sys.exit(1)
+        header_length = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(header_length).decode())
+    return header, len(MAGIC) + 8 + header_length
+
+def pack_shots(sx, sz, res):
+    """
+    (shots, rounds, N_x), (shots, rounds, N_z), (shots, N_data) 0/1 arrays -> (shots, bytes_per_shot) uint8 records.
+    """
+    num_shots = res.shape[0]
+    bits = np.concatenate([sx.reshape(num_shots, -1), sz.reshape(num_shots, -1), res], axis=1).astype(np.uint8)
+    return np.packbits(bits, axis=1, bitorder='little')
+
+def unpack_shots(records, header):
+    """
+    (shots, bytes_per_shot) uint8 records -> (sx, sz, res) uint8 arrays in the decode_batch format.
+    """
+    num_shots = records.shape[0]
+    num_rounds = header['num_rounds']
+    bits = np.unpackbits(records, axis=1, count=header['bits_per_shot'], bitorder='little')
+    num_sx = num_rounds * header['num_x_ancillas']
+    num_sz = num_rounds * header['num_z_ancillas']
+    sx = bits[:, :num_sx].reshape(num_shots, num_rounds, header['num_x_ancillas'])
+    sz = bits[:, num_sx:num_sx + num_sz].reshape(num_shots, num_rounds, header['num_z_ancillas'])
+    res = bits[:, num_sx + num_sz:]
+    return sx, sz, res
+
+class SyndromeDatasetWriter:
+    """
+    Appends shots to a dataset file. A new file gets the header; an existing file is only appended to
+    if its whole header (layout, sampler config, seed, chunk size) matches, so every stored shot is
+    described by the one header. num_shots: shots in the file.
+    Use as a context manager: with SyndromeDatasetWriter(path, header) as writer: writer.append(sx, sz, res)
+    """
+    def __init__(self, path, header):
+        self.path = path
+        header_bytes = json.dumps(header, default=json_default).encode()
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            existing_header, self.data_offset = read_dataset_header(path)
+            header = json.loads(header_bytes) # Same JSON types as the stored header (lists, not tuples / arrays)
+            mismatches = [key for key in sorted(set(existing_header) | set(header)) if existing_header.get(key) != header.get(key)]
+            if mismatches:
+                print(f"Wrong Dataset Append: {path} was sampled with other settings ({', '.join(mismatches)} differ)")
+                sys.exit(1)
+            self.header = existing_header
+            self.file = open(path, 'r+b')
+            # Drop a record cut off by an interrupted run, then append
+            self.truncate((os.path.getsize(path) - self.data_offset) // self.header['bytes_per_shot'])
+        else:
+            self.header = header
+            header_bytes += b' ' * (-(len(MAGIC) + 8 + len(header_bytes)) % HEADER_ALIGNMENT)
+            self.file = open(path, 'wb')
+            self.file.write(MAGIC + len(header_bytes).to_bytes(8, 'little') + header_bytes)
+            self.data_offset = len(MAGIC) + 8 + len(header_bytes)
+            self.num_shots = 0
+
+    def truncate(self, num_shots):
+        """
+        Keeps the first num_shots shots of the file.
+        """
+        self.file.truncate(self.data_offset + num_shots * self.header['bytes_per_shot'])
+        self.file.seek(0, os.SEEK_END)
+        self.num_shots = num_shots
+
+    def append(self, sx, sz, res):
+        self.file.write(pack_shots(sx, sz, res).tobytes())
+        self.num_shots += res.shape[0]
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SyndromeDataset:
+    """
+    Read-only, memory-mapped view of a dataset: shots are unpacked only for the slice being decoded,
+    so datasets larger than RAM can be re-decoded chunk by chunk.
+
+    Attributes:
+        header (dict): See make_dataset_header.
+        records (np.memmap): (num_shots, bytes_per_shot) uint8 packed records.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.header, data_offset = read_dataset_header(path)
+        num_shots = (os.path.getsize(path) - data_offset) // self.header['bytes_per_shot']
+        if num_shots > 0:
+            self.records = np.memmap(path, dtype=np.uint8, mode='r', offset=data_offset,
+                                     shape=(num_shots, self.header['bytes_per_shot']))
+        else:
+            self.records = np.zeros((0, self.header['bytes_per_shot']), dtype=np.uint8)
+
+    def __len__(self):
+        return self.records.shape[0]
+
+    def read(self, start, stop):
+        """
+        Returns:
+            tuple: (sx, sz, res) of shots [start, stop) in the decode_batch format.
+        """
+        return unpack_shots(np.asarray(self.records[start:stop]), self.header)
+
+    def chunks(self, shots_per_chunk):
+        """
+        Yields (start, stop) of consecutive chunks covering the dataset.
+        """
+        for start in range(0, len(self), shots_per_chunk):
+            yield start, min(start + shots_per_chunk, len(self))
+
+def generate_dataset(config, path, num_shots, shots_per_chunk=100000, seed=None, show_progress=True):
+    """
+    Samples num_shots LER test shots (ler_sampler.LERSampler, measurement errors included) into a dataset file.
+    Chunk i uses the i-th child of SeedSequence(seed) (same chunking rule as ler_sampler.run_ler).
+
+    Appending to an existing file (same config, seed and shots_per_chunk; seed=None -> the stored seed) adds
+    num_shots shots by continuing the chunk stream: the file then holds exactly the shots of one run over the
+    total. A trailing partial chunk (short last chunk, interrupted run) is dropped and sampled again in full,
+    so no chunk seed is used twice.
+    """
+    if seed is None:
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            seed = read_dataset_header(path)[0]['seed']
+        else:
+            seed = np.random.SeedSequence().entropy
+            print(f"Dataset seed: {seed}")
+    header = make_dataset_header(config['num_rounds'], config['num_data_qubits'], config['num_x_ancillas'],
+                                 config['num_z_ancillas'], d=config['d'], config=config, seed=seed,
+                                 shots_per_chunk=shots_per_chunk)
+
+    with SyndromeDatasetWriter(path, header) as writer:
+        chunks = ler_sampler.split_trials(writer.num_shots + num_shots, shots_per_chunk)
+        chunk_seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+        num_stored_chunks = writer.num_shots // shots_per_chunk
+        writer.truncate(num_stored_chunks * shots_per_chunk)
+
+        sampler = ler_sampler.LERSampler(config)
+        new_chunks = list(zip(chunks, chunk_seeds))[num_stored_chunks:]
+        for chunk_shots, chunk_seed in tqdm(new_chunks, desc="Sampling Dataset", disable=not show_progress):
+            writer.append(*sampler.sample(chunk_shots, np.random.default_rng(chunk_seed)))
+    return path
+
+def main():
+    # Sample once, re-decode many times (see redecode.py)
+    d = 3
+    num_rounds = 3
+    p = 0.001 # p_data = p_meas = p
+    num_shots = 1000000
+    output_path = f'syndromes_d{d}_r{num_rounds}_p{p:g}.syn'
+
+    config = threshold_sweep.make_point_config(d, num_rounds, p, 'pymatching', 'pauli_frame')
+    generate_dataset(config, output_path, num_shots, seed=2024)
+    dataset = SyndromeDataset(output_path)
+    print(f"{output_path}: {len(dataset)} shots, {dataset.header['bytes_per_shot']} bytes per shot, "
+          f"{os.path.getsize(output_path) / 1e6:.1f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
+import sys
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from surface_code_layout import get_surface_code_layout, distance_from_num_data_qubits
 
 # Syndrome Measurement
 def syndrome_extraction_func(qc, round_idx):
@@ -9,95 +11,44 @@ def syndrome_extraction_func(qc, round_idx):
     sx = next(reg for reg in qc.cregs if reg.name == 'sx')
     res = next(reg for reg in qc.cregs if reg.name == 'res')
 
+    # Layout (stabilizer tables) of the code distance of this circuit (13 data qubits -> d=3)
+    layout = get_surface_code_layout(distance_from_num_data_qubits(len(d)))
+    num_z_ancillas = layout['num_z_ancillas']
+    num_x_ancillas = layout['num_x_ancillas']
+    num_rounds = len(sz) // num_z_ancillas # Syndrome registers hold num_rounds rounds (generate_circuit_func)
+    if not 0 <= round_idx < num_rounds:
+        print(f"Wrong Round Index: {round_idx} (num_rounds={num_rounds})")
+        sys.exit(1)
+
     # --- X-Stabilizer Measurement (XX) ---
     # Detect Phase flip (Z) error
-    qc.h(cx[0]) # c_x[0]
-    qc.h(cx[1]) # c_x[1]
-    qc.h(cx[2]) # c_x[2]
-    qc.h(cx[3]) # c_x[3]
-    qc.h(cx[4]) # c_x[4]
-    qc.h(cx[5]) # c_x[5]
-
-    qc.cx(d[0], cx[0]) # (d[0] -> c_x[0])
-    qc.cx(d[3], cx[0]) # (d[3] -> c_x[0])
-    qc.cx(d[5], cx[0]) # (d[5] -> c_x[0])
-
-    qc.cx(d[1], cx[1])
-    qc.cx(d[3], cx[1])
-    qc.cx(d[4], cx[1])
-    qc.cx(d[6], cx[1])
-
-    qc.cx(d[2], cx[2])
-    qc.cx(d[4], cx[2])
-    qc.cx(d[7], cx[2])
-
-    qc.cx(d[5], cx[3])
-    qc.cx(d[8], cx[3])
-    qc.cx(d[10], cx[3])
-
-    qc.cx(d[6], cx[4])
-    qc.cx(d[8], cx[4])
-    qc.cx(d[9], cx[4])
-    qc.cx(d[11], cx[4])
+    for a in range(num_x_ancillas):
+        qc.h(cx[a]) # c_x[a]
 
-    qc.cx(d[7], cx[5])
-    qc.cx(d[9], cx[5])
-    qc.cx(d[12], cx[5])
+    # e.g., c_x[0] = ('d[0]', 'd[3]', 'd[5]') -> (d[0] -> c_x[0]), (d[3] -> c_x[0]), (d[5] -> c_x[0])
+    for a, data_qubits in enumerate(layout['x_stabilizers'].values()):
+        for dq_str in data_qubits:
+            qc.cx(d[int(dq_str[2:-1])], cx[a])
 
-    qc.h(cx[0]) # c_x[0]
-    qc.h(cx[1]) # c_x[1]
-    qc.h(cx[2]) # c_x[2]
-    qc.h(cx[3]) # c_x[3]
-    qc.h(cx[4]) # c_x[4]
-    qc.h(cx[5]) # c_x[5]
+    for a in range(num_x_ancillas):
+        qc.h(cx[a]) # c_x[a]
     
     qc.barrier()
 
     # --- Z-Stabilizer Measurement (ZZ) ---
     # Detect Bit flip (X) error
-    qc.cx(d[0],cz[0]) # d[0] -> cz[0]
-    qc.cx(d[1],cz[0]) # d[1] -> cz[0]
-    qc.cx(d[3],cz[0]) # d[3] -> cz[0]
-
-    qc.cx(d[1],cz[1])
-    qc.cx(d[2],cz[1])
-    qc.cx(d[4],cz[1])
-
-    qc.cx(d[3],cz[2])
-    qc.cx(d[5],cz[2])
-    qc.cx(d[6],cz[2])
-    qc.cx(d[8],cz[2])
-
-    qc.cx(d[4],cz[3])
-    qc.cx(d[6],cz[3])
-    qc.cx(d[7],cz[3])
-    qc.cx(d[9],cz[3])
-
-    qc.cx(d[8],cz[4])
-    qc.cx(d[10],cz[4])
-    qc.cx(d[11],cz[4])
-
-    qc.cx(d[9],cz[5])
-    qc.cx(d[11],cz[5])
-    qc.cx(d[12],cz[5])
+    # e.g., c_z[0] = ('d[0]', 'd[1]', 'd[3]') -> d[0] -> cz[0], d[1] -> cz[0], d[3] -> cz[0]
+    for a, data_qubits in enumerate(layout['z_stabilizers'].values()):
+        for dq_str in data_qubits:
+            qc.cx(d[int(dq_str[2:-1])], cz[a])
 
     qc.barrier()
 
     # --- Ancilla Measurement ---
-    if round_idx==0:
-        qc.measure(cx, sx[0:6]) # XX (0, 1, 2, 3, 4, 5)
-        qc.measure(cz, sz[0:6]) # ZZ (0, 1, 2, 3, 4, 5)
-        qc.reset(cx)
-        qc.reset(cz)
-    elif round_idx==1:
-        qc.measure(cx, sx[6:12]) # XX (6, 7, 8, 9, 10, 11)
-        qc.measure(cz, sz[6:12]) # ZZ (6, 7, 8, 9, 10, 11)
-        qc.reset(cx)
-        qc.reset(cz)
-    else: # final round
-        qc.measure(cx, sx[12:18]) # XX
-        qc.measure(cz, sz[12:18]) # ZZ
-        qc.reset(cx)
-        qc.reset(cz)
+    # Round r -> sx[r*N_x : (r+1)*N_x], sz[r*N_z : (r+1)*N_z] (d=3, round 0: sx[0:6], sz[0:6])
+    qc.measure(cx, sx[round_idx * num_x_ancillas:(round_idx + 1) * num_x_ancillas]) # XX
+    qc.measure(cz, sz[round_idx * num_z_ancillas:(round_idx + 1) * num_z_ancillas]) # ZZ
+    qc.reset(cx)
+    qc.reset(cz)
     
-    return
\ No newline at end of file
+    return
@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import ler_sampler
+import surface_code_layout
+
+# --- Threshold Sweep ---
+# Runs the LER test on a grid of (code distance d, physical error rate p, syndrome rounds).
+# - Scheduling: cheapest points first (small circuits, high p -> enough failures after few shots).
+# - Each point stops once it has target_failures uncorrectable errors (or max_shots shots),
+#   so every LER has a similar relative error instead of a fixed shot count.
+# - Every finished point is appended to a JSON-lines file right away; a rerun skips the points
+#   already in the file, so an interrupted sweep can be resumed (and its partial results used).
+#   A record is only reused if it was run with the same point settings (seed, stopping rule, chunking, engine, mode).
+# - Threshold: p where the per-round LER curves of two distances cross (below it, larger d -> lower LER).
+#   Pairs of curves that do not cross are reported with the reason (larger d worse / better everywhere).
+# - Rounds rules: an int (fixed), None / 'd' (d rounds) or 'kd' (k*d rounds, e.g., '10d').
+
+def resolve_rounds(rounds_rule, d):
+    """
+    Number of syndrome rounds of a rounds rule at distance d (e.g., '10d' at d=3 -> 30).
+    """
+    if rounds_rule is None:
+        return d
+    if isinstance(rounds_rule, str) and rounds_rule.endswith('d') and (rounds_rule[:-1] == '' or rounds_rule[:-1].isdigit()):
+        return int(rounds_rule[:-1] or 1) * d
+    if isinstance(rounds_rule, int) and rounds_rule >= 1:
+        return rounds_rule
+    print(f"Wrong Rounds Rule: {rounds_rule} (int >= 1, None, 'd' or 'kd')")
+    sys.exit(1)
+
+def make_point_config(d, num_rounds, p, decoder_engine, execution_mode):
+    """
+    LER sampler config of one sweep point (p_data_x = p_data_z = p_meas_x = p_meas_z = p).
+    The layout of any distance d >= 3 comes from surface_code_layout.py.
+    """
+    layout = surface_code_layout.get_surface_code_layout(d)
+    return ler_sampler.make_ler_config(
+        num_rounds, layout['num_data_qubits'], layout['num_x_ancillas'], layout['num_z_ancillas'],
+        layout['spatial_edges_z'], layout['spatial_edges_x'],
+        p, p, p, p, decoder_engine=decoder_engine, execution_mode=execution_mode, d=d
+    )
+
+def wilson_interval(failures, shots, z=1.96):
+    """
+    Wilson score interval of a binomial proportion (95% for z=1.96). Stays inside [0, 1], also for 0 failures.
+    """
+    if shots == 0:
+        return 0.0, 1.0
+    ler = failures / shots
+    denominator = 1 + z**2 / shots
+    center = (ler + z**2 / (2 * shots)) / denominator
+    half_width = z * np.sqrt(ler * (1 - ler) / shots + z**2 / (4 * shots**2)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+def point_key(d, num_rounds, p):
+    return f"d={d},r={num_rounds},p={p:.6g}"
+
+# Sweep keys a point's result depends on (not num_workers: the chunk seeds fix the counts for any worker count)
+POINT_SETTING_KEYS = ['seed', 'target_failures', 'min_shots', 'max_shots', 'shots_per_chunk', 'decoder_engine', 'execution_mode']
+
+def point_settings(d, num_rounds, p, sweep):
+    """
+    Full configuration of one point (stored in its record, compared on resume).
+    """
+    settings = {key: sweep[key] for key in POINT_SETTING_KEYS}
+    settings.update(d=d, rounds=num_rounds, p=p)
+    return settings
+
+def schedule_points(distances, physical_error_rates, rounds):
+    """
+    All (d, rounds, p) points, cheapest first.
+    Cost of one shot ~ circuit size (d^2 qubits x rounds); higher p needs fewer shots for the same failure count.
+
+    Args:
+        rounds (list): Rounds rules (see resolve_rounds), None -> d rounds (the usual choice for threshold plots).
+    """
+    points = set()
+    for d in distances:
+        for rounds_rule in rounds:
+            for p in physical_error_rates:
+                points.add((d, resolve_rounds(rounds_rule, d), p))
+    return sorted(points, key=lambda point: (point[0]**2 * point[1], -point[2]))
+
+def run_point(d, num_rounds, p, sweep):
+    """
+    Runs one point in batches until target_failures (or max_shots) is reached.
+    The samplers (decoder, shortest-path tables, circuit) and the process pool are built once per point
+    (ler_sampler.LERRunner) and reused by every batch.
+
+    Returns:
+        dict: Point record (also written to the output file).
+    """
+    config = make_point_config(d, num_rounds, p, sweep['decoder_engine'], sweep['execution_mode'])
+    error_report = {'NE': 0, 'CE': 0, 'UE': 0}
+    shots = 0
+    batch_idx = 0
+    start = time.perf_counter()
+
+    with ler_sampler.LERRunner(config, sweep['num_workers']) as runner:
+        while error_report['UE'] < sweep['target_failures'] and shots < sweep['max_shots']:
+            # Batch size: the first batch is min_shots, then the expected number of shots still needed
+            if shots == 0:
+                batch = sweep['min_shots']
+            else:
+                ler_estimate = max(error_report['UE'], 1) / shots
+                batch = int(1.1 * (sweep['target_failures'] - error_report['UE']) / ler_estimate)
+            batch = int(np.clip(batch, sweep['min_shots'], sweep['max_shots'] - shots))
+
+            # Reproducible stream per (sweep seed, point, batch), independent of the order the points run in
+            seed = [sweep['seed'], d, num_rounds, int(round(p * 1e9)), batch_idx]
+            report = runner.run(batch, shots_per_chunk=sweep['shots_per_chunk'], seed=seed, show_progress=False)
+            for status, count in report.items():
+                error_report[status] += count
+            shots += batch
+            batch_idx += 1
+
+    ler = error_report['UE'] / shots
+    ci_low, ci_high = wilson_interval(error_report['UE'], shots)
+    return {
+        'key': point_key(d, num_rounds, p), 'd': d, 'rounds': num_rounds, 'p': p,
+        'shots': shots, 'failures': error_report['UE'], 'ler': ler, 'ci_low': ci_low, 'ci_high': ci_high,
+        'ler_per_round': ler_sampler.logical_error_rate_per_round(ler, num_rounds),
+        'seconds': time.perf_counter() - start,
+        'decoder_engine': sweep['decoder_engine'], 'execution_mode': sweep['execution_mode'],
+        'settings': point_settings(d, num_rounds, p, sweep),
+    }
+
+def load_results(path, sweep, points):
+    """
+    Reads the finished points of a (possibly interrupted) sweep: {key: record} for the points of this grid
+    whose record has exactly this sweep's point settings (records of another seed, stopping rule, chunking,
+    engine or mode, and records without settings, are ignored and rerun).
+    """
+    expected = {point_key(*point): point_settings(*point, sweep) for point in points}
+    results = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    if record.get('key') in expected and record.get('settings') == expected[record['key']]:
+                        results[record['key']] = record
+    return results
+
+def estimate_thresholds(results, rounds_rules):
+    """
+    Crossing points of the per-round LER curves of consecutive distances (per rounds rule).
+    Between two neighbouring p values where LER(d_large) - LER(d_small) changes sign from - to +,
+    the crossing is interpolated linearly in log(p) / log(LER).
+
+    Returns:
+        tuple: (thresholds, warnings)
+            thresholds (list): (rounds_rule, d_small, d_large, p_threshold) tuples.
+            warnings (list): Why a pair of curves gives no threshold (no common p, larger d worse or better
+                at every p, or a crossing in the wrong direction).
+    """
+    curves = {}
+    for record in results.values():
+        if record['failures'] == 0:
+            continue # log(LER) undefined
+        for rounds_rule in rounds_rules:
+            if record['rounds'] == resolve_rounds(rounds_rule, record['d']):
+                curves.setdefault((rounds_rule, record['d']), {})[record['p']] = \
+                    ler_sampler.logical_error_rate_per_round(record['ler'], record['rounds'])
+
+    thresholds = []
+    warnings = []
+    for rounds_rule in rounds_rules:
+        distances = sorted(d for (rule, d) in curves if rule == rounds_rule)
+        for d_small, d_large in zip(distances[:-1], distances[1:]):
+            small, large = curves[(rounds_rule, d_small)], curves[(rounds_rule, d_large)]
+            common_p = sorted(set(small) & set(large))
+            pair = f"rounds={'d' if rounds_rule is None else rounds_rule}, d={d_small} vs d={d_large}"
+            if len(common_p) < 2:
+                warnings.append(f"{pair}: fewer than 2 common p with failures, no crossing can be found")
+                continue
+            diff = [np.log(large[p]) - np.log(small[p]) for p in common_p]
+            p_range = f"p = {common_p[0]:.4g} .. {common_p[-1]:.4g}"
+            if all(x >= 0 for x in diff):
+                warnings.append(f"{pair}: d={d_large} is worse at every p ({p_range}). Either every point is above "
+                                f"threshold, or the LER does not improve with d (decoder / noise model), so the curves "
+                                f"are not comparable")
+                continue
+            if all(x < 0 for x in diff):
+                warnings.append(f"{pair}: d={d_large} is better at every p ({p_range}), the threshold is above this range")
+                continue
+            found = False
+            for i in range(len(common_p) - 1):
+                if diff[i] < 0 <= diff[i + 1]:
+                    x0, x1 = np.log(common_p[i]), np.log(common_p[i + 1])
+                    x = x0 + (x1 - x0) * (-diff[i]) / (diff[i + 1] - diff[i])
+                    thresholds.append((rounds_rule, d_small, d_large, float(np.exp(x))))
+                    found = True
+            if not found:
+                warnings.append(f"{pair}: the curves only cross with d={d_large} better at higher p ({p_range}), "
+                                f"not a threshold")
+    return thresholds, warnings
+
+def run_sweep(sweep):
+    """
+    Runs (or resumes) a sweep. sweep: dict with the keys set in main().
+    """
+    points = schedule_points(sweep['distances'], sweep['physical_error_rates'], sweep['rounds'])
+    for d, num_rounds, p in points:
+        make_point_config(d, num_rounds, p, sweep['decoder_engine'], sweep['execution_mode']) # Validate the whole grid first
+
+    results = load_results(sweep['output_path'], sweep, points)
+    print(f"{len(points)} points, {len(results)} already in {sweep['output_path']}")
+    print(f"{'d':>3} | {'rounds':>6} | {'p':>8} | {'shots':>9} | {'UE':>6} | {'LER':>10} | {'LER/round':>10} | {'95% CI':>23} | {'time [s]':>8}")
+
+    for d, num_rounds, p in points:
+        key = point_key(d, num_rounds, p)
+        if key in results:
+            record = results[key]
+        else:
+            record = run_point(d, num_rounds, p, sweep)
+            results[key] = record
+            with open(sweep['output_path'], 'a') as f: # Incremental output (one line per finished point)
+                f.write(json.dumps(record) + "\n")
+        print(f"{d:>3} | {num_rounds:>6} | {p:>8.4g} | {record['shots']:>9} | {record['failures']:>6} | {record['ler']:>10.3e} | "
+              f"{ler_sampler.logical_error_rate_per_round(record['ler'], num_rounds):>10.3e} | "
+              f"[{record['ci_low']:.3e}, {record['ci_high']:.3e}] | {record['seconds']:>8.2f}")
+
+    thresholds, warnings = estimate_thresholds(results, sweep['rounds'])
+    for rounds_rule, d_small, d_large, p_threshold in thresholds:
+        print(f"Threshold estimate (rounds={'d' if rounds_rule is None else rounds_rule}, "
+              f"d={d_small} vs d={d_large}): p ≈ {p_threshold:.4g}")
+    for warning in warnings:
+        print(f"Warning: {warning}")
+    if not thresholds and not warnings:
+        print("Threshold estimate: needs LER curves of at least two distances")
+    return results
+
+def main():
+    sweep = {
+        'distances': [3, 5, 7],
+        'physical_error_rates': [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.07, 0.1], # d=3 vs d=5 cross near 0.05
+        'rounds': [None], # Rounds rules: None -> d rounds, '10d' -> 10*d rounds, 3 -> fixed
+        'target_failures': 200, # Stop a point after this many UE (relative error ~ 1/sqrt(200) = 7%)
+        'min_shots': 2000,
+        'max_shots': 1000000,
+        'shots_per_chunk': 20000,
+        'num_workers': 1, # Process pool per batch (None -> all cores)
+        'seed': 2024,
+        'decoder_engine': 'pymatching',
+        'execution_mode': 'pauli_frame',
+        'output_path': 'threshold_sweep.jsonl',
+    }
+    run_sweep(sweep)
+
+if __name__ == '__main__':
+    main()
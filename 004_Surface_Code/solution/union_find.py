@@ -0,0 +1,146 @@
+import numpy as np
+
+# --- Union-Find Decoder (Delfosse & Nickerson) ---
+# 1) Cluster growth: every odd cluster (odd number of defects) grows all of its boundary
+#    edges at the same speed. An edge is "fully grown" once its growth reaches its weight,
+#    and the two clusters at its ends are merged (union).
+#    Growth stops when every cluster is even. A cluster that reaches the boundary node is
+#    neutral (its extra defect can be matched to the boundary) and stops growing.
+# 2) Peeling: inside each cluster take a spanning tree of the fully grown edges and peel it
+#    (rooted at the boundary node if the cluster holds it) from the leaves: a leaf that holds
+#    a defect puts its tree edge into the correction and moves the defect to its parent.
+# The weights are the same -ln(p) weights used by MWPM, so cheap (likely) edges are grown first.
+
+class UnionFindDecoder:
+    """
+    Union-Find decoder on a weighted decoding graph (see error_correction.create_decoding_graph).
+
+    Returns corrections in the same format as the MWPM engines: a set of graph edges (u, v), u < v.
+    The boundary node (end of the 'boundary' edges) never counts as a defect, so the caller may
+    add it to the defects when the defect count is odd (same rule as the MWPM path).
+    """
+    def __init__(self, G):
+        self.num_nodes = G.number_of_nodes()
+        self.boundary_node = max((max(u, v) for u, v, data in G.edges(data=True) if data.get('type') == 'boundary'),
+                                 default=None)
+        self.edges = []
+        self.weights = []
+        self.incident = [[] for _ in range(self.num_nodes)]
+
+        for u, v, data in G.edges(data=True):
+            if not np.isfinite(data['weight']):
+                continue # Impossible fault (p = 0), never grown
+            e = len(self.edges)
+            self.edges.append((min(u, v), max(u, v)))
+            self.weights.append(float(data['weight']))
+            self.incident[u].append(e)
+            self.incident[v].append(e)
+
+    def decode(self, defect_nodes):
+        """
+        Args:
+            defect_nodes (list): Defect node indices (a node listed twice cancels out).
+
+        Returns:
+            set: Edges (u, v) with u < v of the decoding graph in the correction. An odd cluster that
+                cannot reach another defect or the boundary keeps one defect uncorrected (the caller
+                then sees a non-zero corrected syndrome).
+        """
+        defect = [0] * self.num_nodes
+        for node in defect_nodes:
+            defect[node] ^= 1
+        if self.boundary_node is not None:
+            defect[self.boundary_node] = 0
+        if not any(defect):
+            return set()
+
+        # --- 1. Cluster growth ---
+        parent = list(range(self.num_nodes))
+        members = {n: [n] for n in range(self.num_nodes) if defect[n]}
+        parity = {n: 1 for n in members}
+        growth = [0.0] * len(self.edges)
+        grown = [False] * len(self.edges)
+
+        def find(n):
+            while parent[n] != n:
+                parent[n] = parent[parent[n]]
+                n = parent[n]
+            return n
+
+        def union(a, b):
+            ra, rb = find(a), find(b)
+            if ra == rb:
+                return
+            members_a = members.get(ra, [ra])
+            members_b = members.get(rb, [rb])
+            if len(members_a) < len(members_b):
+                ra, rb, members_a, members_b = rb, ra, members_b, members_a
+            parent[rb] = ra
+            members_a.extend(members_b)
+            members[ra] = members_a
+            parity[ra] = parity.get(ra, 0) ^ parity.get(rb, 0)
+            members.pop(rb, None)
+            parity.pop(rb, None)
+
+        def touches_boundary(r):
+            return self.boundary_node is not None and find(self.boundary_node) == r
+
+        while True:
+            odd_roots = [r for r, p in parity.items() if p == 1 and not touches_boundary(r)]
+            if not odd_roots:
+                break
+
+            # Boundary edges of the odd clusters, with the number of odd sides growing them
+            # (edges of weight inf, i.e., p = 0, never grow)
+            sides = {}
+            for r in odd_roots:
+                for n in members[r]:
+                    for e in self.incident[n]:
+                        if not grown[e] and np.isfinite(self.weights[e]):
+                            sides[e] = sides.get(e, 0) + 1
+            if not sides:
+                # The odd clusters left cannot grow (isolated detector, or a component without the boundary
+                # node, e.g., a detector error model graph without p = 0 faults): one defect each stays unmatched
+                break
+
+            step = min((self.weights[e] - growth[e]) / k for e, k in sides.items())
+            newly_grown = []
+            for e, k in sides.items():
+                growth[e] += step * k
+                if growth[e] >= self.weights[e] - 1e-9:
+                    grown[e] = True
+                    newly_grown.append(e)
+            for e in newly_grown:
+                union(*self.edges[e])
+
+        # --- 2. Peeling ---
+        correction = set()
+        for r in list(members):
+            cluster = members[r]
+            if len(cluster) == 1:
+                continue
+            in_cluster = set(cluster)
+            root = self.boundary_node if touches_boundary(r) else r
+
+            # Spanning tree (BFS) of the fully grown edges inside the cluster
+            tree_parent = {root: None}
+            order = [root]
+            for n in order:
+                for e in self.incident[n]:
+                    if not grown[e]:
+                        continue
+                    u, v = self.edges[e]
+                    m = v if u == n else u
+                    if m in in_cluster and m not in tree_parent:
+                        tree_parent[m] = (n, e)
+                        order.append(m)
+
+            # Peel from the leaves towards the root
+            for n in reversed(order[1:]):
+                if defect[n]:
+                    p, e = tree_parent[n]
+                    correction ^= {self.edges[e]}
+                    defect[n] = 0
+                    defect[p] ^= 1
+
+        return correction
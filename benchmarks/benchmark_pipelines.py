@@ -0,0 +1,346 @@
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import importlib
+import importlib.metadata
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# --- Pipeline Benchmark Suite ---
+# Fixed workloads (fixed seeds) for the four pipelines:
+#   001 repetition / 002 Shor / 003 Steane : build + transpile every (error type, error case) circuit,
+#                                            1-shot runs (latency), then multi-shot runs (throughput)
+#   004 surface code (d=3)                 : LERSampler (ler_sampler.py) sampling + batch decoding (throughput),
+#                                            one shot at a time through the decoder (latency)
+# Every workload runs in a fresh 'spawn' process: the solution folders reuse module names (encoding.py,
+# error_correction.py, ...), and the peak RSS of the process is the peak of that workload alone.
+# Runs are appended to a JSON-lines history and compared with a stored baseline run.
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SMALL_CODES = {
+    # folder, error types, error cases, classical bit of the decoded q0, error_type passed to every stage
+    'repetition': {'folder': '001_Repetition_Code', 'error_types': ['X', 'Z'], 'error_cases': [None, 0, 1, 2],
+                   'result_clbit': 2, 'pass_error_type': True},
+    'shor': {'folder': '002_Shor_Code', 'error_types': ['X', 'Z', 'Y'], 'error_cases': [None] + list(range(9)),
+             'result_clbit': 8, 'pass_error_type': False},
+    'steane': {'folder': '003_Steane_Code', 'error_types': ['X', 'Z', 'Y'], 'error_cases': [None] + list(range(7)),
+               'result_clbit': 6, 'pass_error_type': False},
+}
+SMALL_CODE_MODULES = ['encoding', 'error_injection', 'error_detection', 'error_correction', 'decoding']
+
+WORKLOADS = [
+    {'name': '001_repetition', 'pipeline': 'repetition', 'shots_per_circuit': 2000, 'latency_runs_per_circuit': 10, 'seed': 1001},
+    {'name': '002_shor', 'pipeline': 'shor', 'shots_per_circuit': 50, 'latency_runs_per_circuit': 3, 'seed': 1002},
+    {'name': '003_steane', 'pipeline': 'steane', 'shots_per_circuit': 500, 'latency_runs_per_circuit': 5, 'seed': 1003},
+    {'name': '004_surface_d3', 'pipeline': 'surface', 'd': 3, 'num_rounds': 3, 'p': 0.001,
+     'decoder_engine': 'pymatching', 'execution_mode': 'multi_shot',
+     'num_shots': 20000, 'shots_per_chunk': 10000, 'latency_shots': 2000, 'seed': 1004},
+    {'name': '004_surface_d3_networkx', 'pipeline': 'surface', 'd': 3, 'num_rounds': 3, 'p': 0.001,
+     'decoder_engine': 'networkx', 'execution_mode': 'multi_shot',
+     'num_shots': 5000, 'shots_per_chunk': 5000, 'latency_shots': 1000, 'seed': 1004},
+]
+
+# Metric: 'higher' / 'lower' is better
+METRIC_DIRECTIONS = {
+    'shots_per_second': 'higher',
+    'decode_latency_p50_ms': 'lower',
+    'decode_latency_p99_ms': 'lower',
+    'setup_seconds': 'lower',
+    'peak_rss_bytes': 'lower',
+}
+PACKAGES = ['qiskit', 'qiskit-aer', 'numpy', 'networkx', 'pymatching']
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # (Linux: KiB)
+
+def latency_percentiles(latencies):
+    """
+    Per-call latencies [s] -> {'decode_latency_p50_ms', 'decode_latency_p99_ms'}
+    """
+    p50, p99 = np.percentile(np.array(latencies) * 1e3, [50, 99])
+    return {'decode_latency_p50_ms': float(p50), 'decode_latency_p99_ms': float(p99)}
+
+# --- 001 / 002 / 003 Workloads ---
+def import_small_code(folder):
+    sys.path.insert(0, os.path.join(ROOT_DIR, folder, 'solution'))
+    return {name: importlib.import_module(name) for name in SMALL_CODE_MODULES}
+
+def build_small_code_circuit(modules, code, error_type, error_index):
+    """
+    Same circuit as the solution main.py: encoding, error injection, detection, correction, decoding, q0 readout.
+    """
+    stage_kwargs = {'error_type': error_type} if code['pass_error_type'] else {}
+    if code['pass_error_type']:
+        qc = modules['encoding'].encoding_func(error_type=error_type)
+    else:
+        qc = modules['encoding'].encoding_func('1')
+    modules['error_injection'].error_injection_func(qc, error_index, error_type=error_type)
+    qc.barrier()
+    modules['error_detection'].error_detection_func(qc, **stage_kwargs)
+    qc.barrier()
+    modules['error_correction'].error_correction_func(qc, **stage_kwargs)
+    qc.barrier()
+    modules['decoding'].decoding_func(qc, **stage_kwargs)
+    qc.barrier()
+    qc.measure(0, code['result_clbit'])
+    return qc
+
+def run_small_code_workload(workload):
+    """
+    Latency: one 1-shot run (simulate + read counts) of every circuit, as in the 001 / 002 main.py loop;
+    syndrome decoding and correction happen inside the circuit (if_test), so this is the decode latency of one shot.
+    Throughput: shots_per_circuit shots of every circuit (multi-shot, as in 003 run_simulation_hybrid).
+    """
+    from qiskit import transpile
+    from qiskit_aer import AerSimulator
+
+    code = SMALL_CODES[workload['pipeline']]
+    modules = import_small_code(code['folder'])
+    simulator = AerSimulator()
+    seed = workload['seed']
+
+    # 1. Setup: build and transpile every circuit
+    start = time.perf_counter()
+    circuits = {}
+    for error_type in code['error_types']:
+        for error_index in code['error_cases']:
+            qc = build_small_code_circuit(modules, code, error_type, error_index)
+            circuits[(error_type, error_index)] = transpile(qc, simulator, seed_transpiler=seed)
+    setup_seconds = time.perf_counter() - start
+
+    # 2. Latency (1-shot runs, after one untimed warm-up run)
+    simulator.run(next(iter(circuits.values())), shots=1, seed_simulator=seed).result()
+    latencies = []
+    for run_idx in range(workload['latency_runs_per_circuit']):
+        for case_idx, trans_qc in enumerate(circuits.values()):
+            start = time.perf_counter()
+            simulator.run(trans_qc, shots=1, seed_simulator=seed + run_idx * len(circuits) + case_idx).result().get_counts()
+            latencies.append(time.perf_counter() - start)
+
+    # 3. Throughput (multi-shot runs) + error report
+    error_report = {'NE': 0, 'CE': 0, 'UE': 0}
+    num_shots = 0
+    start = time.perf_counter()
+    for case_idx, ((error_type, error_index), trans_qc) in enumerate(circuits.items()):
+        counts = simulator.run(trans_qc, shots=workload['shots_per_circuit'], seed_simulator=seed + case_idx).result().get_counts()
+        for measured_string, count in counts.items():
+            if measured_string[0] != '1': # decoded q0 (logical |1> input)
+                error_report['UE'] += count
+            elif error_index is None:
+                error_report['NE'] += count
+            else:
+                error_report['CE'] += count
+            num_shots += count
+    throughput_seconds = time.perf_counter() - start
+
+    metrics = {'shots_per_second': num_shots / throughput_seconds, 'setup_seconds': setup_seconds}
+    metrics.update(latency_percentiles(latencies))
+    return metrics, error_report
+
+# --- 004 Workload ---
+def run_surface_workload(workload):
+    """
+    Throughput: ler_sampler.run_ler (serial) on the same chunks / seeds, so the error report is reproducible.
+    Latency: decode_batch of one shot at a time, over latency_shots shots with defects (sampled with the
+    workload seed), by a fresh decoder without the LRU cache.
+    """
+    sys.path.insert(0, os.path.join(ROOT_DIR, '004_Surface_Code', 'solution'))
+    import ler_sampler
+    import threshold_sweep
+
+    config = threshold_sweep.make_point_config(workload['d'], workload['num_rounds'], workload['p'],
+                                               workload['decoder_engine'], workload['execution_mode'])
+    config['aer_threads'] = 1 # Same Aer thread count on every machine / run
+
+    # 1. Setup: circuit build + transpile + noise model + decoder
+    start = time.perf_counter()
+    sampler = ler_sampler.LERSampler(config)
+    setup_seconds = time.perf_counter() - start
+
+    # 2. Throughput (sample + decode in chunks)
+    chunks = ler_sampler.split_trials(workload['num_shots'], workload['shots_per_chunk'])
+    chunk_seeds = np.random.SeedSequence(workload['seed']).spawn(len(chunks))
+    error_report = {'NE': 0, 'CE': 0, 'UE': 0}
+    start = time.perf_counter()
+    for num_shots, chunk_seed in zip(chunks, chunk_seeds):
+        for status, count in sampler.run(num_shots, np.random.default_rng(chunk_seed)).items():
+            error_report[status] += count
+    throughput_seconds = time.perf_counter() - start
+
+    # 3. Latency (one shot per decode call)
+    # A fresh decoder without the LRU cache (the throughput phase filled the sampler's cache), and only shots
+    # with a Z-graph defect (sz or the final Z-syndrome of res): shots without one never reach the matching
+    latency_decoder = ler_sampler.build_ler_decoder(config)
+    latency_decoder.cache_size = 0
+    rng = np.random.default_rng(workload['seed'])
+    latency_shots = []
+    while len(latency_shots) < workload['latency_shots']:
+        sx, sz, res = sampler.sample(workload['latency_shots'], rng)
+        final_z_syndrome = (res.astype(np.int64) @ latency_decoder.H_Z.T) % 2
+        has_defect = sz.reshape(res.shape[0], -1).any(axis=1) | final_z_syndrome.any(axis=1)
+        latency_shots += [(sx[shot:shot + 1], sz[shot:shot + 1], res[shot:shot + 1]) for shot in np.flatnonzero(has_defect)]
+    latencies = []
+    for shot_sx, shot_sz, shot_res in latency_shots[:workload['latency_shots']]:
+        start = time.perf_counter()
+        latency_decoder.decode_batch(shot_sx, shot_sz, shot_res)
+        latencies.append(time.perf_counter() - start)
+
+    metrics = {'shots_per_second': workload['num_shots'] / throughput_seconds, 'setup_seconds': setup_seconds}
+    metrics.update(latency_percentiles(latencies))
+    return metrics, error_report
+
+def run_workload(workload):
+    """
+    Runs one workload (in a fresh worker process).
+
+    Returns:
+        dict: {'params', 'metrics', 'error_report', 'wall_seconds'}
+    """
+    start = time.perf_counter()
+    if workload['pipeline'] in SMALL_CODES:
+        metrics, error_report = run_small_code_workload(workload)
+    elif workload['pipeline'] == 'surface':
+        metrics, error_report = run_surface_workload(workload)
+    else:
+        print(f"Wrong Pipeline: {workload['pipeline']} (choose from {list(SMALL_CODES) + ['surface']})")
+        sys.exit(1)
+    metrics['peak_rss_bytes'] = peak_rss_bytes()
+    return {'params': workload, 'metrics': metrics, 'error_report': error_report,
+            'wall_seconds': time.perf_counter() - start}
+
+def run_isolated(workload):
+    # 'spawn': a fresh interpreter per workload (own sys.modules, own peak RSS, no forked Aer threads)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(run_workload, workload).result()
+
+# --- History / Baseline ---
+def environment_info():
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+        'packages': versions, 'git_commit': commit,
+    }
+
+def run_suite(workloads):
+    """
+    Returns:
+        dict: Run record ({'timestamp', 'environment', 'workloads': {name: run_workload result}}).
+    """
+    run = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment_info(), 'workloads': {}}
+    for workload in workloads:
+        print(f"Running {workload['name']} ...")
+        run['workloads'][workload['name']] = run_isolated(workload)
+    return run
+
+def append_history(run, path):
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(run, path):
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+
+def compare_with_baseline(run, baseline, tolerance=0.2, metric_tolerances=None):
+    """
+    Relative change of every metric vs. the baseline run (workloads with the same name and params only).
+
+    Args:
+        tolerance (float): Allowed relative slowdown (e.g., 0.2 -> 20% fewer shots/s or 20% more latency).
+        metric_tolerances (dict): Per-metric overrides (e.g., {'decode_latency_p99_ms': 0.5}).
+
+    Returns:
+        list: [{'workload', 'metric', 'baseline', 'current', 'change', 'regression'}], change > 0 = worse.
+    """
+    metric_tolerances = metric_tolerances or {}
+    comparisons = []
+    for name, result in run['workloads'].items():
+        reference = baseline['workloads'].get(name)
+        if reference is None or reference['params'] != result['params']:
+            continue # New or changed workload: nothing to compare with
+        for metric, direction in METRIC_DIRECTIONS.items():
+            current = result['metrics'].get(metric)
+            base = reference['metrics'].get(metric)
+            if current is None or not base:
+                continue
+            change = (base - current) / base if direction == 'higher' else (current - base) / base
+            comparisons.append({
+                'workload': name, 'metric': metric, 'baseline': base, 'current': current, 'change': change,
+                'regression': change > metric_tolerances.get(metric, tolerance),
+            })
+    return comparisons
+
+def print_run(run):
+    print(f"\n--- Benchmark Results ({run['timestamp']}, commit {(run['environment']['git_commit'] or '-')[:10]}) ---")
+    print(f"{'workload':>24} | {'shots/s':>10} | {'p50 [ms]':>9} | {'p99 [ms]':>9} | {'setup [s]':>9} | {'peak RSS [MB]':>13} | report")
+    for name, result in run['workloads'].items():
+        metrics = result['metrics']
+        rss = '-' if metrics['peak_rss_bytes'] is None else f"{metrics['peak_rss_bytes'] / 1e6:.1f}"
+        print(f"{name:>24} | {metrics['shots_per_second']:>10.0f} | {metrics['decode_latency_p50_ms']:>9.3f} | "
+              f"{metrics['decode_latency_p99_ms']:>9.3f} | {metrics['setup_seconds']:>9.2f} | {rss:>13} | {result['error_report']}")
+
+def print_comparisons(comparisons, baseline):
+    print(f"\n--- Comparison with Baseline ({baseline['timestamp']}, commit {(baseline['environment']['git_commit'] or '-')[:10]}) ---")
+    for entry in comparisons:
+        flag = 'REGRESSION' if entry['regression'] else 'ok'
+        print(f"{entry['workload']:>24} | {entry['metric']:>21} | {entry['baseline']:>12.4g} -> {entry['current']:>12.4g} | "
+              f"{-entry['change'] * 100:>+7.1f}% | {flag}")
+
+def main():
+    settings = {
+        'workloads': None, # Names from WORKLOADS (None -> all)
+        'history_path': os.path.join(BENCHMARK_DIR, 'benchmark_history.jsonl'),
+        'baseline_path': os.path.join(BENCHMARK_DIR, 'benchmark_baseline.json'),
+        'tolerance': 0.2, # Allowed relative slowdown before a metric is flagged
+        'metric_tolerances': {'decode_latency_p99_ms': 0.5}, # Tail latency is noisier
+        'update_baseline': False, # True -> this run becomes the baseline (also when there is none yet)
+        'fail_on_regression': False, # True -> exit code 1 when a metric regressed (CI)
+    }
+    workloads = [w for w in WORKLOADS if settings['workloads'] is None or w['name'] in settings['workloads']]
+    if not workloads:
+        print(f"Wrong Workloads: {settings['workloads']} (choose from {[w['name'] for w in WORKLOADS]})")
+        sys.exit(1)
+
+    run = run_suite(workloads)
+    print_run(run)
+    append_history(run, settings['history_path'])
+
+    baseline = load_baseline(settings['baseline_path'])
+    regressions = []
+    if baseline is not None:
+        comparisons = compare_with_baseline(run, baseline, settings['tolerance'], settings['metric_tolerances'])
+        print_comparisons(comparisons, baseline)
+        regressions = [entry for entry in comparisons if entry['regression']]
+        print(f"{len(regressions)} regression(s) beyond tolerance")
+    if baseline is None or settings['update_baseline']:
+        save_baseline(run, settings['baseline_path'])
+        print(f"Baseline saved: {settings['baseline_path']}")
+
+    if regressions and settings['fail_on_regression']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+import sys
+import itertools
+import numpy as np
+import pymatching
+from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from lookup_decoder import LookupTableDecoder, pack_syndromes, gf2_rank
+from pauli_frame import PauliFrameSimulator
+from fault_enumeration import enumerate_faults
+from stage_profiler import stage
+
+# --- CSS Code Framework ---
+# A CSS code is defined by its parity-check matrices and logical operators only:
+#   H_X (X-checks x data qubits), H_Z (Z-checks x data qubits), logical_x / logical_z (k x data qubits).
+# Everything else is generated from them:
+#   - memory_circuit: |0_L> (|+_L>) -> num_rounds x (noise locations, Z-check + X-check extraction with one ancilla
+#     per check) -> data readout. Registers as in 004 (qubits d / cz / cx, clbits res / sz / sx, round-major).
+#   - Fault models ('code_capacity', 'phenomenological') as PauliFrameSimulator noise (common/pauli_frame.py).
+#   - Decoders: 'lookup' (common/lookup_decoder.py, final data syndrome) and 'matching' (PyMatching on the
+#     space-time graph of H, for codes where every data qubit is in at most 2 checks of a type).
+#   - Drivers: run_memory_experiment (Monte Carlo), fault_outcomes (every Pauli fault up to a weight once)
+#     and exact_code_capacity_ler (all 2^n error patterns, small codes).
+# Z memory (|0_L>, Z readout) is decoded with H_Z / logical_z (X errors), X memory with H_X / logical_x (Z errors).
+MEMORY_BASES = ['Z', 'X']
+FAULT_MODELS = ['code_capacity', 'phenomenological'] # data X/Z errors per round (+ ancilla measurement flips)
+CSS_DECODERS = ['lookup', 'matching']
+OUTCOME_LABELS = ['NE', 'CE', 'UE']
+MAX_EXACT_QUBITS = 20 # exact_code_capacity_ler enumerates 2^n patterns
+COMBINATIONS_PER_CHUNK = 1000000
+
+def as_gf2_matrix(matrix):
+    return np.atleast_2d(np.asarray(matrix, dtype=np.uint8)) & 1
+
+def gf2_product(vectors, matrix):
+    """
+    out[s, a] = <vectors[s], matrix[a]> mod 2, (shots, n) x (rows, n) -> (shots, rows) uint8.
+    """
+    return (vectors.astype(np.int64) @ matrix.T.astype(np.int64) % 2).astype(np.uint8)
+
+def check_basis(basis):
+    if basis not in MEMORY_BASES:
+        print(f"Wrong Memory Basis: {basis} (choose from {MEMORY_BASES})")
+        sys.exit(1)
+
+class CSSCode:
+    """
+    CSS code from H_X, H_Z and the logical operators (checked on construction).
+
+    Args:
+        name (str): Name in the reports (e.g., 'Steane Code').
+        H_X (np.ndarray): (X-checks, data qubits) 0/1, row a = support of X-stabilizer a.
+        H_Z (np.ndarray): (Z-checks, data qubits) 0/1, row a = support of Z-stabilizer a.
+        logical_x (np.ndarray): (k, data qubits) or (data qubits,) supports of the logical X-operators.
+        logical_z (np.ndarray): Same for the logical Z-operators (row i anticommutes with logical_x row i only).
+    """
+    def __init__(self, name, H_X, H_Z, logical_x, logical_z):
+        self.name = name
+        self.H_X = as_gf2_matrix(H_X)
+        self.H_Z = as_gf2_matrix(H_Z)
+        self.logical_x = as_gf2_matrix(logical_x)
+        self.logical_z = as_gf2_matrix(logical_z)
+        self.num_data_qubits = self.H_Z.shape[1]
+        self.num_x_checks = self.H_X.shape[0]
+        self.num_z_checks = self.H_Z.shape[0]
+        self.num_logical_qubits = self.logical_z.shape[0]
+        self.check()
+
+    def check(self):
+        """
+        Stabilizers commute, logicals commute with the stabilizers, logical_x / logical_z pair up,
+        and there are as many logical qubits as n - rank(H_X) - rank(H_Z).
+        """
+        n = self.num_data_qubits
+        k = self.num_logical_qubits
+        problems = []
+        if any(matrix.shape[1] != n for matrix in (self.H_X, self.logical_x, self.logical_z)):
+            problems.append("every matrix needs one column per data qubit")
+        elif self.logical_x.shape[0] != k:
+            problems.append("logical_x and logical_z need the same number of rows")
+        else:
+            if gf2_product(self.H_X, self.H_Z).any():
+                problems.append("H_X H_Z^T != 0 (X- and Z-stabilizers anticommute)")
+            if gf2_product(self.logical_z, self.H_X).any() or gf2_product(self.logical_x, self.H_Z).any():
+                problems.append("a logical operator anticommutes with a stabilizer")
+            if not np.array_equal(gf2_product(self.logical_x, self.logical_z), np.eye(k, dtype=np.uint8)):
+                problems.append("logical_x / logical_z do not pair up (X_i Z_j anticommute iff i = j)")
+            if n - gf2_rank(self.H_X) - gf2_rank(self.H_Z) != k:
+                problems.append(f"n - rank(H_X) - rank(H_Z) = {n - gf2_rank(self.H_X) - gf2_rank(self.H_Z)} logical qubits, {k} given")
+        if problems:
+            print(f"Wrong CSS Code ({self.name}): " + "; ".join(problems))
+            sys.exit(1)
+
+    def check_matrix(self, basis):
+        """
+        Checks that detect the errors of a memory basis ('Z': H_Z for X errors, 'X': H_X for Z errors).
+        """
+        check_basis(basis)
+        return self.H_Z if basis == 'Z' else self.H_X
+
+    def logical_operators(self, basis):
+        check_basis(basis)
+        return self.logical_z if basis == 'Z' else self.logical_x
+
+    def distance(self, max_weight=None):
+        """
+        Minimum weight of a logical operator (X- and Z-type), by enumerating error patterns of growing weight.
+
+        Returns:
+            int: Code distance (None if it is above max_weight).
+        """
+        max_weight = self.num_data_qubits if max_weight is None else max_weight
+        distances = [minimum_logical_weight(self.check_matrix(basis), self.logical_operators(basis), max_weight)
+                     for basis in MEMORY_BASES]
+        distances = [distance for distance in distances if distance is not None]
+        return min(distances) if distances else None
+
+    def memory_circuit(self, num_rounds=1, basis='Z'):
+        """
+        Memory experiment: logical |0_L> ('Z') or |+_L> ('X'), num_rounds syndrome rounds, data readout in the basis.
+        |0...0> (|+...+>) is a Z-check (X-check) eigenstate; the first X-check (Z-check) round projects it onto the code.
+        Every round starts with an 'id' on each data qubit (noise location of the fault models).
+
+        Returns:
+            QuantumCircuit: Registers d, cz, cx / res, sz (round r -> sz[r*N_z : (r+1)*N_z]), sx (same for X-checks).
+        """
+        check_basis(basis)
+        n, num_z, num_x = self.num_data_qubits, self.num_z_checks, self.num_x_checks
+        d = QuantumRegister(n, 'd')
+        cz = QuantumRegister(num_z, 'cz')
+        cx = QuantumRegister(num_x, 'cx')
+        res = ClassicalRegister(n, 'res')
+        sz = ClassicalRegister(num_rounds * num_z, 'sz')
+        sx = ClassicalRegister(num_rounds * num_x, 'sx')
+        qc = QuantumCircuit(d, cz, cx, res, sz, sx)
+
+        qc.reset(d)
+        if basis == 'X':
+            qc.h(d)
+        qc.barrier()
+        for round_idx in range(num_rounds):
+            for q in range(n):
+                qc.id(d[q])
+            # Z-checks: parity of the data qubits onto cz[a]
+            for a, row in enumerate(self.H_Z):
+                for q in np.flatnonzero(row):
+                    qc.cx(d[int(q)], cz[a])
+            # X-checks: cx[a] in |+>, controls X on the data qubits, measured in the X basis
+            if num_x:
+                qc.h(cx)
+                for a, row in enumerate(self.H_X):
+                    for q in np.flatnonzero(row):
+                        qc.cx(cx[a], d[int(q)])
+                qc.h(cx)
+            qc.barrier()
+            if num_z:
+                qc.measure(cz, sz[round_idx * num_z:(round_idx + 1) * num_z])
+                qc.reset(cz)
+            if num_x:
+                qc.measure(cx, sx[round_idx * num_x:(round_idx + 1) * num_x])
+                qc.reset(cx)
+            qc.barrier()
+        if basis == 'X':
+            qc.h(d)
+        qc.measure(d, res)
+        return qc
+
+    def fault_model_noise(self, fault_model, p, p_meas=None):
+        """
+        Fault model in the PauliFrameSimulator format (qubit order d, cz, cx of memory_circuit).
+            'code_capacity'   : independent X and Z (Y if both) with p on every data qubit per round, perfect measurements.
+            'phenomenological': same data errors, and every ancilla measurement flips with p_meas (default p).
+
+        Returns:
+            tuple: (gate_noise, readout_noise)
+        """
+        if fault_model not in FAULT_MODELS:
+            print(f"Wrong Fault Model: {fault_model} (choose from {FAULT_MODELS})")
+            sys.exit(1)
+        gate_noise = {'id': (p * (1 - p), p * p, (1 - p) * p)}
+        readout_noise = {}
+        if fault_model == 'phenomenological':
+            p_meas = p if p_meas is None else p_meas
+            num_ancillas = self.num_z_checks + self.num_x_checks
+            readout_noise = {self.num_data_qubits + a: p_meas for a in range(num_ancillas)}
+        return gate_noise, readout_noise
+
+def minimum_logical_weight(H, logicals, max_weight):
+    """
+    Smallest number of flipped qubits with a zero syndrome of H and a flip of at least one logical (None: > max_weight).
+    """
+    column_syndromes = pack_syndromes(H.T)
+    column_logicals = pack_syndromes(logicals.T)
+    for weight in range(1, min(max_weight, H.shape[1]) + 1):
+        combinations = itertools.combinations(range(H.shape[1]), weight)
+        while True:
+            chunk = np.array(list(itertools.islice(combinations, COMBINATIONS_PER_CHUNK)), dtype=np.int64)
+            if len(chunk) == 0:
+                break
+            syndromes = np.bitwise_xor.reduce(column_syndromes[chunk], axis=1)
+            logical_flips = np.bitwise_xor.reduce(column_logicals[chunk], axis=1)
+            if np.any((syndromes == 0) & (logical_flips != 0)):
+                return weight
+    return None
+
+class CSSDecoder:
+    """
+    Decoder of a memory experiment of a CSSCode (memory_circuit registers -> NE / CE / UE per shot).
+
+    Args:
+        code (CSSCode): Code.
+        decoder (str): 'lookup' (minimum-weight table of the final data syndrome; measurement errors of the rounds
+            are not used) or 'matching' (PyMatching; with p_meas > 0 every round is a layer of the space-time graph).
+        basis (str): Memory basis ('Z': X errors, H_Z / logical_z; 'X': Z errors, H_X / logical_x).
+        num_rounds (int): Syndrome rounds of the circuit.
+        p (float), p_meas (float): Data / measurement error probabilities (matching weights log((1-p)/p)).
+        max_weight (int), cache_dir (str): Lookup table options (LookupTableDecoder).
+    """
+    def __init__(self, code, decoder='lookup', basis='Z', num_rounds=1, p=0.01, p_meas=0.0, max_weight=None, cache_dir=None):
+        if decoder not in CSS_DECODERS:
+            print(f"Wrong Decoder: {decoder} (choose from {CSS_DECODERS})")
+            sys.exit(1)
+        self.code = code
+        self.decoder = decoder
+        self.basis = basis
+        self.H = code.check_matrix(basis)
+        self.logicals = code.logical_operators(basis)
+        self.num_checks = self.H.shape[0]
+        self.num_rounds = num_rounds
+        self.syndrome_register = 'sz' if basis == 'Z' else 'sx'
+        self.uses_rounds = decoder == 'matching' and p_meas > 0
+
+        if decoder == 'lookup':
+            self.lookup = LookupTableDecoder(self.H, max_weight, cache_dir)
+        else:
+            if (self.H.sum(axis=0) > 2).any():
+                print(f"Wrong Decoder: matching needs every data qubit in at most 2 checks ({code.name}, basis {basis}); use 'lookup'")
+                sys.exit(1)
+            data_weight = np.log((1 - p) / p) if 0 < p < 0.5 else 1.0
+            if self.uses_rounds:
+                meas_weight = np.log((1 - p_meas) / p_meas) if p_meas < 0.5 else 1.0
+                check_matrix, weights, faults_matrix = self.space_time_check_matrix(num_rounds, data_weight, meas_weight)
+                self.matcher = pymatching.Matching.from_check_matrix(check_matrix, weights=weights, faults_matrix=faults_matrix)
+            else:
+                self.matcher = pymatching.Matching.from_check_matrix(self.H, weights=data_weight)
+
+    def space_time_check_matrix(self, num_rounds, data_weight, meas_weight):
+        """
+        Fault -> detection event matrix of memory_circuit, layers 0 .. num_rounds (the last one: data readout).
+        Data errors happen before every round only (layer r), so the readout layer has no data fault of its own:
+        its events come from the measurement flips of the last round (layers num_rounds-1 and num_rounds).
+
+        Returns:
+            tuple: (check matrix, weights, faults_matrix) for pymatching.Matching.from_check_matrix
+                (faults_matrix: fault -> data qubit correction).
+        """
+        num_checks, num_qubits = self.H.shape
+        data_faults = np.kron(np.eye(num_rounds + 1, num_rounds, dtype=np.uint8), self.H)
+        meas_layers = np.eye(num_rounds + 1, num_rounds, dtype=np.uint8) ^ np.eye(num_rounds + 1, num_rounds, k=-1, dtype=np.uint8)
+        meas_faults = np.kron(meas_layers, np.eye(num_checks, dtype=np.uint8))
+        check_matrix = np.hstack([data_faults, meas_faults])
+        weights = np.concatenate([np.full(num_rounds * num_qubits, data_weight), np.full(num_rounds * num_checks, meas_weight)])
+        faults_matrix = np.hstack([np.tile(np.eye(num_qubits, dtype=np.uint8), num_rounds),
+                                   np.zeros((num_qubits, num_rounds * num_checks), dtype=np.uint8)])
+        return check_matrix, weights, faults_matrix
+
+    def corrections(self, final_syndromes, round_syndromes=None):
+        """
+        Args:
+            final_syndromes (np.ndarray): (shots, checks) syndrome of the data readout.
+            round_syndromes (np.ndarray): (shots, rounds, checks) measured syndromes (used if self.uses_rounds).
+
+        Returns:
+            tuple: ((shots, data qubits) corrections, (shots,) bool any detection event)
+        """
+        if self.uses_rounds:
+            layers = np.concatenate([round_syndromes, final_syndromes[:, None, :]], axis=1)
+            events = layers.copy()
+            events[:, 1:] ^= layers[:, :-1] # detection events: changes between rounds
+            events = events.reshape(len(events), -1)
+            return self.matcher.decode_batch(events).astype(np.uint8), events.any(axis=1)
+        if self.decoder == 'lookup':
+            corrections = self.lookup.decode(final_syndromes)
+        else:
+            corrections = self.matcher.decode_batch(final_syndromes).astype(np.uint8)
+        return corrections, final_syndromes.any(axis=1)
+
+    def outcomes(self, data_bits, corrections, detected):
+        logical_errors = gf2_product(data_bits ^ corrections, self.logicals).any(axis=1)
+        outcomes = np.where(detected, OUTCOME_LABELS.index('CE'), OUTCOME_LABELS.index('NE')).astype(np.uint8)
+        outcomes[logical_errors] = OUTCOME_LABELS.index('UE')
+        return outcomes
+
+    def decode_batch(self, registers):
+        """
+        Args:
+            registers (dict): {'res': (shots, n), 'sz' / 'sx': (shots, rounds * checks)} (PauliFrameSimulator.sample_registers).
+
+        Returns:
+            np.ndarray: (shots,) outcome codes, index into OUTCOME_LABELS (UE: a logical readout is flipped after correction).
+        """
+        res = registers['res']
+        round_syndromes = registers[self.syndrome_register].reshape(len(res), self.num_rounds, self.num_checks)
+        final_syndromes = gf2_product(res, self.H)
+        corrections, detected = self.corrections(final_syndromes, round_syndromes)
+        return self.outcomes(res, corrections, detected)
+
+    def decode_errors(self, errors):
+        """
+        Code capacity: (shots, n) data errors of the decoded type (X for 'Z', Z for 'X'), perfect measurements.
+        The error is present from the first round on, so only the first layer has detection events.
+
+        Returns:
+            np.ndarray: (shots,) outcome codes (relative to the error-free readout).
+        """
+        errors = np.asarray(errors, dtype=np.uint8)
+        syndromes = gf2_product(errors, self.H)
+        round_syndromes = np.repeat(syndromes[:, None, :], self.num_rounds, axis=1)
+        corrections, detected = self.corrections(syndromes, round_syndromes)
+        return self.outcomes(errors, corrections, detected)
+
+def fault_outcomes(decoder, max_weight=1):
+    """
+    Every Pauli fault on the data qubits up to max_weight once (fault_enumeration.enumerate_faults order),
+    classified like fault_enumeration.FaultEnumerator ('UE' / 'CE' / 'NE' for the fault-free case).
+
+    Returns:
+        dict: Report ({'faults': [{'fault', 'weight', 'outcome'}], 'summary': {weight: outcome counts}}).
+    """
+    code = decoder.code
+    decoded_paulis = ('X', 'Y') if decoder.basis == 'Z' else ('Z', 'Y')
+    faults = list(enumerate_faults(code.num_data_qubits, max_weight))
+    errors = np.zeros((len(faults), code.num_data_qubits), dtype=np.uint8)
+    for idx, fault in enumerate(faults):
+        for qubit, pauli in fault:
+            errors[idx, qubit] = pauli in decoded_paulis
+    logical_errors = decoder.decode_errors(errors) == OUTCOME_LABELS.index('UE')
+
+    records = []
+    summary = {}
+    for fault, logical_error in zip(faults, logical_errors):
+        outcome = 'UE' if logical_error else ('CE' if fault else 'NE')
+        records.append({'fault': [[qubit, pauli] for qubit, pauli in fault], 'weight': len(fault), 'outcome': outcome})
+        weight_summary = summary.setdefault(len(fault), {label: 0 for label in OUTCOME_LABELS})
+        weight_summary[outcome] += 1
+    return {'code': code.name, 'basis': decoder.basis, 'max_weight': max_weight, 'summary': summary, 'faults': records}
+
+def exact_code_capacity_ler(decoder, p):
+    """
+    Exact logical error rate for one round of independent flips with p (decoded type only), from all 2^n patterns.
+    """
+    n = decoder.code.num_data_qubits
+    if n > MAX_EXACT_QUBITS:
+        print(f"Wrong Code Size: {n} data qubits (exact LER up to {MAX_EXACT_QUBITS}, use run_memory_experiment)")
+        sys.exit(1)
+    patterns = ((np.arange(2 ** n)[:, None] >> np.arange(n)) & 1).astype(np.uint8)
+    weights = patterns.sum(axis=1)
+    logical_errors = decoder.decode_errors(patterns) == OUTCOME_LABELS.index('UE')
+    return float(np.sum(p ** weights[logical_errors] * (1 - p) ** (n - weights[logical_errors])))
+
+def run_memory_experiment(code, num_shots, p, fault_model='code_capacity', decoder='lookup', basis='Z',
+                          num_rounds=1, p_meas=None, seed=None, shots_per_chunk=100000, cache_dir=None):
+    """
+    Monte Carlo memory experiment: memory_circuit sampled with the Pauli-frame simulator under the fault model,
+    decoded in chunks of shots_per_chunk shots.
+
+    Returns:
+        dict: Error report ({'NE': n, 'CE': n, 'UE': n}).
+    """
+    with stage('circuit build'):
+        qc = code.memory_circuit(num_rounds, basis)
+        gate_noise, readout_noise = code.fault_model_noise(fault_model, p, p_meas)
+        simulator = PauliFrameSimulator(qc, gate_noise=gate_noise, readout_noise=readout_noise)
+    with stage('decoder build'):
+        decoder_p_meas = (p if p_meas is None else p_meas) if fault_model == 'phenomenological' else 0.0
+        css_decoder = CSSDecoder(code, decoder, basis, num_rounds, p, decoder_p_meas, cache_dir=cache_dir)
+
+    rng = np.random.default_rng(seed)
+    error_report = {label: 0 for label in OUTCOME_LABELS}
+    for start in range(0, num_shots, shots_per_chunk):
+        with stage('simulate'):
+            registers = simulator.sample_registers(min(shots_per_chunk, num_shots - start), rng)
+        with stage('decode'):
+            outcomes = css_decoder.decode_batch(registers)
+        with stage('report'):
+            for code_idx, count in enumerate(np.bincount(outcomes, minlength=len(OUTCOME_LABELS))):
+                error_report[OUTCOME_LABELS[code_idx]] += int(count)
+    return error_report
@@ -0,0 +1,56 @@
+import numpy as np
+from qiskit.quantum_info import Pauli
+
+# --- Deferred (Pauli Frame) Correction ---
+# Instead of if_test blocks, the circuit only measures the syndromes; the correction is looked up after
+# the simulation and applied to the recorded readout:
+#   the correction C is a Pauli applied before the (Clifford) decoding circuit U, and U C = (U C U^dagger) U,
+#   so it flips the Z-basis readout of the decoded qubit iff U C U^dagger has an X (or Y) on that qubit.
+# The flip of every syndrome value is precomputed once (dense table indexed by the syndrome register value),
+# so the circuits are static (no classical control) and every shot is corrected by one table lookup.
+
+def correction_pauli(correction, num_qubits):
+    """
+    [(qubit, 'X' | 'Y' | 'Z'), ...] -> Pauli on num_qubits qubits (corrections on the same qubit multiply).
+    """
+    x = np.zeros(num_qubits, dtype=bool)
+    z = np.zeros(num_qubits, dtype=bool)
+    for qubit, pauli in correction:
+        x[qubit] ^= pauli in ('X', 'Y')
+        z[qubit] ^= pauli in ('Z', 'Y')
+    return Pauli((z, x))
+
+def logical_flip_table(correction_table, decoding_circuit, readout_qubit=0):
+    """
+    Args:
+        correction_table (list): Correction of every syndrome value ([(qubit, Pauli), ...]).
+        decoding_circuit (QuantumCircuit): Clifford decoding applied after the correction.
+        readout_qubit (int): Qubit measured in the Z basis after decoding.
+
+    Returns:
+        np.ndarray: (num syndrome values,) uint8, 1 where the correction flips the readout.
+    """
+    flip_table = np.zeros(len(correction_table), dtype=np.uint8)
+    for syndrome, correction in enumerate(correction_table):
+        evolved = correction_pauli(correction, decoding_circuit.num_qubits).evolve(decoding_circuit, frame='s')
+        flip_table[syndrome] = evolved.x[readout_qubit]
+    return flip_table
+
+def apply_deferred_correction(counts, flip_table, num_syndrome_bits, readout_position=0):
+    """
+    Applies the looked-up corrections to the counts of a static circuit.
+
+    Args:
+        counts (dict): Qiskit counts (bitstring c_(n-1) ... c0, syndrome register value in the last num_syndrome_bits bits).
+        readout_position (int): Position of the readout bit in the bitstring (0 = highest classical bit).
+
+    Returns:
+        dict: Counts with the readout bit flipped where the correction flips it.
+    """
+    corrected = {}
+    for measured_string, count in counts.items():
+        if flip_table[int(measured_string[-num_syndrome_bits:], 2)]:
+            flipped = '1' if measured_string[readout_position] == '0' else '0'
+            measured_string = measured_string[:readout_position] + flipped + measured_string[readout_position + 1:]
+        corrected[measured_string] = corrected.get(measured_string, 0) + count
+    return corrected
@@ -0,0 +1,157 @@
+import sys
+import json
+import itertools
+from qiskit import transpile
+from stage_profiler import stage
+
+# --- Deterministic Fault Enumeration ---
+# Visits every Pauli fault of weight 1 (and optionally 2) on the data qubits exactly once,
+# instead of drawing single errors at random (Shor: 9 x 3 = 27 faults, Steane: 7 x 3 = 21 faults).
+# Every fault circuit is encoding -> fault -> (detection, correction, decoding, readout).
+# The two fault-free segments are transpiled once; fault variants are composed from the transpiled
+# segments (the barrier after the fault keeps the transpiler from optimizing across it anyway),
+# cached per fault, and simulated as a few batched jobs.
+# A Pauli fault on a stabilizer state gives deterministic syndromes and readout, so 1 shot per fault is enough
+# (shots_per_fault > 1 double-checks this: a fault with both outcomes is reported as 'mixed').
+PAULIS = ['X', 'Y', 'Z']
+OUTCOMES = ['NE', 'CE', 'UE', 'mixed']
+
+def enumerate_faults(num_data_qubits, max_weight):
+    """
+    Yields faults as tuples of (qubit, Pauli), weight 0 (no fault) to max_weight, on distinct qubits.
+    """
+    for weight in range(max_weight + 1):
+        for qubits in itertools.combinations(range(num_data_qubits), weight):
+            for paulis in itertools.product(PAULIS, repeat=weight):
+                yield tuple(zip(qubits, paulis))
+
+class FaultEnumerator:
+    """
+    Runs every fault circuit of a code (circuits built by the solution functions of the code's folder).
+
+    Args:
+        code_name (str): Name in the report (e.g., 'Shor Code').
+        num_data_qubits (int): Data qubits that get faults.
+        encode (callable): () -> QuantumCircuit with the encoded logical state.
+        inject (callable): (qc, qubit, pauli) -> appends the Pauli fault.
+        finish (callable): (qc) -> appends detection, correction, decoding and the readout of the decoded qubit.
+        simulator (AerSimulator): Simulator (transpile target).
+        expected_value (str): Decoded value without a logical error ('1' for logical |1> input).
+        postprocess_counts (callable): (counts) -> counts, applied before the classification
+            (e.g., deferred correction, common/deferred_correction.py). None: counts as measured.
+    """
+    def __init__(self, code_name, num_data_qubits, encode, inject, finish, simulator, expected_value='1',
+                 postprocess_counts=None):
+        self.code_name = code_name
+        self.num_data_qubits = num_data_qubits
+        self.inject = inject
+        self.simulator = simulator
+        self.expected_value = expected_value
+        self.postprocess_counts = postprocess_counts
+
+        # Fault-free segments, transpiled once
+        with stage('circuit build'):
+            qc_encode = encode()
+            qc_finish = qc_encode.copy_empty_like()
+            finish(qc_finish)
+        with stage('transpile'):
+            self.prefix = transpile(qc_encode, simulator)
+            self.suffix = transpile(qc_finish, simulator)
+        self.num_transpiles = 2
+        self.transpiled_variants = {} # fault: transpiled circuit
+
+    def variant(self, fault):
+        """
+        Transpiled circuit of one fault (cached).
+        """
+        if fault not in self.transpiled_variants:
+            qc = self.prefix.copy()
+            with stage('error injection'):
+                for qubit, pauli in fault:
+                    self.inject(qc, qubit, pauli)
+                qc.barrier()
+            with stage('circuit build'):
+                self.transpiled_variants[fault] = qc.compose(self.suffix)
+        return self.transpiled_variants[fault]
+
+    def classify(self, fault, counts):
+        """
+        Counts of one fault circuit -> 'NE' / 'CE' / 'UE' / 'mixed'.
+        """
+        correct = sum(count for measured_string, count in counts.items() if measured_string[0] == self.expected_value)
+        wrong = sum(counts.values()) - correct
+        if correct and wrong:
+            return 'mixed'
+        elif wrong:
+            return 'UE'
+        return 'CE' if fault else 'NE'
+
+    def run(self, max_weight=1, shots_per_fault=1, circuits_per_job=64, seed=None, show_progress=True):
+        """
+        Returns:
+            dict: Report ({'faults': [{'fault', 'weight', 'outcome', 'counts'}], 'summary': {weight: outcome counts}, ...}).
+        """
+        if max_weight not in [1, 2]:
+            print(f"Wrong Max Fault Weight: {max_weight} (1 or 2)")
+            sys.exit(1)
+        faults = list(enumerate_faults(self.num_data_qubits, max_weight))
+        records = []
+        for start in range(0, len(faults), circuits_per_job):
+            batch = faults[start:start + circuits_per_job]
+            run_seed = None if seed is None else seed + start
+            circuits = [self.variant(fault) for fault in batch]
+            with stage('simulate'):
+                result = self.simulator.run(circuits, shots=shots_per_fault, seed_simulator=run_seed).result()
+            for idx, fault in enumerate(batch):
+                with stage('parse'):
+                    counts = result.get_counts(idx)
+                    if self.postprocess_counts is not None:
+                        counts = self.postprocess_counts(counts)
+                records.append({
+                    'fault': [[qubit, pauli] for qubit, pauli in fault], 'weight': len(fault),
+                    'outcome': self.classify(fault, counts), 'counts': counts,
+                })
+            if show_progress:
+                print(f"  simulated {start + len(batch)}/{len(faults)} fault circuits")
+
+        summary = {}
+        for record in records:
+            weight_summary = summary.setdefault(record['weight'], {outcome: 0 for outcome in OUTCOMES})
+            weight_summary[record['outcome']] += 1
+        return {
+            'code': self.code_name, 'num_data_qubits': self.num_data_qubits, 'max_weight': max_weight,
+            'shots_per_fault': shots_per_fault, 'num_fault_circuits': len(faults),
+            'num_transpiles': self.num_transpiles, 'summary': summary, 'faults': records,
+        }
+
+def print_fault_report(report):
+    n = report['num_data_qubits']
+    print(f"Fault circuits: {report['num_fault_circuits']} (transpiles: {report['num_transpiles']}, "
+          f"shots per fault: {report['shots_per_fault']})")
+    for weight, weight_summary in report['summary'].items():
+        print(f"Weight {weight}: {weight_summary}")
+
+    # Weight 1: outcome per location (qubit x Pauli)
+    single = {(record['fault'][0][0], record['fault'][0][1]): record['outcome']
+              for record in report['faults'] if record['weight'] == 1}
+    print("\n--- Single Faults (outcome per location) ---")
+    print(f"{'qubit':>5} | " + " | ".join(f"{pauli:>5}" for pauli in PAULIS))
+    for qubit in range(n):
+        print(f"{'q' + str(qubit):>5} | " + " | ".join(f"{single[(qubit, pauli)]:>5}" for pauli in PAULIS))
+
+    # Weight 2: uncorrectable Pauli pairs (of 9) per qubit pair
+    pairs = [record for record in report['faults'] if record['weight'] == 2]
+    if pairs:
+        ue_per_pair = {}
+        for record in pairs:
+            (qubit_a, _), (qubit_b, _) = record['fault']
+            ue_per_pair[(qubit_a, qubit_b)] = ue_per_pair.get((qubit_a, qubit_b), 0) + (record['outcome'] != 'CE')
+        print(f"\n--- Weight-2 Faults (uncorrectable of {len(PAULIS) ** 2} Pauli pairs per qubit pair) ---")
+        print("     " + "".join(f"{'q' + str(qubit):>4}" for qubit in range(n)))
+        for qubit_a in range(n):
+            row = "".join(f"{ue_per_pair[(qubit_a, qubit_b)]:>4}" if qubit_b > qubit_a else f"{'.':>4}" for qubit_b in range(n))
+            print(f"{'q' + str(qubit_a):>4} {row}")
+
+def export_fault_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,176 @@
+import os
+import sys
+import hashlib
+import numpy as np
+
+# --- Lookup-Table (LUT) Syndrome Decoder ---
+# Generated from a parity-check matrix H (checks x qubits) instead of hand-written syndrome tables.
+# Syndromes are packed into integers (check i = bit i, i.e., c0 is the lowest bit as in the drivers' registers).
+# The minimum-weight correction of every syndrome is found by a breadth-first search over syndromes:
+#   weight 0 reaches syndrome 0; the syndromes first reached at weight w are (weight w-1 syndromes) XOR
+#   (the syndrome of one more flipped qubit), so each syndrome is expanded once (2^checks x qubits work in total,
+#   instead of enumerating every error pattern). Ties go to the first candidate (earliest parent, then lowest qubit).
+# The table is a dense (2^checks, qubits) array, so decoding a batch of shots is one fancy-index.
+# The search stops once every reachable syndrome (2^rank(H)) has a correction, or at max_weight.
+# Tables can be persisted (.npz keyed by a hash of H), so bigger codes pay the enumeration cost only once.
+#
+# CSS codes: H_Z (Z-checks) detects X errors, H_X (X-checks) detects Z errors, decoded independently.
+MAX_SYNDROME_BITS = 20 # Table size 2^checks x qubits
+
+def pack_syndromes(syndromes):
+    """
+    (shots, checks) 0/1 syndromes -> (shots,) int64 (check i = bit i).
+    """
+    syndromes = np.asarray(syndromes, dtype=np.int64)
+    return syndromes @ (1 << np.arange(syndromes.shape[-1], dtype=np.int64))
+
+def gf2_rank(H):
+    rows = [int(''.join(map(str, row[::-1])), 2) for row in np.asarray(H, dtype=np.uint8)]
+    rank = 0
+    while rows:
+        pivot = max(rows)
+        rows.remove(pivot)
+        if pivot == 0:
+            break
+        rank += 1
+        top_bit = pivot.bit_length() - 1
+        rows = [row ^ pivot if (row >> top_bit) & 1 else row for row in rows]
+    return rank
+
+def build_lookup_table(H, max_weight=None):
+    """
+    Minimum-weight correction of every syndrome of H.
+
+    Args:
+        H (np.ndarray): (checks, qubits) 0/1 parity-check matrix.
+        max_weight (int): Largest error weight to enumerate (None -> until every reachable syndrome is found).
+
+    Returns:
+        tuple: (corrections, weights)
+            corrections (np.ndarray): (2^checks, qubits) uint8, indexed by the packed syndrome.
+            weights (np.ndarray): (2^checks,) int16 weight of the correction (-1: syndrome not reached).
+    """
+    H = np.asarray(H, dtype=np.uint8)
+    num_checks, num_qubits = H.shape
+    if num_checks > MAX_SYNDROME_BITS:
+        print(f"Wrong Parity-Check Matrix: {num_checks} checks (lookup table up to {MAX_SYNDROME_BITS} checks)")
+        sys.exit(1)
+    max_weight = num_qubits if max_weight is None else min(max_weight, num_qubits)
+    column_syndromes = pack_syndromes(H.T) # syndrome of a single flip on each qubit
+    num_reachable = 2 ** gf2_rank(H)
+
+    corrections = np.zeros((2 ** num_checks, num_qubits), dtype=np.uint8)
+    weights = np.full(2 ** num_checks, -1, dtype=np.int16)
+    weights[0] = 0
+    frontier = np.zeros(1, dtype=np.int64) # syndromes first reached at the previous weight
+    num_found = 1
+    for weight in range(1, max_weight + 1):
+        if num_found == num_reachable:
+            break
+        # (frontier, qubit) candidates, frontier-major -> np.unique keeps the first one per syndrome
+        candidates = (frontier[:, None] ^ column_syndromes[None, :]).ravel()
+        syndromes, first = np.unique(candidates, return_index=True)
+        new = weights[syndromes] < 0
+        syndromes, first = syndromes[new], first[new]
+        parents = frontier[first // num_qubits]
+        flipped_qubits = first % num_qubits
+        weights[syndromes] = weight
+        corrections[syndromes] = corrections[parents]
+        corrections[syndromes, flipped_qubits] ^= 1
+        frontier = syndromes
+        num_found += len(syndromes)
+    return corrections, weights
+
+def lookup_table_path(cache_dir, H, max_weight=None):
+    H = np.asarray(H, dtype=np.uint8)
+    digest = hashlib.sha1(np.ascontiguousarray(H).tobytes() + str(H.shape).encode()).hexdigest()[:16]
+    weight_tag = 'all' if max_weight is None else f"w{max_weight}"
+    return os.path.join(cache_dir, f"lut_{H.shape[0]}x{H.shape[1]}_{digest}_{weight_tag}.npz")
+
+class LookupTableDecoder:
+    """
+    Dense syndrome -> minimum-weight correction table of one parity-check matrix.
+
+    Args:
+        H (np.ndarray): (checks, qubits) 0/1 parity-check matrix.
+        max_weight (int): Largest error weight to enumerate (None -> every reachable syndrome).
+        cache_dir (str): Folder of persisted tables (None -> always enumerate). A table is loaded if one
+            with the same H and max_weight exists there, otherwise it is built and saved.
+    """
+    def __init__(self, H, max_weight=None, cache_dir=None):
+        self.H = np.asarray(H, dtype=np.uint8)
+        self.max_weight = max_weight
+        self.num_checks, self.num_qubits = self.H.shape
+        self.loaded_from_cache = False
+        path = lookup_table_path(cache_dir, self.H, max_weight) if cache_dir else None
+        if path and os.path.exists(path):
+            self.load(path)
+        else:
+            self.corrections, self.weights = build_lookup_table(self.H, max_weight)
+            if path:
+                os.makedirs(cache_dir, exist_ok=True)
+                self.save(path)
+
+    def save(self, path):
+        np.savez_compressed(path, H=self.H, corrections=self.corrections, weights=self.weights)
+
+    def load(self, path):
+        with np.load(path) as data:
+            if not np.array_equal(data['H'], self.H):
+                print(f"Wrong Lookup Table: {path} (built for another parity-check matrix)")
+                sys.exit(1)
+            self.corrections = data['corrections']
+            self.weights = data['weights']
+        self.loaded_from_cache = True
+
+    def decode(self, syndromes):
+        """
+        Args:
+            syndromes (np.ndarray): (shots, checks) 0/1 syndromes, or (shots,) packed syndromes.
+
+        Returns:
+            np.ndarray: (shots, qubits) uint8 corrections (all zero for syndromes not reached within max_weight).
+        """
+        syndromes = np.asarray(syndromes)
+        if syndromes.ndim == 2:
+            syndromes = pack_syndromes(syndromes)
+        return self.corrections[syndromes]
+
+    def correction_qubits(self, syndrome):
+        """
+        Packed syndrome -> list of qubits to flip.
+        """
+        return np.flatnonzero(self.corrections[syndrome]).tolist()
+
+class CSSLookupDecoder:
+    """
+    Lookup-table decoder of a CSS code: X errors from the Z-check syndromes (H_Z), Z errors from the
+    X-check syndromes (H_X). Tables are shared between codes with the same matrices through cache_dir.
+    """
+    def __init__(self, H_X, H_Z, max_weight=None, cache_dir=None):
+        self.x_decoder = LookupTableDecoder(H_Z, max_weight, cache_dir) # corrects X errors
+        self.z_decoder = LookupTableDecoder(H_X, max_weight, cache_dir) # corrects Z errors
+
+    def decode_batch(self, z_check_syndromes, x_check_syndromes):
+        """
+        Returns:
+            tuple: (X corrections, Z corrections), (shots, qubits) uint8 each.
+        """
+        return self.x_decoder.decode(z_check_syndromes), self.z_decoder.decode(x_check_syndromes)
+
+    def correction_table(self):
+        """
+        Correction of every value of a syndrome register with the Z-check bits first (lowest) and
+        the X-check bits after them (c0 ... c5 = Z-checks, X-checks for the Steane code).
+
+        Returns:
+            list: [(qubit, 'X' | 'Z'), ...] per register value (common/deferred_correction.py format).
+        """
+        num_z_checks = self.x_decoder.num_checks
+        table = []
+        for syndrome in range(2 ** (num_z_checks + self.z_decoder.num_checks)):
+            z_check_syndrome = syndrome & ((1 << num_z_checks) - 1)
+            x_check_syndrome = syndrome >> num_z_checks
+            table.append([(qubit, 'X') for qubit in self.x_decoder.correction_qubits(z_check_syndrome)]
+                         + [(qubit, 'Z') for qubit in self.z_decoder.correction_qubits(x_check_syndrome)])
+        return table
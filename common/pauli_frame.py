@@ -0,0 +1,431 @@
+import sys
+import numpy as np
+from qiskit import QuantumCircuit, ClassicalRegister
+from qiskit_aer import AerSimulator
+
+# --- Bit-packed Pauli-Frame Simulator ---
+# Every circuit in 001 - 004 is Clifford (+ Pauli errors), so a noisy shot differs from a noiseless
+# "reference" shot only by a Pauli frame (which qubits currently carry an extra X and/or Z).
+# Instead of a statevector we propagate these frames through the gates:
+#   H: X <-> Z          S: Z ^= X          CX(c, t): X_t ^= X_c, Z_c ^= Z_t
+#   measure(q): the recorded bit is flipped if the frame has X on q
+# Frames are stored bit-packed: frame_x[q] / frame_z[q] are uint64 arrays, 64 shots per word,
+# so one NumPy operation updates thousands of shots at once.
+# Random measurement outcomes are reproduced by randomizing the Z part of the frame after every
+# reset/measurement (a Z on a Z-eigenstate does not change the state, it only decorrelates the
+# outcome of a later X-type measurement from the reference).
+
+SUPPORTED_GATES = {
+    # name: frame update (None -> the gate does not change the frame, e.g., Paulis)
+    'id': None, 'x': None, 'y': None, 'z': None,
+    'h': 'h', 's': 's', 'sdg': 's', 'sx': 'sx', 'sxdg': 'sx',
+    'cx': 'cx', 'cz': 'cz', 'swap': 'swap',
+}
+IGNORED_INSTRUCTIONS = ['barrier', 'delay']
+CONDITIONAL_PAULIS = {'id': (0, 0), 'x': (1, 0), 'y': (1, 1), 'z': (0, 1)} # name: (X part, Z part)
+
+def to_reference_circuit(qc, num_events):
+    """
+    Returns a copy of qc for the noiseless reference sample:
+    - 'initialize' to |0...0> is replaced by 'reset', so it can run on the stabilizer method.
+    - Every measurement is repeated into its own bit of an extra 'ref' register (measurement event),
+      so classical bits that are read before (or overwritten after) a measurement keep their reference value.
+    """
+    ref = ClassicalRegister(num_events, 'ref')
+    new_qc = QuantumCircuit(*qc.qregs, *qc.cregs, ref)
+    event = 0
+    for instruction in qc.data:
+        if instruction.operation.name == 'initialize':
+            check_zero_initialize(instruction.operation)
+            new_qc.reset(instruction.qubits)
+        else:
+            new_qc.append(instruction)
+        if instruction.operation.name == 'measure':
+            for q in instruction.qubits:
+                new_qc.measure(q, ref[event]) # Repeated Z measurement: same outcome
+                event += 1
+    return new_qc
+
+def check_zero_initialize(operation):
+    params = operation.params
+    if len(params) == 1 and not isinstance(params[0], str) and params[0] == 0:
+        return # initialize(0, qubits): integer form of |0...0>
+    if all(isinstance(p, str) for p in params) and set("".join(params)) <= {'0'}:
+        return # initialize('000', qubits)
+    if len(params) > 1 and np.isclose(abs(params[0]), 1) and np.allclose(params[1:], 0):
+        return # statevector form of |0...0>
+    print(f"Pauli-frame simulation only supports initialize to |0...0> (got {params})")
+    sys.exit(1)
+
+def pack_bits(bits):
+    """
+    Packs a (..., shots) 0/1 array into (..., words) uint64 (64 shots per word, little-endian).
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    num_shots = bits.shape[-1]
+    num_words = -(-num_shots // 64)
+    padded = np.zeros(bits.shape[:-1] + (num_words * 64,), dtype=np.uint8)
+    padded[..., :num_shots] = bits
+    return np.packbits(padded, axis=-1, bitorder='little').view('<u8')
+
+def unpack_bits(words, num_shots):
+    """
+    Inverse of pack_bits: (..., words) uint64 -> (..., shots) uint8.
+    """
+    words = np.ascontiguousarray(words, dtype='<u8')
+    return np.unpackbits(words.view(np.uint8), axis=-1, bitorder='little')[..., :num_shots]
+
+def random_words(num_words, rng):
+    """
+    Uniformly random bits (probability 1/2), packed.
+    """
+    return rng.integers(0, np.iinfo(np.uint64).max, size=num_words, dtype=np.uint64, endpoint=True)
+
+def bernoulli_words(p, num_shots, rng):
+    """
+    Packed bits that are 1 with probability p (independently for every shot).
+    Small p: only the positions of the 1s are sampled (binomial count + positions).
+    """
+    num_words = -(-num_shots // 64)
+    if p <= 0:
+        return np.zeros(num_words, dtype=np.uint64)
+    if p >= 0.1:
+        return pack_bits(rng.random(num_shots) < p)
+    words = np.zeros(num_words, dtype=np.uint64)
+    positions = rng.choice(num_shots, size=rng.binomial(num_shots, p), replace=False)
+    np.bitwise_or.at(words, positions >> 6, np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64)))
+    return words
+
+def pauli_channel_words(px, py, pz, num_shots, rng):
+    """
+    Samples a single-qubit Pauli channel (X: px, Y: py, Z: pz) for every shot.
+
+    Returns:
+        tuple: (x_words, z_words) packed X / Z parts of the sampled errors.
+    """
+    num_words = -(-num_shots // 64)
+    x_words = np.zeros(num_words, dtype=np.uint64)
+    z_words = np.zeros(num_words, dtype=np.uint64)
+    p_total = px + py + pz
+    if p_total <= 0:
+        return x_words, z_words
+
+    error_words = bernoulli_words(p_total, num_shots, rng)
+    positions = np.flatnonzero(unpack_bits(error_words, num_shots))
+    kinds = rng.choice(3, size=len(positions), p=[px / p_total, py / p_total, pz / p_total]) # 0: X, 1: Y, 2: Z
+    bit = np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64))
+    np.bitwise_or.at(x_words, positions[kinds <= 1] >> 6, bit[kinds <= 1])
+    np.bitwise_or.at(z_words, positions[kinds >= 1] >> 6, bit[kinds >= 1])
+    return x_words, z_words
+
+class PauliFrameSimulator:
+    """
+    Samples noisy shots of a Clifford QuantumCircuit with bit-packed Pauli frames.
+
+    Args:
+        qc (QuantumCircuit): Circuit from one of the builders (h, s, sx, cx, cz, swap, Paulis,
+            measure, reset, initialize to |0...0>, barrier, and if_test blocks containing Paulis).
+        gate_noise (dict): {gate name: (px, py, pz)} Pauli channel applied to every qubit of that gate,
+            right after it (e.g., {'id': (p, 0, p)} for the 'id' noise locations of the LER test).
+        readout_noise (dict): {qubit index: p} classical flip probability of measurements of that qubit.
+    """
+    def __init__(self, qc, gate_noise=None, readout_noise=None):
+        self.qc = qc
+        self.num_qubits = qc.num_qubits
+        self.num_clbits = qc.num_clbits
+        self.gate_noise = gate_noise or {}
+        self.readout_noise = readout_noise or {}
+        self.num_events = 0
+        self.last_event = {} # clbit index: last measurement event written to it
+        self.program = self.compile(qc.data)
+        self.reference = None
+
+    def compile(self, data):
+        """
+        Converts circuit instructions into a flat list of (kind, qubits, clbits, extra) steps.
+        """
+        program = []
+        for instruction in data:
+            operation = instruction.operation
+            name = operation.name
+            qubits = [self.qc.find_bit(q).index for q in instruction.qubits]
+            clbits = [self.qc.find_bit(c).index for c in instruction.clbits]
+
+            if name in IGNORED_INSTRUCTIONS:
+                continue
+            elif name in SUPPORTED_GATES:
+                if SUPPORTED_GATES[name] is not None:
+                    program.append((SUPPORTED_GATES[name], qubits, clbits, None))
+            elif name == 'measure':
+                events = list(range(self.num_events, self.num_events + len(qubits)))
+                self.num_events += len(qubits)
+                self.last_event.update(zip(clbits, events))
+                program.append(('measure', qubits, clbits, events))
+            elif name == 'reset':
+                program.append(('reset', qubits, clbits, None))
+            elif name == 'initialize':
+                check_zero_initialize(operation)
+                program.append(('reset', qubits, clbits, None))
+            elif name == 'if_else':
+                true_body = self.compile_conditional_paulis(operation.blocks[0])
+                false_body = self.compile_conditional_paulis(operation.blocks[1]) if len(operation.blocks) > 1 and operation.blocks[1] is not None else []
+                program.append(('if_else', qubits, clbits, (self.condition_bits(operation.condition), true_body, false_body)))
+                continue
+            else:
+                print(f"Unsupported instruction for Pauli-frame simulation: {name}")
+                sys.exit(1)
+
+            if name in self.gate_noise:
+                program.append(('noise', qubits, clbits, self.gate_noise[name]))
+        return program
+
+    def compile_conditional_paulis(self, block):
+        """
+        Compiles an if_test body: only Pauli gates (and nested if_test) can be tracked by a frame.
+        """
+        body = []
+        for instruction in block.data:
+            operation = instruction.operation
+            qubits = [self.qc.find_bit(q).index for q in instruction.qubits]
+            if operation.name in IGNORED_INSTRUCTIONS:
+                continue
+            elif operation.name in CONDITIONAL_PAULIS:
+                body.append(('pauli', qubits, CONDITIONAL_PAULIS[operation.name]))
+            elif operation.name == 'if_else':
+                true_body = self.compile_conditional_paulis(operation.blocks[0])
+                false_body = self.compile_conditional_paulis(operation.blocks[1]) if len(operation.blocks) > 1 and operation.blocks[1] is not None else []
+                body.append(('if_else', qubits, (self.condition_bits(operation.condition), true_body, false_body)))
+            else:
+                print(f"Pauli-frame simulation only supports Pauli gates inside if_test (got {operation.name})")
+                sys.exit(1)
+        return body
+
+    def condition_bits(self, condition):
+        """
+        (Clbit or ClassicalRegister, value) -> list of (clbit index, expected bit value, measurement event).
+        The event is the measurement that last wrote the clbit at this point (None -> never written, reads 0).
+        """
+        target, value = condition
+        value = int(value)
+        if isinstance(target, ClassicalRegister):
+            clbits = [(self.qc.find_bit(bit).index, (value >> i) & 1) for i, bit in enumerate(target)]
+        else:
+            clbits = [(self.qc.find_bit(target).index, value)]
+        return [(c, v, self.last_event.get(c)) for c, v in clbits]
+
+    def reference_sample(self):
+        """
+        One noiseless shot (stabilizer method), used as the reference the frames are applied to.
+
+        Returns:
+            np.ndarray: (num_events,) uint8 reference outcome of every measurement event.
+        """
+        if self.reference is None:
+            simulator = AerSimulator(method='stabilizer')
+            result = simulator.run(to_reference_circuit(self.qc, self.num_events), shots=1, memory=True).result()
+            bitstring = result.get_memory()[0].replace(" ", "")
+            bits = np.array([int(b) for b in bitstring[::-1]], dtype=np.uint8)
+            self.reference = bits[self.num_clbits:]
+        return self.reference
+
+    def reference_clbits(self):
+        """
+        Returns:
+            np.ndarray: (num_clbits,) uint8 reference value of every classical bit at the end of the circuit.
+        """
+        reference = self.reference_sample()
+        clbits = np.zeros(self.num_clbits, dtype=np.uint8)
+        for c, event in self.last_event.items():
+            clbits[c] = reference[event]
+        return clbits
+
+    def sample_flips(self, num_shots, rng=None):
+        """
+        Propagates the noise of num_shots shots through the circuit.
+
+        Returns:
+            np.ndarray: (num_clbits, words) uint64 packed measurement-flip record
+                (bit s of clbit c is 1 if shot s reads the opposite of the reference).
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        num_words = -(-num_shots // 64)
+
+        def noise_words(step_idx, q, channel):
+            return pauli_channel_words(*channel, num_shots, rng)
+
+        def readout_words(q, event):
+            if self.readout_noise.get(q, 0) > 0:
+                return bernoulli_words(self.readout_noise[q], num_shots, rng)
+            return None
+
+        return self.propagate(num_words, noise_words, readout_words, lambda: random_words(num_words, rng))
+
+    def noise_locations(self):
+        """
+        Returns:
+            list: (program step index, qubit, (px, py, pz)) of every noisy gate qubit, in circuit order.
+        """
+        return [(step_idx, q, extra) for step_idx, (kind, qubits, clbits, extra) in enumerate(self.program)
+                if kind == 'noise' for q in qubits]
+
+    def measurement_locations(self):
+        """
+        Returns:
+            list: (measurement event, qubit, clbit) of every measurement, in circuit order.
+        """
+        return [(event, q, c) for kind, qubits, clbits, extra in self.program
+                if kind == 'measure' for q, c, event in zip(qubits, clbits, extra)]
+
+    def fault_flips(self, faults):
+        """
+        Propagates one deterministic fault per shot (shot i <- faults[i]), without any other noise.
+        Used to enumerate single faults (e.g., detector error models); the random Z gauge of
+        |0> / measured qubits is left out, so only deterministic measurements are meaningful.
+
+        Args:
+            faults (list): ('pauli', program step index, qubit, 'X' | 'Y' | 'Z') (see noise_locations)
+                or ('readout', measurement event) (see measurement_locations).
+
+        Returns:
+            np.ndarray: (num_clbits, len(faults)) uint8 measurement flips.
+        """
+        num_shots = len(faults)
+        num_words = -(-num_shots // 64)
+        pauli_masks = {} # (step index, qubit): (x shot mask, z shot mask)
+        readout_masks = {} # event: shot mask
+        for shot, fault in enumerate(faults):
+            if fault[0] == 'pauli':
+                _, step_idx, q, pauli = fault
+                x_mask, z_mask = pauli_masks.setdefault((step_idx, q), (np.zeros(num_shots, np.uint8), np.zeros(num_shots, np.uint8)))
+                x_mask[shot] ^= pauli in ('X', 'Y')
+                z_mask[shot] ^= pauli in ('Z', 'Y')
+            elif fault[0] == 'readout':
+                readout_masks.setdefault(fault[1], np.zeros(num_shots, np.uint8))[shot] ^= 1
+            else:
+                print(f"Wrong Fault: {fault}")
+                sys.exit(1)
+
+        zeros = np.zeros(num_words, dtype=np.uint64)
+
+        def noise_words(step_idx, q, channel):
+            if (step_idx, q) not in pauli_masks:
+                return zeros, zeros
+            x_mask, z_mask = pauli_masks[(step_idx, q)]
+            return pack_bits(x_mask[None, :])[0], pack_bits(z_mask[None, :])[0]
+
+        def readout_words(q, event):
+            return pack_bits(readout_masks[event][None, :])[0] if event in readout_masks else None
+
+        flips = self.propagate(num_words, noise_words, readout_words, lambda: zeros.copy())
+        return unpack_bits(flips, num_shots)
+
+    def propagate(self, num_words, noise_words, readout_words, gauge_words):
+        """
+        Runs the compiled program on packed frames.
+
+        Args:
+            noise_words (callable): (step index, qubit, (px, py, pz)) -> (x words, z words) Pauli error of a noise location.
+            readout_words (callable): (qubit, measurement event) -> flip words or None.
+            gauge_words (callable): () -> random Z frame words of a qubit in |0> / just measured.
+
+        Returns:
+            np.ndarray: (num_clbits, words) uint64 packed measurement-flip record.
+        """
+        reference = self.reference_sample()
+        frame_x = np.zeros((self.num_qubits, num_words), dtype=np.uint64)
+        frame_z = np.zeros((self.num_qubits, num_words), dtype=np.uint64)
+        flips = np.zeros((self.num_clbits, num_words), dtype=np.uint64)
+        for q in range(self.num_qubits):
+            frame_z[q] = gauge_words() # Initial |0> state: random Z frame
+        ones = np.full(num_words, np.iinfo(np.uint64).max, dtype=np.uint64)
+
+        def condition_mask(condition):
+            # Per-shot "condition holds" mask (actual values) and the reference value
+            actual = ones.copy()
+            expected_ref = True
+            for c, value, event in condition:
+                reference_bit = reference[event] if event is not None else 0
+                bit = flips[c] ^ (ones if reference_bit else 0)
+                actual &= bit if value else ~bit
+                expected_ref &= (reference_bit == value)
+            return actual, expected_ref
+
+        def run_conditional(body, actual, ref_taken):
+            # A conditional Pauli enters the frame where the shot and the reference disagree on taking it
+            for step in body:
+                if step[0] == 'pauli':
+                    _, qubits, (px, pz) = step
+                    mask = actual ^ (ones if ref_taken else 0)
+                    for q in qubits:
+                        if px: frame_x[q] ^= mask
+                        if pz: frame_z[q] ^= mask
+                else:
+                    _, _, (condition, true_body, false_body) = step
+                    cond_actual, cond_ref = condition_mask(condition)
+                    run_conditional(true_body, actual & cond_actual, ref_taken and cond_ref)
+                    run_conditional(false_body, actual & ~cond_actual, ref_taken and not cond_ref)
+
+        for step_idx, (kind, qubits, clbits, extra) in enumerate(self.program):
+            if kind == 'h':
+                q = qubits[0]
+                frame_x[q], frame_z[q] = frame_z[q].copy(), frame_x[q].copy()
+            elif kind == 's':
+                q = qubits[0]
+                frame_z[q] ^= frame_x[q]
+            elif kind == 'sx':
+                q = qubits[0]
+                frame_x[q] ^= frame_z[q]
+            elif kind == 'cx':
+                c, t = qubits
+                frame_x[t] ^= frame_x[c]
+                frame_z[c] ^= frame_z[t]
+            elif kind == 'cz':
+                a, b = qubits
+                frame_z[a] ^= frame_x[b]
+                frame_z[b] ^= frame_x[a]
+            elif kind == 'swap':
+                a, b = qubits
+                frame_x[[a, b]] = frame_x[[b, a]]
+                frame_z[[a, b]] = frame_z[[b, a]]
+            elif kind == 'measure':
+                for q, c, event in zip(qubits, clbits, extra): # (extra: measurement events)
+                    flips[c] = frame_x[q].copy()
+                    readout = readout_words(q, event)
+                    if readout is not None:
+                        flips[c] ^= readout
+                    frame_z[q] = gauge_words() # Collapsed to a Z-eigenstate
+            elif kind == 'reset':
+                for q in qubits:
+                    frame_x[q] = 0
+                    frame_z[q] = gauge_words()
+            elif kind == 'noise':
+                for q in qubits:
+                    x_words, z_words = noise_words(step_idx, q, extra)
+                    frame_x[q] ^= x_words
+                    frame_z[q] ^= z_words
+            elif kind == 'if_else':
+                condition, true_body, false_body = extra
+                cond_actual, cond_ref = condition_mask(condition)
+                run_conditional(true_body, cond_actual, cond_ref)
+                run_conditional(false_body, ~cond_actual, not cond_ref)
+
+        return flips
+
+    def sample(self, num_shots, rng=None):
+        """
+        Returns:
+            np.ndarray: (shots, num_clbits) uint8 measured classical bits (reference XOR flips).
+        """
+        flips = unpack_bits(self.sample_flips(num_shots, rng), num_shots)
+        return (flips ^ self.reference_clbits()[:, None]).T.copy()
+
+    def sample_registers(self, num_shots, rng=None):
+        """
+        Returns:
+            dict: {classical register name: (shots, register size) uint8}, column i = register[i].
+        """
+        bits = self.sample(num_shots, rng)
+        registers = {}
+        for creg in self.qc.cregs:
+            registers[creg.name] = bits[:, [self.qc.find_bit(bit).index for bit in creg]]
+        return registers
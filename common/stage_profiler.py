@@ -0,0 +1,153 @@
+import sys
+import json
+import time
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+
+# --- Stage Profiler ---
+# Lightweight per-stage instrumentation for the experiment drivers:
+#   with stage('transpile'):
+#       trans_qc = transpile(qc, simulator)
+# Every stage records its wall time (perf_counter) and call count; stages may be nested (inclusive times).
+# stage() is a no-op until a StageProfiler is started, so library modules can be instrumented
+# without passing a profiler around.
+# Opt-in modes (extra overhead, off by default):
+#   'tracemalloc' : peak Python heap memory per stage (NumPy / Qiskit objects; not Aer's C++ memory)
+#   'cprofile'    : cProfile of the whole run, top functions by cumulative time in the report
+# Worker processes (process pools) are not profiled: profile with 1 worker.
+STAGES = ['circuit build', 'error injection', 'transpile', 'simulate', 'parse', 'decoder build', 'decode', 'report'] # Common stage names
+PROFILE_MODES = ['tracemalloc', 'cprofile']
+
+active_profiler = None # StageProfiler between start() and stop()
+
+@contextmanager
+def stage(name):
+    """
+    Times one stage on the active profiler (no-op without one).
+    """
+    if active_profiler is None:
+        yield
+        return
+    with active_profiler.stage(name):
+        yield
+
+class StageProfiler:
+    """
+    Aggregates stage timings of one run.
+
+    Args:
+        run_name (str): Name stored in the report (e.g., '001 Repetition Code').
+        modes (list): Subset of PROFILE_MODES.
+        top_functions (int): Functions listed in the report in 'cprofile' mode.
+    """
+    def __init__(self, run_name, modes=(), top_functions=25):
+        for mode in modes:
+            if mode not in PROFILE_MODES:
+                print(f"Wrong Profile Mode: {mode} (choose from {PROFILE_MODES})")
+                sys.exit(1)
+        self.run_name = run_name
+        self.modes = list(modes)
+        self.top_functions = top_functions
+        self.stages = {} # name: {'calls', 'seconds', 'peak_memory_bytes'}
+        self.stack = [] # Open stages (nested): [peak memory of finished children]
+        self.profile = None
+        self.start_time = None
+        self.total_seconds = 0.0
+
+    def start(self):
+        global active_profiler
+        active_profiler = self
+        if 'tracemalloc' in self.modes:
+            tracemalloc.start()
+        if 'cprofile' in self.modes:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.start_time = time.perf_counter()
+        return self
+
+    def stop(self):
+        global active_profiler
+        self.total_seconds = time.perf_counter() - self.start_time
+        if self.profile is not None:
+            self.profile.disable()
+        if 'tracemalloc' in self.modes:
+            tracemalloc.stop()
+        active_profiler = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def stage(self, name):
+        track_memory = 'tracemalloc' in self.modes and tracemalloc.is_tracing()
+        if track_memory:
+            tracemalloc.reset_peak()
+        self.stack.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            children_peak = self.stack.pop()
+            record = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'peak_memory_bytes': None})
+            record['calls'] += 1
+            record['seconds'] += elapsed
+            if track_memory:
+                peak = max(tracemalloc.get_traced_memory()[1], children_peak)
+                record['peak_memory_bytes'] = max(record['peak_memory_bytes'] or 0, peak)
+                if self.stack:
+                    self.stack[-1] = max(self.stack[-1], peak) # (reset_peak above hides it from the parent)
+
+    def report(self):
+        """
+        Returns:
+            dict: JSON-serializable run report (stages sorted by time, share of the total wall time).
+        """
+        total = self.total_seconds or (time.perf_counter() - self.start_time if self.start_time else 0.0)
+        stages = {}
+        for name, record in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            stages[name] = {
+                'calls': record['calls'],
+                'seconds': record['seconds'],
+                'mean_ms': record['seconds'] / record['calls'] * 1e3,
+                'share': record['seconds'] / total if total > 0 else 0.0,
+                'peak_memory_bytes': record['peak_memory_bytes'],
+            }
+        report = {'run': self.run_name, 'modes': self.modes, 'total_seconds': total, 'stages': stages}
+        try:
+            import resource
+            report['max_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # (Linux: KiB)
+        except ImportError:
+            pass
+
+        if self.profile is not None:
+            stats = pstats.Stats(self.profile).stats # {(file, line, func): (calls, primitive calls, tottime, cumtime, callers)}
+            top = sorted(stats.items(), key=lambda item: -item[1][3])[:self.top_functions]
+            report['top_functions'] = [
+                {'function': f"{func} ({file}:{line})", 'calls': calls, 'tottime': tottime, 'cumtime': cumtime}
+                for (file, line, func), (_, calls, tottime, cumtime, _) in top
+            ]
+        return report
+
+    def print_report(self):
+        report = self.report()
+        print(f"\n--- Stage Profile ({report['run']}) ---")
+        print(f"{'stage':>16} | {'calls':>7} | {'time [s]':>9} | {'mean [ms]':>9} | {'share':>6} | {'peak mem [MB]':>13}")
+        for name, record in report['stages'].items():
+            peak = '-' if record['peak_memory_bytes'] is None else f"{record['peak_memory_bytes'] / 1e6:.1f}"
+            print(f"{name:>16} | {record['calls']:>7} | {record['seconds']:>9.3f} | {record['mean_ms']:>9.3f} | "
+                  f"{record['share'] * 100:>5.1f}% | {peak:>13}")
+        print(f"Total wall time: {report['total_seconds']:.3f} s")
+        for entry in report.get('top_functions', [])[:10]:
+            print(f"  {entry['cumtime']:>8.3f} s cum | {entry['calls']:>8} calls | {entry['function']}")
+        return report
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)